@@ -0,0 +1,27 @@
+"""
+_signals.py
+------------
+Synthetic signals shared by the benchmarks and the tests.
+"""
+import numpy as np
+
+
+def synthetic_ecg(duration_s, fs, n_leads=12, seed=0):
+    """Spiky QRS-like beats with RR jitter, baseline wander and noise, shape (samples, leads)."""
+    rng = np.random.default_rng(seed)
+    n = int(duration_s * fs)
+    t = np.arange(n) / fs
+
+    rr = rng.normal(0.8, 0.08, size=int(duration_s / 0.5) + 2).clip(0.4, 1.6)
+    beats = np.cumsum(rr)
+    beats = (beats[beats < duration_s] * fs).astype(int)
+
+    qrs = np.exp(-0.5 * (np.arange(-int(0.05 * fs), int(0.05 * fs) + 1) / (0.01 * fs)) ** 2)
+    train = np.zeros(n)
+    train[beats] = 1.0
+    base = np.convolve(train, qrs, mode="same")
+
+    gains = rng.uniform(-1.5, 1.5, size=n_leads)
+    wander = 0.2 * np.sin(2 * np.pi * 0.15 * t)[:, None]
+    noise = 0.05 * rng.standard_normal((n, n_leads))
+    return base[:, None] * gains + wander + noise
@@ -0,0 +1,69 @@
+"""
+bench_audio_features.py
+------------------------
+Per-clip latency and throughput of the drone feature extraction: the
+librosa path the classifier was trained with (librosa.load + feature.mfcc)
+against services/audio_features.py (soundfile decode from memory, soxr or
+polyphase resampling, cached mel filterbank / DCT, float32 STFT). Also
+reports the largest absolute difference between the two feature vectors.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_audio_features --seconds 1 5 30 --rates 16000 44100
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+import soundfile as sf
+
+from backend.services import audio_features
+
+
+def synthetic_clip(sr, seconds, seed=0):
+    """Drone-like harmonic hum in noise as PCM_16 WAV bytes."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sr * seconds)) / sr
+    hum = sum(np.sin(2 * np.pi * 180 * k * t) / k for k in range(1, 6))
+    buf = io.BytesIO()
+    sf.write(buf, 0.2 * hum + 0.05 * rng.standard_normal(len(t)), sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+def librosa_features(data):
+    import librosa
+
+    y, sr = librosa.load(io.BytesIO(data), sr=audio_features.SAMPLE_RATE)
+    return np.mean(librosa.feature.mfcc(y=y, sr=sr, n_mfcc=audio_features.N_MFCC).T, axis=0)
+
+
+def _seconds_per_call(fn, data, repeat):
+    fn(data)  # warm-up: imports, filterbank cache
+    times = np.empty(repeat)
+    for i in range(repeat):
+        t = time.perf_counter()
+        fn(data)
+        times[i] = time.perf_counter() - t
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, nargs="+", default=[1.0, 5.0, 30.0])
+    parser.add_argument("--rates", type=int, nargs="+", default=[16000, 44100])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'sr':>6} {'clip s':>7} {'librosa ms':>11} {'fast ms':>8} {'speedup':>8} {'clips/s':>8} {'max |diff|':>11}")
+    for sr in args.rates:
+        for seconds in args.seconds:
+            data = synthetic_clip(sr, seconds)
+            slow = _seconds_per_call(librosa_features, data, args.repeat)
+            fast = _seconds_per_call(audio_features.extract_features, data, args.repeat)
+            diff = np.abs(librosa_features(data) - audio_features.extract_features(data)).max()
+            print(f"{sr:>6d} {seconds:>7.1f} {slow * 1e3:>11.2f} {fast * 1e3:>8.2f} "
+                  f"{slow / fast:>7.1f}x {1 / fast:>8.0f} {diff:>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
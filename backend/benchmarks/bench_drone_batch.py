@@ -0,0 +1,73 @@
+"""
+bench_drone_batch.py
+---------------------
+Files per second of batch drone classification (services/drone_batch.py)
+against the number of feature worker processes, on synthetic clips written
+to a temporary directory, with the speedup over one worker. The old path
+(one extract_features + one single-sample model call per file, in this
+process) is reported as workers = 0. Uses an untrained AudioClassifier:
+the network is tiny and its weights do not change the timing.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_drone_batch --files 2000 --seconds 1 --workers 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+import torch
+
+from backend.services import audio_features, drone_batch
+from backend.services.drone_model import AudioClassifier
+
+
+def write_clips(directory, n_files, seconds, sr, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    for i in range(n_files):
+        hum = 0.3 * np.sin(2 * np.pi * rng.uniform(100, 400) * t) * (i % 2)
+        sf.write(os.path.join(directory, f"clip{i:05d}.wav"), hum + 0.05 * rng.standard_normal(len(t)), sr,
+                 subtype="PCM_16")
+    return drone_batch.list_audio_files(directory)
+
+
+def per_file_baseline(model, files):
+    started = time.perf_counter()
+    with torch.inference_mode():
+        for _, path in files:
+            torch.softmax(model(torch.from_numpy(audio_features.extract_features(path))[None]), dim=1)
+    return len(files) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=1.0, help="clip length")
+    parser.add_argument("--sr", type=int, default=16000)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--batch-size", type=int, default=drone_batch.BATCH_SIZE)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    torch.manual_seed(0)
+    model = AudioClassifier().eval()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_clips(tmp, args.files, args.seconds, args.sr)
+        print(f"{len(files)} clips of {args.seconds:g} s at {args.sr} Hz, {os.cpu_count()} cores")
+        print(f"{'workers':>8} {'files/s':>9} {'speedup':>8}")
+        print(f"{0:>8d} {per_file_baseline(model, files):>9.0f} {'-':>8}")
+        base = None
+        for workers in args.workers:
+            with drone_batch.new_pool(workers) as pool:
+                *_, last = drone_batch.iter_classify(model, files, pool, batch_size=args.batch_size)
+            rate = last["summary"]["files_per_second"]
+            base = base or rate
+            print(f"{workers:>8d} {rate:>9.0f} {rate / base:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+bench_drone_timeline.py
+------------------------
+Throughput (x real time) and peak Python-side memory of the sliding-window
+drone timeline (services/drone_inference.py) on synthetic field recordings
+of increasing length, written to a temporary WAV file. Peak memory should
+stay flat as the recording grows. Uses an untrained AudioClassifier: the
+network is tiny and its weights do not change the timing.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_drone_timeline --minutes 1 10 30 --sr 44100
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import soundfile as sf
+import torch
+
+from backend.services import drone_inference
+from backend.services.drone_model import AudioClassifier
+
+
+def write_recording(path, minutes, sr, seed=0):
+    """Noise with a 180 Hz hum switching on and off every 20 s, written in 10 s pieces."""
+    rng = np.random.default_rng(seed)
+    piece = 10 * sr
+    with sf.SoundFile(path, "w", samplerate=sr, channels=1, subtype="PCM_16") as f:
+        for p0 in range(0, int(minutes * 60 * sr), piece):
+            t = (p0 + np.arange(piece)) / sr
+            hum = 0.3 * np.sin(2 * np.pi * 180 * t) * ((t // 20) % 2)
+            f.write(hum + 0.05 * rng.standard_normal(piece))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1.0, 10.0, 30.0])
+    parser.add_argument("--sr", type=int, default=44100, help="sample rate of the recording")
+    parser.add_argument("--window", type=float, default=drone_inference.WINDOW_S)
+    parser.add_argument("--hop", type=float, default=drone_inference.HOP_S)
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+    detector = drone_inference.SlidingWindowDetector(AudioClassifier().eval(), window_s=args.window, hop_s=args.hop)
+
+    print(f"{'minutes':>8} {'windows':>8} {'seconds':>8} {'x realtime':>11} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for minutes in args.minutes:
+            path = os.path.join(tmp, f"{minutes:g}min.wav")
+            write_recording(path, minutes, args.sr)
+            tracemalloc.start()
+            t = time.perf_counter()
+            result = detector.timeline(path)
+            seconds = time.perf_counter() - t
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{minutes:>8g} {len(result['times_s']):>8d} {seconds:>8.2f} "
+                  f"{result['duration_s'] / seconds:>11.0f} {peak / 2**20:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
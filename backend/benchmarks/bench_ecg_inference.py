@@ -0,0 +1,65 @@
+"""
+bench_ecg_inference.py
+-----------------------
+Per-call latency of the two ECG Keras models: model.predict (the old
+/classify path) against the traced KerasPredictor used by the router.
+Reports p50 / p99 in milliseconds and the largest absolute difference
+between the two outputs.
+
+Run from the project root (needs the pretrained models and TensorFlow):
+    python -m backend.benchmarks.bench_ecg_inference --calls 200 --batch 1 64
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+from keras.models import load_model
+
+from backend.services.ecg_inference import KerasPredictor
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "..", "pretrained_models")
+MODELS = {
+    "6-class": "model.hdf5",
+    "binary": "ResNet_finetuned_binary2.h5",
+}
+
+
+def _latencies(fn, calls):
+    times = np.empty(calls)
+    for i in range(calls):
+        t = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - t
+    return times * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1])
+    parser.add_argument("--warmup", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'model':>8} {'batch':>6} {'path':>10} {'p50 ms':>9} {'p99 ms':>9} {'max |diff|':>11}")
+    for name, filename in MODELS.items():
+        model = load_model(os.path.join(MODELS_DIR, filename), compile=False)
+        predictor = KerasPredictor(model).warmup()
+
+        for batch in args.batch:
+            X = rng.standard_normal((batch, *predictor.input_shape)).astype(np.float32)
+            paths = {
+                "predict": lambda: model.predict(X, verbose=0),
+                "traced": lambda: predictor(X),
+            }
+            diff = float(np.abs(np.asarray(paths["predict"]()) - paths["traced"]()).max())
+            for label, fn in paths.items():
+                _latencies(fn, args.warmup)
+                ms = _latencies(fn, args.calls)
+                p50, p99 = np.percentile(ms, [50, 99])
+                print(f"{name:>8} {batch:>6d} {label:>10} {p50:>9.2f} {p99:>9.2f} {diff:>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+bench_ecg_preprocess.py
+------------------------
+Model preprocessing cost per record: the previous path (FFT-resample the
+whole record with scipy.signal.resample, then crop) against the crop-first
+polyphase path now in services/models_processing.py, for both the 6-class
+input (400 Hz, 4096 samples) and the binary input (300 Hz, 9000 samples).
+
+Run from the project root:
+    python -m backend.benchmarks.bench_ecg_preprocess --fs 257 360 500 1000 --minutes 0.5 5 60
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from scipy.signal import resample
+
+from backend.services import models_processing as mp
+
+LEADS = ["I", "II", "III", "aVR", "aVL", "aVF", "V1", "V2", "V3", "V4", "V5", "V6"]
+
+
+def _fft_path(rec):
+    """Both preprocessors as they were: full-length FFT resample, then crop / pad."""
+    out = []
+    for x, target_fs, target_len in [(rec.p_signal, 400, 4096), (rec.p_signal[:, :1], 300, 9000)]:
+        y = resample(x, int(round(x.shape[0] * target_fs / rec.fs)), axis=0)[:target_len]
+        out.append(np.concatenate([y, np.zeros((target_len - len(y), y.shape[1]))]))
+    return out
+
+
+def _poly_path(rec):
+    return [mp.preprocess_ecg_with_mapping_from_record(rec), mp.preprocess_for_binary_model(rec)]
+
+
+def _time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fs", type=float, nargs="+", default=[257, 360, 500, 1000])
+    parser.add_argument("--minutes", type=float, nargs="+", default=[0.5, 5, 60])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'fs':>6} {'minutes':>8} {'fft (ms)':>10} {'poly (ms)':>10} {'speedup':>8}")
+    for fs in args.fs:
+        for minutes in args.minutes:
+            n = int(minutes * 60 * fs)
+            # odd lengths are the FFT path's worst case, so add a prime offset
+            rec = SimpleNamespace(p_signal=rng.standard_normal((n + 7, 12)), fs=fs, sig_name=LEADS)
+            t_fft = _time(lambda: _fft_path(rec), args.repeat)
+            t_poly = _time(lambda: _poly_path(rec), args.repeat)
+            print(f"{fs:>6g} {minutes:>8g} {t_fft * 1e3:>10.1f} {t_poly * 1e3:>10.1f} {t_fft / t_poly:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
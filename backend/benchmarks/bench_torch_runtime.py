@@ -0,0 +1,88 @@
+"""
+bench_torch_runtime.py
+-----------------------
+Per-sample latency and throughput of the torch models (EEGNet, the drone
+AudioClassifier and DopplerNet) under each TorchPredictor runtime, with and
+without dynamic int8 quantization, against eager PyTorch. Also reports the
+parity with the eager model on the benchmark batch: the largest absolute
+output difference and the argmax agreement (classifiers only).
+
+Run from the project root (needs the pretrained .pth files):
+    python -m backend.benchmarks.bench_torch_runtime --models eeg drone --batch 1 16 256
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from backend.services import model_registry
+from backend.services.torch_runtime import RUNTIMES, TorchPredictor
+
+
+def _eeg():
+    from backend.services.eeg_model import load_trained_model
+    return load_trained_model(model_registry.pretrained_path("eeg_model.pth")), (1, 19, 256)
+
+
+def _drone():
+    from backend.services.drone_model import load_trained_model
+    return load_trained_model(model_registry.pretrained_path("model.pth")), (40,)
+
+
+def _doppler():
+    from backend.pretrained_models.doppler_predict import load_doppler_model
+    bundle = load_doppler_model()
+    return bundle["model"], (1, bundle["n_mels"], bundle["max_frames"])
+
+
+MODELS = {"eeg": _eeg, "drone": _drone, "doppler": _doppler}
+
+
+def _seconds_per_call(fn, x, calls, warmup):
+    for _ in range(warmup):
+        fn(x)
+    times = np.empty(calls)
+    for i in range(calls):
+        t = time.perf_counter()
+        fn(x)
+        times[i] = time.perf_counter() - t
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS), default=sorted(MODELS))
+    parser.add_argument("--runtimes", nargs="+", choices=RUNTIMES, default=list(RUNTIMES))
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+
+    print(f"{'model':>8} {'runtime':>8} {'int8':>5} {'batch':>6} {'us/sample':>10} {'samples/s':>11} "
+          f"{'max |diff|':>11} {'argmax':>7}")
+    for name in args.models:
+        model, sample_shape = MODELS[name]()
+        for runtime in args.runtimes:
+            for quantize in (False, True):
+                predictor = TorchPredictor(model, torch.zeros(1, *sample_shape), runtime=runtime, quantize=quantize)
+                if predictor.runtime != runtime:
+                    print(f"{name:>8} {runtime:>8} {'yes' if quantize else 'no':>5}   unavailable (fell back to eager)")
+                    continue
+                for batch in args.batch:
+                    x = torch.randn(batch, *sample_shape)
+                    parity = predictor.check_parity(x)
+                    seconds = _seconds_per_call(predictor, x, args.calls, args.warmup)
+                    agreement = f"{parity['argmax_agreement']:.3f}" if name != "doppler" else "-"
+                    print(f"{name:>8} {runtime:>8} {'yes' if quantize else 'no':>5} {batch:>6d} "
+                          f"{seconds / batch * 1e6:>10.1f} {batch / seconds:>11.0f} "
+                          f"{parity['max_abs_diff']:>11.2e} {agreement:>7}")
+
+
+if __name__ == "__main__":
+    main()
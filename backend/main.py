@@ -1,9 +1,25 @@
 # backend/main.py
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from backend.services import model_registry
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # models load in the background; requests that need one before it is ready wait for it
+    if model_registry.WARMUP_ON_STARTUP:
+        model_registry.start_background_warmup()
+    elif model_registry.REQUIRED_MODELS:
+        # readiness waits for these, so they load even without the full warm-up
+        model_registry.start_background_warmup(model_registry.REQUIRED_MODELS)
+    yield
 
-app = FastAPI(title="Signal Viewer Backend")
+
+app = FastAPI(title="Signal Viewer Backend", lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",  # Vite frontend
@@ -14,10 +30,11 @@ app.add_middleware(
     allow_origins=["*"],  # or origins list if you want to restrict
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["*"],  # lets the browser read X-EEG-* metadata of binary responses
 )
 
 # Include existing routers
-from backend.routers import ecg, eeg, api, raddar, doppler, sar_classifier
+from backend.routers import ecg, eeg, api, raddar, doppler, sar_classifier, analytics
 
 app.include_router(ecg.router, prefix="/api/ecg")
 app.include_router(eeg.router, prefix="/api/eeg")
@@ -25,6 +42,18 @@ app.include_router(api.router)
 app.include_router(raddar.router, prefix="/api/radar")
 app.include_router(doppler.router, prefix="/api/doppler") 
 app.include_router(sar_classifier.router, prefix="/api/sar") 
+app.include_router(analytics.router, prefix="/api/analytics")
 @app.get("/")
 def root():
     return {"message": "Signal Viewer Backend - Ready"}
+
+
+@app.get("/health/ready")
+def ready():
+    """
+    Per-model load state and time. 503 only until the required models
+    (MODEL_REQUIRED) are loaded; other models that are missing or still
+    loading are listed under "degraded" in the 200 body.
+    """
+    status = model_registry.status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
@@ -1,10 +1,12 @@
 # backend/pretrained_models/doppler_predict.py
 import torch
 import torch.nn as nn
-import librosa
 import numpy as np
 import os
 
+from backend.services import model_registry
+from backend.services import torch_runtime
+
 # -------------------------------
 # Define same model architecture
 # -------------------------------
@@ -44,26 +46,45 @@ class DopplerNet(nn.Module):
         return self.fc(self.cnn(x))
 
 # -------------------------------
-# Load model and metadata
+# Load model and metadata (on first use / background warm-up)
 # -------------------------------
-MODEL_PATH = "backend/pretrained_models/doppler_model_regression.pth"
+MODEL_PATH = model_registry.pretrained_path("doppler_model_regression.pth")
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-checkpoint = torch.load(MODEL_PATH, map_location=device, weights_only=False)
-n_mels = checkpoint.get("n_mels", 64)
-max_frames = checkpoint.get("max_frames", 400)
 
-model = DopplerNet(n_mels=n_mels, max_frames=max_frames).to(device)
-model.load_state_dict(checkpoint["model_state_dict"])
-model.eval()
 
-target_mean = checkpoint["target_mean"]
-target_std = checkpoint["target_std"]
+def load_doppler_model(model_path=MODEL_PATH):
+    checkpoint = torch.load(model_path, map_location=device, weights_only=False)
+    n_mels = checkpoint.get("n_mels", 64)
+    max_frames = checkpoint.get("max_frames", 400)
+
+    model = DopplerNet(n_mels=n_mels, max_frames=max_frames).to(device)
+    model.load_state_dict(checkpoint["model_state_dict"])
+    model.eval()
+    # TORCH_RUNTIME / TORCH_QUANTIZE select a compiled and/or int8 runtime
+    model = torch_runtime.optimize(model, torch.zeros(1, 1, n_mels, max_frames, device=device))
+
+    return {
+        "model": model,
+        "n_mels": n_mels,
+        "max_frames": max_frames,
+        "target_mean": checkpoint["target_mean"],
+        "target_std": checkpoint["target_std"],
+    }
+
+
+model_registry.register("doppler_regressor", load_doppler_model)
 
 # -------------------------------
 # Prediction function
 # -------------------------------
 def predict_doppler(file_path: str):
+    import librosa  # deferred: librosa pulls in numba / sklearn at import
+
+    bundle = model_registry.get("doppler_regressor")
+    model, n_mels, max_frames = bundle["model"], bundle["n_mels"], bundle["max_frames"]
+    target_mean, target_std = bundle["target_mean"], bundle["target_std"]
+
     y, sr = librosa.load(file_path, sr=22050)
 
     # compute mel spectrogram
@@ -1,8 +1,8 @@
 # backend/pretrained_models/doppler_shift.py
 import numpy as np
 import soundfile as sf
-import sounddevice as sd
-from scipy.signal import butter, filtfilt, iirpeak, fftconvolve
+from scipy.signal import fftconvolve
+from backend.utils import signal_tools as st
 
 def realistic_car_passby(velocity=30.0, base_freq=300.0, duration=8.0, sr=44100):
     """
@@ -37,16 +37,14 @@ def realistic_car_passby(velocity=30.0, base_freq=300.0, duration=8.0, sr=44100)
 
     # Road noise (low/mid broadband)
     road_noise = np.random.randn(len(t)) * 0.01 * (np.abs(v_rel)/velocity_ms)
-    b, a = butter(4, 400/(sr/2), btype="low")
-    road_noise = filtfilt(b, a, road_noise)
+    road_noise = st.lowpass(road_noise, sr, 400, order=4)
 
     # Combine components
     engine = harmonics + rumble + road_noise
 
-    # Simple resonance shaping
-    for f0 in [200, 800]:
-        b, a = iirpeak(f0/(sr/2), Q=8)
-        engine = filtfilt(b, a, engine)
+    # Simple resonance shaping (both resonators fused into one zero-phase pass)
+    resonators = st.cascade(*(st.design_sos("peak", sr, f0, quality=8) for f0 in [200, 800]))
+    engine = st.filtfilt_sos(engine, resonators)
 
     # ---------------------------
     # Distance attenuation
@@ -77,9 +75,8 @@ def realistic_car_passby(velocity=30.0, base_freq=300.0, duration=8.0, sr=44100)
     ir[int(sr*0.03)] = 0.2
     ir[int(sr*0.08)] = 0.1
     
-    for ch in range(2):
-        reverb = fftconvolve(stereo[:,ch], ir)[:len(stereo)]
-        stereo[:,ch] = 0.8*stereo[:,ch] + 0.2*reverb
+    reverb = fftconvolve(stereo, ir[:, None], axes=0)[:len(stereo)]
+    stereo = 0.8*stereo + 0.2*reverb
 
     # Normalize and convert to mono for simpler handling
     stereo /= np.max(np.abs(stereo)) + 1e-6
@@ -122,6 +119,7 @@ def DopplerShift(frequency, speed, play_sound=False, realistic=True):
     # Play sound immediately if requested
     if play_sound:
         try:
+            import sounddevice as sd  # needs PortAudio; only the local playback path uses it
             sd.play(signal, sample_rate)
         except Exception as e:
             print(f"Could not play sound: {e}")
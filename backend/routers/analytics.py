@@ -0,0 +1,284 @@
+# file: routers/analytics.py
+import os
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
+
+from ..services import analytics
+from ..services import ecg_cache
+from ..services import ecg_processing as dsp
+from ..services import eeg_cache
+from ..utils import file_handler
+from ..utils.cache_tools import LRUCache, file_fingerprint
+
+router = APIRouter(tags=["Analytics"])
+
+# Segments per page when no limit is given, and the largest page
+ANALYTICS_PAGE_SIZE = 50
+MAX_ANALYTICS_PAGE = 1000
+DEFAULT_BINS = 100
+
+# XOR overlay state at the end of every served page, so the next page resumes
+# from it instead of replaying the record from chunk 0
+XOR_STATE_MAX_BYTES = int(os.environ.get("XOR_STATE_MAX_BYTES", 64 * 1024 * 1024))
+_xor_states = LRUCache(XOR_STATE_MAX_BYTES)
+
+
+# ------------------------------------------------------------
+#   Signal sources
+# ------------------------------------------------------------
+# Both sources hand out (channels, samples) views of data that is already
+# cached for the viewers: the filtered ECG record and the preprocessed EEG (µV).
+
+class _Signal:
+    def __init__(self, source, file_path, data, fs, names, version):
+        self.source = source
+        self.file_path = file_path
+        self.version = version   # changes when the file is rewritten
+        self.data = data
+        self.fs = float(fs)
+        self.names = [str(n) for n in names]
+
+    def row(self, channel):
+        """Row index of a channel given by name (or by lead index for ECG)."""
+        if channel in self.names:
+            return self.names.index(channel)
+        if self.source == "ecg" and channel.isdigit() and int(channel) < len(self.names):
+            return int(channel)
+        raise HTTPException(status_code=400, detail=f"Unknown channel: {channel}")
+
+
+def _load_signal(source, filename):
+    if source == "eeg":
+        file_path = os.path.join(file_handler.EEG_UPLOAD_DIR, filename)
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=404, detail="File not found")
+        pre = eeg_cache.get_preprocessed(file_path)
+        return _Signal(source, file_path, pre.data, pre.fs, pre.ch_names, file_fingerprint(file_path))
+
+    file_path = os.path.join(file_handler.ECG_UPLOAD_DIR, filename)
+    try:
+        record = ecg_cache.load_record(file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    return _Signal(source, file_path, record.filtered.T, record.fs, record.sig_name,
+                   ecg_cache.record_fingerprint(file_path))
+
+
+def _segment_bounds(signal, segment, ref_row, window, step):
+    """[start, end) of every segment: R-R cycles of the reference lead (ECG) or fixed windows."""
+    if segment == "cycles":
+        if signal.source != "ecg":
+            raise HTTPException(status_code=400, detail="segment=cycles needs R-peaks (ECG only)")
+        peaks = ecg_cache.get_r_peaks(signal.file_path, leads=[ref_row])
+        return dsp.cycle_bounds(peaks)[ref_row]
+    window_n = max(2, int(round(window * signal.fs)))
+    step_n = max(1, int(round((step or window) * signal.fs)))
+    return analytics.window_bounds(signal.data.shape[1], window_n, step_n)
+
+
+def _page(bounds, cursor, limit):
+    end = min(len(bounds), cursor + limit)
+    page = {
+        "cursor": cursor,
+        "next_cursor": end if end < len(bounds) else None,
+        "total_segments": int(len(bounds)),
+    }
+    return bounds[cursor:end], page
+
+
+def _segments(x, bounds, n_points):
+    try:
+        return analytics.segment_stack(x, bounds, n_points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _default_segment(source, segment):
+    return segment or ("cycles" if source == "ecg" else "windows")
+
+
+# ------------------------------------------------------------
+#   Routes
+# ------------------------------------------------------------
+# Every segmented route pages with cursor/limit: a client that keeps the
+# returned next_cursor only asks for the segments that arrived since.
+
+@router.get("/recurrence")
+def get_recurrence(
+    source: str = Query(..., pattern="^(ecg|eeg)$"),
+    filename: str = Query(...),
+    channels: list[str] = Query(..., description="Two channels: x (rows) and y (columns)"),
+    segment: str | None = Query(None, pattern="^(cycles|windows)$", description="Default: cycles for ECG, windows for EEG"),
+    window: float = Query(2.0, gt=0, description="Window length (s) for segment=windows"),
+    step: float | None = Query(None, gt=0, description="Window step (s), defaults to window"),
+    n_points: int = Query(200, ge=0, le=20000, description="Resample each segment to n_points (0 = raw samples)"),
+    normalize: bool = Query(True, description="Min-max scale each segment first"),
+    threshold: float | None = Query(None, ge=0, description="Recurrence radius; default 0.1 * std per segment"),
+    bins: int | None = Query(None, ge=2, le=1000, description="Return a bins x bins count grid"),
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(ANALYTICS_PAGE_SIZE, ge=1, le=MAX_ANALYTICS_PAGE),
+):
+    """
+    Cross-recurrence |x[i] - y[j]| < threshold summed over the segments of
+    this page. Segments longer than MAX_DENSE_POINTS (or any request with
+    ``bins``) are counted in a binned grid without forming the dense matrix.
+    """
+    if len(channels) != 2:
+        raise HTTPException(status_code=400, detail="channels must name exactly two channels")
+    signal = _load_signal(source, filename)
+    rx, ry = signal.row(channels[0]), signal.row(channels[1])
+    bounds = _segment_bounds(signal, _default_segment(source, segment), rx, window, step)
+    page_bounds, page = _page(bounds, cursor, limit)
+
+    length = n_points or int((page_bounds[:, 1] - page_bounds[:, 0]).max(initial=0))
+    if not bins and length <= analytics.MAX_DENSE_POINTS:
+        A = _segments(signal.data[rx], page_bounds, n_points)
+        B = _segments(signal.data[ry], page_bounds, n_points)
+        if normalize:
+            A, B = analytics.minmax_normalize(A), analytics.minmax_normalize(B)
+        thr = analytics.adaptive_threshold(A, B) if threshold is None else threshold
+        counts = analytics.recurrence_counts(A, B, thr)
+    else:
+        bins = bins or DEFAULT_BINS
+        counts = np.zeros((bins, bins), dtype=np.int64)
+        for bound in page_bounds:
+            a = _segments(signal.data[rx], bound[None], n_points)[0]
+            b = _segments(signal.data[ry], bound[None], n_points)[0]
+            if normalize:
+                a, b = analytics.minmax_normalize(a), analytics.minmax_normalize(b)
+            thr = analytics.adaptive_threshold(a, b) if threshold is None else threshold
+            counts += analytics.binned_recurrence(a, b, thr, bins)
+
+    return {
+        "channels": channels,
+        "binned": bool(bins),
+        "shape": list(counts.shape),
+        "max": int(counts.max(initial=0)),
+        "segments": int(len(page_bounds)),
+        "matrix": counts.tolist(),
+        **page,
+    }
+
+
+@router.get("/xor")
+def get_xor_overlay(
+    source: str = Query(..., pattern="^(ecg|eeg)$"),
+    filename: str = Query(...),
+    channel: str = Query(...),
+    segment: str | None = Query(None, pattern="^(cycles|windows)$"),
+    window: float = Query(2.0, gt=0),
+    step: float | None = Query(None, gt=0),
+    n_points: int = Query(0, ge=0, le=20000, description="Resample chunks to n_points (0 = raw; cycles default to 200)"),
+    tolerance: float = Query(..., ge=0, description="Chunks closer than this (mean |diff|) cancel out"),
+    history: int = Query(analytics.XOR_HISTORY, ge=1, le=1000),
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(ANALYTICS_PAGE_SIZE, ge=1, le=MAX_ANALYTICS_PAGE),
+):
+    """
+    XOR overlay state after the chunks up to cursor + limit have arrived:
+    the chunks still shown, and the samples of the shown chunks from this page.
+
+    The overlay state at the end of each page is cached, so a client following
+    next_cursor only pays for the new chunks; any other cursor is replayed once.
+    """
+    signal = _load_signal(source, filename)
+    row = signal.row(channel)
+    segment = _default_segment(source, segment)
+    bounds = _segment_bounds(signal, segment, row, window, step)
+    page_bounds, page = _page(bounds, cursor, limit)
+
+    n_points = n_points or (200 if segment == "cycles" else 0)
+    key = (source, signal.file_path, signal.version, row, segment, window, step, n_points, tolerance, history)
+    state = _xor_states.get(key + (cursor,))
+    if state is None:
+        state = analytics.XorOverlay(tolerance, history)
+        state.push(_segments(signal.data[row], bounds[:cursor], n_points))
+    else:
+        state = state.copy()   # the cached state may be resumed again
+    chunks = _segments(signal.data[row], page_bounds, n_points)
+    min_diff = state.push(chunks)
+    _xor_states.put(key + (state.n_seen,), state)
+    shown = state.shown
+
+    return {
+        "channel": channel,
+        "shown": shown,
+        "min_diff": [None if np.isnan(d) else round(float(d), 4) for d in min_diff],
+        "chunks": {int(k): np.round(state.chunk(k).astype(np.float64), 4).tolist() for k in shown if k >= cursor},
+        "bounds": page_bounds.tolist(),
+        **page,
+    }
+
+
+@router.get("/xor/rolling")
+def get_rolling_xor(
+    source: str = Query(..., pattern="^(ecg|eeg)$"),
+    filename: str = Query(...),
+    channel: str = Query(...),
+    window: float = Query(2.0, gt=0, description="Chunk length (s)"),
+    lag: float | None = Query(None, gt=0, description="Distance to the compared chunk (s), defaults to window"),
+    step: float = Query(0.1, gt=0, description="Spacing of the output series (s)"),
+    start: float = Query(0.0, ge=0, description="First chunk start (s)"),
+    end: float | None = Query(None, description="Last chunk start (s), defaults to the end of the record"),
+):
+    """
+    Mean |x(t + u) - x(t + u - lag)| over u < window for chunk starts t in [start, end),
+    one value every ``step`` seconds. Only the samples those chunks touch are read.
+    """
+    signal = _load_signal(source, filename)
+    x = signal.data[signal.row(channel)]
+    fs = signal.fs
+    window_n = max(1, int(round(window * fs)))
+    lag_n = max(1, int(round((lag or window) * fs)))
+    step_n = max(1, int(round(step * fs)))
+
+    first = max(lag_n, int(np.ceil(start * fs)))
+    last = x.shape[0] - window_n if end is None else min(x.shape[0] - window_n, int(np.ceil(end * fs)) - 1)
+    if last < first:
+        values = np.empty(0)
+    else:
+        values = analytics.rolling_xor(x[first - lag_n:last + window_n], window_n, lag=lag_n, step=step_n)
+
+    return {
+        "channel": channel,
+        "start_time": first / fs,
+        "step_s": step_n / fs,
+        "values": np.round(values, 4).tolist(),
+    }
+
+
+@router.get("/polar")
+def get_polar_cycles(
+    source: str = Query(..., pattern="^(ecg|eeg)$"),
+    filename: str = Query(...),
+    channels: list[str] = Query(...),
+    segment: str | None = Query(None, pattern="^(cycles|windows)$"),
+    window: float = Query(2.0, gt=0),
+    step: float | None = Query(None, gt=0),
+    n_points: int = Query(200, ge=2, le=20000),
+    normalize: str = Query("minmax", pattern="^(minmax|abs|none)$"),
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(ANALYTICS_PAGE_SIZE, ge=1, le=MAX_ANALYTICS_PAGE),
+):
+    """
+    Each segment of each channel resampled to n_points as one polar revolution
+    (theta in degrees). ECG cycles follow the R-peaks of the first channel.
+    """
+    signal = _load_signal(source, filename)
+    rows = [signal.row(ch) for ch in channels]
+    bounds = _segment_bounds(signal, _default_segment(source, segment), rows[0], window, step)
+    page_bounds, page = _page(bounds, cursor, limit)
+
+    cycles = {}
+    theta = None
+    for ch, row in zip(channels, rows):
+        r, theta = analytics.polar_cycles(_segments(signal.data[row], page_bounds, n_points), normalize)
+        cycles[ch] = np.round(r.astype(np.float64), 4).tolist()
+
+    return {
+        "theta": theta.tolist(),
+        "cycles": cycles,
+        "bounds": page_bounds.tolist(),
+        **page,
+    }
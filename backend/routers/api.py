@@ -1,68 +1,62 @@
 # backend/routers/api.py
-from fastapi import APIRouter, UploadFile, File
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import APIRouter, UploadFile, File, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 import torch
-import torch.nn as nn
-import librosa
 import numpy as np
+import asyncio
+import json
 import os
-from uuid import uuid4
+import shutil
+import tempfile
 
-router = APIRouter()
+from ..services import drone_batch
+from ..services import drone_inference
+from ..services import model_registry
+from ..services import torch_runtime
+from ..services.drone_model import extract_features, load_trained_model
+from ..utils.cache_tools import LRUCache
+from ..utils.file_handler import ContentStore, extract_archive, is_archive
 
-UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+router = APIRouter()
 
 # -------------------------------
-# Define model
+# Upload store: one file per distinct clip, named by its SHA-256
 # -------------------------------
-class AudioClassifier(nn.Module):
-    def __init__(self):
-        super(AudioClassifier, self).__init__()
-        self.fc1 = nn.Linear(40, 128)
-        self.fc2 = nn.Linear(128, 64)
-        self.fc3 = nn.Linear(64, 2)
-        self.relu = nn.ReLU()
-        self.dropout = nn.Dropout(0.3)
-
-    def forward(self, x):
-        if x.ndim == 1:
-            x = x.unsqueeze(0)
-        x = self.relu(self.fc1(x))
-        x = self.dropout(self.relu(self.fc2(x)))
-        x = self.fc3(x)
-        return x
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.environ.get("DRONE_STORE_DIR", os.path.join(BACKEND_DIR, "cache", "drone_uploads"))
+STORE_MAX_BYTES = int(os.environ.get("DRONE_STORE_MAX_BYTES", 512 * 1024 * 1024))
+STORE_TTL_S = float(os.environ.get("DRONE_STORE_TTL_S", 7 * 24 * 3600))
+FEATURE_CACHE_BYTES = 16 * 1024 * 1024
 
-# -------------------------------
-# Feature extraction
-# -------------------------------
-def extract_features(file_path):
-    y, sr = librosa.load(file_path, sr=16000)
-    mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=40)
-    mfcc_scaled = np.mean(mfcc.T, axis=0)
-    return torch.tensor(mfcc_scaled, dtype=torch.float32)
+# MFCC vectors per clip digest, so repeat predictions skip feature extraction
+_features = LRUCache(FEATURE_CACHE_BYTES)
+store = ContentStore(STORE_DIR, STORE_MAX_BYTES, ttl_seconds=STORE_TTL_S or None, suffix=".wav",
+                     on_evict=_features.pop)
 
 # -------------------------------
-# Load model
+# Model: loaded on first use / background warm-up
 # -------------------------------
+MODEL_PATH = model_registry.pretrained_path("model.pth")
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model = AudioClassifier()
-model.load_state_dict(torch.load(
-    "backend/pretrained_models/model.pth",
-    map_location=device
-))
-model.to(device)
-model.eval()
+
+
+def _load_classifier():
+    model = load_trained_model(MODEL_PATH, device=device)
+    return torch_runtime.optimize(model, torch.zeros(1, 40, device=device))  # TORCH_RUNTIME / TORCH_QUANTIZE
+
+
+model_registry.register("drone_classifier", _load_classifier)
 
 label_map = {0: "Noise", 1: "Drone"}
 
 # -------------------------------
 # Audio streaming endpoint
 # -------------------------------
-@router.get("/play/{filename}")
-def play_audio(filename: str):
-    file_path = os.path.join(UPLOAD_FOLDER, filename)
-    if os.path.exists(file_path):
+@router.get("/play/{file_id}")
+def play_audio(file_id: str):
+    file_path = store.get(file_id.removesuffix(".wav"))
+    if file_path is not None:
         return FileResponse(file_path, media_type="audio/wav")
     else:
         return JSONResponse(content={"error": "File not found"}, status_code=404)
@@ -70,30 +64,280 @@ def play_audio(filename: str):
 # -------------------------------
 # Prediction API
 # -------------------------------
+# Sync route: the upload copy, feature extraction and inference run in the
+# threadpool instead of blocking the event loop.
 @router.post("/predict")
-async def predict(file: UploadFile = File(...)):
-    filename = f"{uuid4().hex}.wav"
-    save_path = os.path.join(UPLOAD_FOLDER, filename)
-    with open(save_path, "wb") as f:
-        f.write(await file.read())
-
+def predict(file: UploadFile = File(...)):
     try:
-        features = extract_features(save_path).unsqueeze(0).to(device)
-        with torch.no_grad():
-            outputs = model(features)
-            probs = torch.softmax(outputs, dim=1)[0]
-
-        probs_np = probs.cpu().numpy()
-        predicted_idx = int(np.argmax(probs_np))
-        pred_label = label_map[predicted_idx]
-        confidence = float(np.clip(probs_np[predicted_idx], 0.0, 1.0))
-        confidence = round(confidence * 100, 2)
-    except Exception as e:
-        os.remove(save_path)
-        return JSONResponse(content={"error": str(e)}, status_code=500)
+        model = model_registry.get("drone_classifier")
+    except model_registry.ModelUnavailable as e:
+        return JSONResponse(content={"error": str(e)}, status_code=503)
+
+    # A clip seen before keeps its stored file and its cached features; the
+    # file is held so concurrent uploads cannot evict it mid-request
+    with store.hold(file.file) as (file_id, file_path, created):
+        try:
+            features = _features.get_or_create(file_id, lambda: extract_features(file_path))
+            features = features.unsqueeze(0).to(device)
+            with torch.no_grad():
+                outputs = model(features)
+                probs = torch.softmax(outputs, dim=1)[0]
+
+            probs_np = probs.cpu().numpy()
+            predicted_idx = int(np.argmax(probs_np))
+            pred_label = label_map[predicted_idx]
+            confidence = float(np.clip(probs_np[predicted_idx], 0.0, 1.0))
+            confidence = round(confidence * 100, 2)
+        except Exception as e:
+            if created:
+                store.remove(file_id)
+            return JSONResponse(content={"error": str(e)}, status_code=500)
 
     return {
         "predicted_label": pred_label,
         "confidence": confidence,
-        "file_url": f"http://127.0.0.1:8000/api/api/play/{filename}"
+        "file_id": file_id,
+        "deduplicated": not created,
+        "file_url": f"http://127.0.0.1:8000/play/{file_id}"
+    }
+
+
+# -------------------------------
+# Long recordings: per-window detection timeline
+# -------------------------------
+@router.post("/predict/timeline")
+def predict_timeline(
+    file: UploadFile = File(...),
+    window_s: float = Query(drone_inference.WINDOW_S, gt=0, le=30),
+    hop_s: float = Query(drone_inference.HOP_S, gt=0, le=30),
+    threshold: float = Query(drone_inference.THRESHOLD, ge=0, le=1),
+    min_gap_s: float = Query(0.0, ge=0, description="Detections at most this far apart are merged"),
+):
+    """
+    Drone probability of every window_s window (one every hop_s seconds) and
+    the merged intervals where it reaches threshold. The recording is decoded
+    block by block, so memory does not grow with its length.
+    """
+    try:
+        model = model_registry.get("drone_classifier")
+    except model_registry.ModelUnavailable as e:
+        return JSONResponse(content={"error": str(e)}, status_code=503)
+
+    detector = drone_inference.SlidingWindowDetector(model, device, window_s=window_s, hop_s=hop_s)
+    with store.hold(file.file) as (file_id, file_path, created):
+        try:
+            result = detector.timeline(file_path, threshold=threshold, min_gap_s=min_gap_s)
+        except ValueError as e:
+            if created:
+                store.remove(file_id)
+            return JSONResponse(content={"error": str(e)}, status_code=400)
+        except Exception as e:
+            if created:
+                store.remove(file_id)
+            return JSONResponse(content={"error": str(e)}, status_code=500)
+
+    return {
+        "file_id": file_id,
+        "duration_s": round(result["duration_s"], 3),
+        "window_s": result["window_s"],
+        "hop_s": result["hop_s"],
+        "threshold": threshold,
+        "times_s": np.round(result["times_s"], 3).tolist(),
+        "drone_probability": np.round(result["drone_probability"].astype(np.float64), 4).tolist(),
+        "intervals": [
+            {k: round(v, 4) if isinstance(v, float) else v for k, v in interval.items()}
+            for interval in result["intervals"]
+        ],
+        "drone_detected": bool(result["intervals"]),
+        "file_url": f"http://127.0.0.1:8000/play/{file_id}"
     }
+
+
+# -------------------------------
+# Live detection (WebSocket over raw PCM)
+# -------------------------------
+LIVE_MAX_CONNECTIONS = int(os.environ.get("DRONE_WS_MAX_CONNECTIONS", 8))
+PCM_DTYPES = {"int16": (np.dtype("<i2"), 1.0 / 32768), "float32": (np.dtype("<f4"), 1.0)}
+
+_live_connections = 0
+
+
+@router.websocket("/ws/drone")
+async def detect_live(
+    websocket: WebSocket,
+    sample_rate: int = Query(16000, ge=8000, le=192000),
+    dtype: str = Query("int16", description="int16 or float32, little-endian"),
+    channels: int = Query(1, ge=1, le=8, description="Interleaved channels, mixed to mono"),
+    window_s: float = Query(drone_inference.WINDOW_S, ge=0.2, le=10),
+    hop_s: float = Query(drone_inference.HOP_S, gt=0, le=10),
+):
+    """
+    Live drone detection. The client sends binary messages of raw PCM (any
+    length, split frames are carried over) and may send {"type": "reset"}.
+    The server answers with {"type": "meta"} once and then one
+    {"type": "prediction", "label", "drone_probability", "noise_probability",
+    "start_s", "end_s", "window", "latency_ms"} per completed window, i.e.
+    every hop (rounded to whole STFT hops) once the first window is full.
+    Each connection keeps its own ring buffer and STFT frames; at most
+    LIVE_MAX_CONNECTIONS streams run at once (others are closed with 1013).
+    """
+    global _live_connections
+    await websocket.accept()
+    if _live_connections >= LIVE_MAX_CONNECTIONS:
+        await websocket.send_json({"type": "error", "detail": "Too many live detection streams, try again later"})
+        await websocket.close(code=1013)
+        return
+
+    _live_connections += 1
+    try:
+        if dtype not in PCM_DTYPES:
+            await websocket.send_json({"type": "error", "detail": "dtype must be 'int16' or 'float32'"})
+            await websocket.close(code=1003)
+            return
+        try:
+            model = await asyncio.to_thread(model_registry.get, "drone_classifier")
+        except model_registry.ModelUnavailable as e:
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            await websocket.close(code=1011)
+            return
+
+        def new_detector():
+            return drone_inference.LiveDetector(model, sample_rate, window_s=window_s, hop_s=hop_s, device=device)
+
+        detector = new_detector()
+        np_dtype, scale = PCM_DTYPES[dtype]
+        frame_bytes = np_dtype.itemsize * channels
+        partial = b""
+        await websocket.send_json({
+            "type": "meta",
+            "sample_rate": sample_rate,
+            "dtype": dtype,
+            "channels": channels,
+            "window_s": detector.window / detector.sr,
+            "hop_s": detector.hop / detector.sr,
+            "labels": [label_map[0], label_map[1]],
+        })
+
+        loop = asyncio.get_running_loop()
+        while True:
+            msg = await websocket.receive()
+            if msg["type"] == "websocket.disconnect":
+                return
+            if msg.get("text") is not None:
+                try:
+                    control = json.loads(msg["text"])
+                except ValueError:
+                    control = None
+                if isinstance(control, dict) and control.get("type") == "reset":
+                    detector, partial = new_detector(), b""
+                else:
+                    await websocket.send_json({"type": "error", "detail": f"Unknown control message: {msg['text']}"})
+                continue
+
+            received = loop.time()
+            data = partial + (msg.get("bytes") or b"")
+            usable = len(data) // frame_bytes * frame_bytes
+            partial = data[usable:]
+            pcm = np.frombuffer(data, dtype=np_dtype, count=usable // np_dtype.itemsize).reshape(-1, channels)
+            mono = (pcm.mean(axis=1, dtype=np.float32) if channels > 1 else pcm[:, 0].astype(np.float32)) * scale
+            try:
+                results = await asyncio.to_thread(detector.push, mono)
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            latency_ms = round((loop.time() - received) * 1000, 2)
+            for result in results:
+                label = label_map[int(result["drone_probability"] >= 0.5)]
+                await websocket.send_json({"type": "prediction", "label": label, "latency_ms": latency_ms, **result})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        _live_connections -= 1
+
+
+# -------------------------------
+# Batch classification (archive upload or server-side directory)
+# -------------------------------
+# Server-side directories must lie under this root
+BATCH_ROOT = os.path.realpath(os.environ.get("DRONE_BATCH_ROOT", os.path.dirname(BACKEND_DIR)))
+
+
+class BatchDirectoryRequest(BaseModel):
+    directory: str
+    recursive: bool = True
+    format: str = "ndjson"
+    batch_size: int = Field(drone_batch.BATCH_SIZE, ge=1, le=drone_batch.BATCH_MAX_SIZE)
+
+
+def _batch_response(files, output_format, batch_size, cleanup=None):
+    """Stream per-file results of drone_batch.iter_classify as NDJSON or CSV."""
+    try:
+        model = model_registry.get("drone_classifier")
+    except model_registry.ModelUnavailable as e:
+        if cleanup:
+            cleanup()
+        return JSONResponse(content={"error": str(e)}, status_code=503)
+    formatter, media_type = drone_batch.FORMATS[output_format]
+
+    def _stream():
+        try:
+            results = drone_batch.iter_classify(model, files, drone_batch.shared_pool(),
+                                                batch_size=max(1, batch_size), device=device)
+            yield from formatter(results)
+        finally:
+            if cleanup:
+                cleanup()
+
+    return StreamingResponse(_stream(), media_type=media_type)
+
+
+@router.post("/predict/batch")
+def predict_batch(
+    archive: UploadFile = File(...),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(drone_batch.BATCH_SIZE, ge=1, le=drone_batch.BATCH_MAX_SIZE),
+):
+    """
+    Classify every audio file of a zip / tar archive. Features are extracted
+    on a process pool and the classifier runs in large batches; one line per
+    file streams back as it is classified, then a throughput summary
+    (NDJSON {"summary": ...} or a trailing "# ..." CSV comment).
+    """
+    if not is_archive(archive.filename or ""):
+        return JSONResponse(content={"error": "Upload a .zip or .tar(.gz) archive of audio files."}, status_code=400)
+
+    workdir = tempfile.mkdtemp(prefix="drone-batch-")
+    cleanup = lambda: shutil.rmtree(workdir, ignore_errors=True)
+    try:
+        paths = extract_archive(archive.file, archive.filename, workdir, extensions=drone_batch.AUDIO_EXTENSIONS)
+    except Exception as e:
+        cleanup()
+        return JSONResponse(content={"error": f"Failed to read archive: {e}"}, status_code=400)
+    if not paths:
+        cleanup()
+        return JSONResponse(content={"error": "No audio files found in archive."}, status_code=400)
+
+    files = [(os.path.basename(p), p) for p in sorted(paths)]
+    return _batch_response(files, format, batch_size, cleanup)
+
+
+@router.post("/predict/batch/directory")
+def predict_batch_directory(req: BatchDirectoryRequest):
+    """Same as /predict/batch for a directory on the server (under DRONE_BATCH_ROOT)."""
+    if req.format not in drone_batch.FORMATS:
+        return JSONResponse(content={"error": "format must be 'ndjson' or 'csv'"}, status_code=400)
+    directory = os.path.realpath(os.path.join(BATCH_ROOT, req.directory))
+    if os.path.commonpath([directory, BATCH_ROOT]) != BATCH_ROOT:
+        return JSONResponse(content={"error": "Directory is outside the batch root"}, status_code=403)
+    if not os.path.isdir(directory):
+        return JSONResponse(content={"error": "Directory not found"}, status_code=404)
+
+    files = drone_batch.list_audio_files(directory, recursive=req.recursive)
+    if not files:
+        return JSONResponse(content={"error": "No audio files found in directory."}, status_code=400)
+    return _batch_response(files, req.format, req.batch_size)
+
+
+@router.get("/store/stats")
+def store_stats():
+    return {**store.stats(), "feature_cache": _features.stats()}
@@ -1,13 +1,22 @@
 # file: <your_router_file>.py
 import os
+import json
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import numpy as np
 from fastapi import APIRouter, HTTPException, Query, WebSocket, File, UploadFile
+from fastapi.responses import StreamingResponse
 from typing import List
 import asyncio
-import wfdb
-from pydantic import BaseModel
-from keras.models import load_model
+from pydantic import BaseModel, Field
 from ..services import ecg_processing as dsp
+from ..services import ecg_cache
+from ..services.ecg_inference import KerasPredictor
+from ..services import model_registry
+from ..utils.stream_tools import DTYPE_CODES, StreamSource, run_player
+from ..utils.file_handler import ECG_UPLOAD_DIR, extract_archive, is_archive
 from ..services import models_processing as dsp_models
 
 # -------------------
@@ -16,25 +25,43 @@ from ..services import models_processing as dsp_models
 TARGET_FS = 400            # model expected sampling frequency from your test script
 TARGET_LENGTH = 4096       # model expected input length (samples) from test script
 MODEL_FILENAME = "model.hdf5"  # path to the 6-class pretrained model (update name/path if needed)
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "../pretrained_models", MODEL_FILENAME)
+MODEL_PATH = model_registry.pretrained_path(MODEL_FILENAME)
 BINARY_MODEL_FILENAME = "ResNet_finetuned_binary2.h5"
-BINARY_MODEL_PATH = os.path.join(os.path.dirname(__file__), "../pretrained_models", BINARY_MODEL_FILENAME)
+BINARY_MODEL_PATH = model_registry.pretrained_path(BINARY_MODEL_FILENAME)
 
 
 # 6-class abnormalities (as in your test script)
 CLASSES = ["1dAVb", "RBBB", "LBBB", "SB", "AF", "ST"]
+CONFIDENCE_THRESHOLD = 0.3  # below this the binary fallback model decides
+
+# Bulk classification: records per stacked inference batch / preprocessing threads
+BULK_BATCH_SIZE = 64
+BULK_MAX_BATCH_SIZE = 256   # 2x this many preprocessed records are held in flight
+BULK_WORKERS = min(8, os.cpu_count() or 1)
 
 router = APIRouter()
 
-# Load model once at module import
-if not os.path.exists(MODEL_PATH):
-    raise RuntimeError(f"Pretrained model not found at: {MODEL_PATH}")
-model = load_model(MODEL_PATH, compile=False)
 
-if not os.path.exists(BINARY_MODEL_PATH):
-    raise RuntimeError(f"Binary model not found at: {BINARY_MODEL_PATH}")
+# Models load on first use / background warm-up (services/model_registry.py)
+def _keras_predictor(path):
+    """Load a Keras model and wrap it in a traced, warmed-up KerasPredictor (services/ecg_inference.py)."""
+    def _load():
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Pretrained model not found at: {path}")
+        from keras.models import load_model  # TensorFlow import is deferred to here
+        return KerasPredictor(load_model(path, compile=False)).warmup()
+    return _load
+
+
+model_registry.register("ecg_multiclass", _keras_predictor(MODEL_PATH))
+model_registry.register("ecg_binary", _keras_predictor(BINARY_MODEL_PATH))
 
-binary_model = load_model(BINARY_MODEL_PATH, compile=False)
+
+def _get_predictors():
+    try:
+        return model_registry.get("ecg_multiclass"), model_registry.get("ecg_binary")
+    except model_registry.ModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 
 class ClassifyRequest(BaseModel):
@@ -42,7 +69,7 @@ class ClassifyRequest(BaseModel):
     data_folder: str = "services/data"
 
 
-UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "../uploaded_data")
+UPLOAD_FOLDER = ECG_UPLOAD_DIR
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 
@@ -51,109 +78,353 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 def get_ecg(
     filename: str = Query(..., description="Uploaded ECG base name"),
     leads: List[int] = Query([0, 1, 2], description="List of lead indices"),
+    cycle_mode: str = Query("full", description="full: cycle samples, indices: [start, end) bounds only, none: no cycles"),
 ):
+    if cycle_mode not in ("full", "indices", "none"):
+        raise HTTPException(status_code=400, detail="cycle_mode must be 'full', 'indices' or 'none'")
+
     file_path = os.path.join(UPLOAD_FOLDER, filename)
-    signals, fs, lead_names = dsp.load_ecg_record_from_path(file_path)
+    record = ecg_cache.load_record(file_path)
+    signals, fs, lead_names = record.filtered, record.fs, record.sig_name
 
-    r_peaks_dict = dsp.get_r_peaks_per_lead(signals, fs, leads=leads)
-    cycles = dsp.extract_cycles(signals, r_peaks_dict, selected_leads=leads)
+    r_peaks_dict = ecg_cache.get_r_peaks(file_path, leads=leads)
 
-    return {
+    response = {
         "signals": signals[:, leads].astype(float).tolist(),
         "fs": float(fs),
         "r_peaks": {int(k): [int(x) for x in v] for k, v in r_peaks_dict.items()},
-        "cycles": {int(k): [[float(x) for x in cycle] for cycle in v] for k, v in cycles.items()},
         "lead_names": [str(name) for name in lead_names],
     }
+    if cycle_mode == "full":
+        cycles = dsp.extract_cycles(signals, r_peaks_dict, selected_leads=leads)
+        response["cycles"] = {int(k): [[float(x) for x in cycle] for cycle in v] for k, v in cycles.items()}
+    elif cycle_mode == "indices":
+        bounds = dsp.cycle_bounds(r_peaks_dict)
+        response["cycle_bounds"] = {int(k): v.tolist() for k, v in bounds.items()}
+    return response
+
+
+# --- Beat-aligned cycle matrix + template ---
+@router.get("/ecg/beats")
+def get_ecg_beats(
+    filename: str = Query(..., description="Uploaded ECG base name"),
+    leads: List[int] = Query([0, 1, 2], description="List of lead indices"),
+    n_points: int = Query(200, ge=2, le=2000, description="Samples per resampled beat"),
+    template: str = Query("median", description="median or mean"),
+):
+    """
+    Every R-R cycle resampled to n_points (float32), plus a template beat per lead.
+    """
+    if template not in ("median", "mean"):
+        raise HTTPException(status_code=400, detail="template must be 'median' or 'mean'")
+
+    file_path = os.path.join(UPLOAD_FOLDER, filename)
+    record = ecg_cache.load_record(file_path)
+    r_peaks_dict = ecg_cache.get_r_peaks(file_path, leads=leads)
+    bounds = dsp.cycle_bounds(r_peaks_dict)
+
+    result = {}
+    for lead, r_peaks in r_peaks_dict.items():
+        beats = dsp.beat_matrix(record.filtered[:, lead], r_peaks, n_points=n_points)
+        result[int(lead)] = {
+            "beats": beats.tolist(),
+            "template": dsp.beat_template(beats, method=template).tolist(),
+            "cycle_bounds": bounds[lead].tolist(),
+        }
+
+    return {
+        "fs": float(record.fs),
+        "n_points": n_points,
+        "template": template,
+        "leads": result,
+    }
+
+# --- Zoomable range query (min/max pyramid) ---
+@router.get("/range")
+def get_ecg_range(
+    filename: str = Query(..., description="Uploaded ECG base name"),
+    leads: List[int] = Query([0, 1, 2], description="List of lead indices"),
+    start: float = Query(0.0, ge=0, description="Start time (s)"),
+    end: float | None = Query(None, description="End time (s), defaults to the end of the record"),
+    max_points: int = Query(2000, ge=1, le=100000, description="Max buckets per lead (≈ plot width in px)"),
+):
+    """
+    Min/max envelope of the filtered leads over [start, end), served from the
+    pyramid level that matches the requested resolution.
+    """
+    file_path = os.path.join(UPLOAD_FOLDER, filename)
+    pyramid = ecg_cache.get_pyramid(file_path)
+    if any(lead < 0 or lead >= len(pyramid.channels) for lead in leads):
+        raise HTTPException(status_code=400, detail="Lead index out of range")
+
+    result = pyramid.query(start, end, max_points, picks=leads)
+    result["leads"] = [int(lead) for lead in leads]
+    result["lead_names"] = [pyramid.channels[lead] for lead in leads]
+    return result
+
+
+# --- WebSocket streaming ECG samples ---
+class ECGStreamSource(StreamSource):
+    """Filtered record + cached R-peaks of one uploaded ECG, for run_player."""
+
+    def __init__(self, file_path, leads):
+        super().__init__()
+        self.file_path = file_path
+        self.record = ecg_cache.load_record(file_path)
+        self.fs = self.record.fs
+        self.n_samples = self.record.filtered.shape[0]
+        self.channel_names = self.record.sig_name
+        self.select(leads)
+
+    def select(self, channels):
+        leads = [int(lead) for lead in channels]
+        if not leads or any(lead < 0 or lead >= len(self.channel_names) for lead in leads):
+            raise ValueError(f"Leads must be indices in [0, {len(self.channel_names) - 1}]")
+        r_peaks = ecg_cache.get_r_peaks(self.file_path, leads=leads)
+        self._peaks = [np.asarray(r_peaks[lead], dtype=np.int64) for lead in leads]
+        self.selected = leads
+        return leads
+
+    def read(self, start, stop):
+        return self.record.filtered[start:stop, self.selected]
+
+    def peaks(self, start, stop):
+        return [p[np.searchsorted(p, start):np.searchsorted(p, stop)] for p in self._peaks]
+
 
-# --- WebSocket streaming ECG samples (unchanged) ---
 @router.websocket("/ws/ecg/{record_number}")
-async def stream_ecg(websocket: WebSocket, record_number: str):
+async def stream_ecg(
+    websocket: WebSocket,
+    record_number: str,
+    leads: List[int] = Query([0, 1, 2]),
+    dtype: str = Query("float32", description="float32 or int16 (per-frame scaled)"),
+    speed: float = Query(1.0),
+    chunk: int = Query(50, ge=1, le=5000, description="Samples per frame at 1x"),
+):
+    """
+    Binary real-time playback of the filtered record (see utils/stream_tools.py
+    for the frame layout and the seek / speed / leads control messages).
+    """
     await websocket.accept()
     try:
-        signals, fs = dsp.load_ecg_record(record_number)
-        r_peaks = dsp.get_r_peaks(signals, fs, lead=0)
-
-        window_size = 50  # send samples in chunks
-        for i in range(0, len(signals), window_size):
-            chunk = signals[i:i+window_size, :3].tolist()  # first 3 leads for now
-            chunk_peaks = [p for p in r_peaks if i <= p < i + window_size]
-
-            await websocket.send_json({
-                "samples": chunk,
-                "start_index": i,
-                "fs": fs,
-                "peaks": chunk_peaks
-            })
-
-            await asyncio.sleep(window_size / fs)
+        if dtype not in DTYPE_CODES:
+            raise ValueError("dtype must be 'float32' or 'int16'")
+        source = await asyncio.to_thread(
+            ECGStreamSource, os.path.join(UPLOAD_FOLDER, record_number), leads
+        )
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": f"Failed to open record: {e}"})
+        await websocket.close(code=1011)
+        return
+
+    try:
+        await run_player(websocket, source, dtype=dtype, speed=speed, chunk=chunk)
     finally:
-        await websocket.close()
+        try:
+            await websocket.close()
+        except RuntimeError:
+            pass  # already closed by the client
 
 
 # --- ECG classification endpoint (REPLACED) ---
+def _abnormal_probability(binary_out):
+    """(n, 1) sigmoid or (n, 2) softmax [p_normal, p_abnormal] output -> (n,) p_abnormal."""
+    binary_out = np.asarray(binary_out)
+    binary_out = binary_out.reshape(binary_out.shape[0], -1)
+    return binary_out[:, 0] if binary_out.shape[1] == 1 else binary_out[:, 1]
+
+
+def _classification_result(probs, model_input_shape, prob_abnormal=None):
+    """Two-stage decision: 6-class label if confident enough, else the binary model's verdict."""
+    probs = np.asarray(probs, dtype=float).flatten()
+    label_idx = int(np.argmax(probs))
+    probabilities = {cls: float(p) for cls, p in zip(CLASSES, probs)}
+
+    if prob_abnormal is None:
+        label, confidence = CLASSES[label_idx], float(probs[label_idx])
+    elif prob_abnormal < 0.5:
+        label, confidence = "Normal ECG", float(1 - prob_abnormal)
+    else:
+        label, confidence = "Other Cardiac Abnormalities", float(prob_abnormal)
+
+    return {
+        "label": label,
+        "confidence": confidence,
+        "probabilities": probabilities,  # still return 6-class probs
+        "model_input_shape": model_input_shape
+    }
+
+
+def _preprocess_multi(rec):
+    return dsp_models.preprocess_ecg_with_mapping_from_record(
+        rec,
+        target_fs=TARGET_FS,
+        target_length=TARGET_LENGTH,
+        plot_signal=False
+    ).astype(np.float32)
+
+
 @router.post("/classify")
 def classify_record(req: ClassifyRequest):
+    predict_multi, predict_binary = _get_predictors()
     file_path = os.path.join(UPLOAD_FOLDER, req.record_number)
 
     try:
-        rec = wfdb.rdrecord(file_path)
+        rec = ecg_cache.load_record(file_path)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to read record: {e}")
 
     # --- Preprocess for 6-class model ---
     try:
-        X_multi = dsp_models.preprocess_ecg_with_mapping_from_record(
-            rec,
-            target_fs=TARGET_FS,
-            target_length=TARGET_LENGTH,
-            plot_signal=False
-        ).astype(np.float32)
+        X_multi = _preprocess_multi(rec)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Preprocessing failed: {e}")
 
     # --- Run 6-class model ---
-    probs = model.predict(X_multi).flatten().tolist()
-    label_idx = int(np.argmax(probs))
-    label = CLASSES[label_idx]
-    confidence = float(probs[label_idx])
-    probabilities = {cls: float(p) for cls, p in zip(CLASSES, probs)}
+    probs = predict_multi(X_multi).flatten()
 
     # --- Decision logic ---
-    if confidence >= 0.3:
-        return {
-            "label": label,
-            "confidence": confidence,
-            "probabilities": probabilities,
-            "model_input_shape": X_multi.shape
-        }
+    if probs.max() >= CONFIDENCE_THRESHOLD:
+        return _classification_result(probs, X_multi.shape)
 
-    # --- Preprocess for binary model ---
+    # --- Preprocess for binary model + run binary model ---
     X_binary = dsp_models.preprocess_for_binary_model(rec)
+    prob_abnormal = float(_abnormal_probability(predict_binary(X_binary))[0])
+    return _classification_result(probs, X_multi.shape, prob_abnormal)
 
-    # --- Run binary model ---
-    binary_prob = binary_model.predict(X_binary).flatten()
-    if binary_prob.shape[0] == 1:  
-        # sigmoid output
-        prob_abnormal = float(binary_prob[0])
-    else:
-        # softmax output [p_normal, p_abnormal]
-        prob_abnormal = float(binary_prob[1])
-
-    if prob_abnormal < 0.5:
-        return {
-            "label": "Normal ECG",
-            "confidence": float(1 - prob_abnormal),
-            "probabilities": probabilities,  # still return 6-class probs
-            "model_input_shape": X_multi.shape
-        }
-    else:
-        return {
-            "label": "Other Cardiac Abnormalities",
-            "confidence": prob_abnormal,
-            "probabilities": probabilities,  # still return 6-class probs
-            "model_input_shape": X_multi.shape
-        }
+
+# --- Bulk classification (streamed NDJSON) ---
+class BulkClassifyRequest(BaseModel):
+    record_numbers: List[str]
+    batch_size: int = Field(BULK_BATCH_SIZE, ge=1, le=BULK_MAX_BATCH_SIZE)
+
+
+def _run_batch(pool, batch, predict_multi, predict_binary):
+    """One stacked 6-class pass, then one binary pass over the low-confidence subset."""
+    X = np.concatenate([x for _, _, x in batch])
+    probs = predict_multi(X)
+
+    low = np.flatnonzero(probs.max(axis=1) < CONFIDENCE_THRESHOLD)
+    prob_abnormal = {}
+    if len(low):
+        X_binary = np.concatenate(list(pool.map(dsp_models.preprocess_for_binary_model, [batch[i][1] for i in low])))
+        p = _abnormal_probability(predict_binary(X_binary))
+        prob_abnormal = {int(i): float(v) for i, v in zip(low, p)}
+
+    for i, (name, _, x) in enumerate(batch):
+        result = _classification_result(probs[i], x.shape, prob_abnormal.get(i))
+        yield json.dumps({"record": name, **result}) + "\n"
+
+
+def _classify_stream(names, read_record, predictors, batch_size, cleanup=None):
+    """
+    Preprocess records on a thread pool (bounded number in flight), classify
+    them in stacked batches and yield one NDJSON line per record, then a summary.
+    """
+    batch_size = max(1, int(batch_size))
+    started = time.perf_counter()
+    done = errors = 0
+
+    def _prepare(name):
+        rec = read_record(name)
+        return rec, _preprocess_multi(rec)
+
+    try:
+        with ThreadPoolExecutor(max_workers=BULK_WORKERS) as pool:
+            queue = iter(names)
+            in_flight = {}
+            batch = []
+
+            def _fill():
+                while len(in_flight) < 2 * batch_size:
+                    name = next(queue, None)
+                    if name is None:
+                        return
+                    in_flight[pool.submit(_prepare, name)] = name
+
+            _fill()
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = in_flight.pop(future)
+                    try:
+                        rec, x = future.result()
+                        batch.append((name, rec, x))
+                    except Exception as e:
+                        errors += 1
+                        yield json.dumps({"record": name, "error": f"Failed to preprocess record: {e}"}) + "\n"
+                _fill()
+
+                # the last, partial batch is flushed once nothing is left in flight
+                while len(batch) >= batch_size or (batch and not in_flight):
+                    for line in _run_batch(pool, batch[:batch_size], *predictors):
+                        done += 1
+                        yield line
+                    batch = batch[batch_size:]
+
+        elapsed = time.perf_counter() - started
+        yield json.dumps({"summary": {
+            "classified": done,
+            "errors": errors,
+            "seconds": elapsed,
+            "records_per_second": done / elapsed if elapsed > 0 else 0.0,
+        }}) + "\n"
+    finally:
+        if cleanup:
+            cleanup()
+
+
+@router.post("/classify/bulk")
+def classify_bulk(req: BulkClassifyRequest):
+    """
+    Classify many uploaded records. Streams one JSON object per line
+    ({"record": ..., "label": ...} or {"record": ..., "error": ...}) as batches finish.
+    """
+    if not req.record_numbers:
+        raise HTTPException(status_code=400, detail="record_numbers must not be empty")
+    predictors = _get_predictors()
+
+    def _read(name):
+        return ecg_cache.read_record(os.path.join(UPLOAD_FOLDER, name))
+
+    return StreamingResponse(
+        _classify_stream(req.record_numbers, _read, predictors, req.batch_size),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.post("/classify/bulk/upload")
+def classify_bulk_archive(archive: UploadFile = File(...), batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=BULK_MAX_BATCH_SIZE)):
+    """Same as /classify/bulk for a zip / tar of .dat + .hea pairs."""
+    if not is_archive(archive.filename or ""):
+        raise HTTPException(status_code=400, detail="Upload a .zip or .tar(.gz) archive of .dat/.hea files.")
+    predictors = _get_predictors()
+
+    workdir = tempfile.mkdtemp(prefix="ecg-bulk-")
+    try:
+        paths = extract_archive(archive.file, archive.filename, workdir, extensions=(".dat", ".hea"))
+    except Exception as e:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail=f"Failed to read archive: {e}")
+
+    names = sorted(os.path.splitext(os.path.basename(p))[0] for p in paths if p.lower().endswith(".hea"))
+    if not names:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail="No .hea headers found in archive.")
+
+    def _read(name):
+        return ecg_cache.read_record(os.path.join(workdir, name))
+
+    return StreamingResponse(
+        _classify_stream(names, _read, predictors, batch_size, cleanup=lambda: shutil.rmtree(workdir, ignore_errors=True)),
+        media_type="application/x-ndjson",
+    )
+
+
+# --- Record cache statistics ---
+@router.get("/cache/stats")
+def get_cache_stats():
+    return ecg_cache.cache_stats()
 
 
 # --- ECG file upload endpoint (unchanged) ---
@@ -1,35 +1,66 @@
-from fastapi import APIRouter, HTTPException, Query, UploadFile, File
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, UploadFile, File, WebSocket
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
 import os
+import shutil
 import tempfile
 import torch
 import numpy as np
 
 from ..services.eeg_model import load_trained_model
+from ..services import model_registry
+from ..services import decimation
+from ..services import eeg_cache
+from ..services import eeg_inference
+from ..services import eeg_spectral
+from ..services import torch_runtime
+from ..utils.cache_tools import file_fingerprint
+from ..utils.file_handler import EEG_UPLOAD_DIR
+from ..utils.stream_tools import DTYPE_CODES, StreamSource, encode_frame, run_player
 from ..services.eeg_processing import (
+    LOWPASS_HZ,
     load_raw,
+    load_window,
+    read_header,
     preprocess_raw,
+    resample_data,
     to_microvolts,
-    standardize,
 )
 
 router = APIRouter()
 
 # ------------------------------------------------------------
-#   Load model once at startup
+#   Model: loaded on first use / background warm-up
 # ------------------------------------------------------------
-MODEL_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), "..", "pretrained_models", "eeg_model.pth")
-)
+MODEL_PATH = model_registry.pretrained_path("eeg_model.pth")
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model = load_trained_model(MODEL_PATH, device=device)
+
+
+def _load_classifier():
+    eeg_inference.configure_threads()
+    model = load_trained_model(MODEL_PATH, device=device)
+    example = torch.zeros(1, 1, 19, eeg_inference.WINDOW_SIZE, device=device)
+    return torch_runtime.optimize(model, example)  # TORCH_RUNTIME / TORCH_QUANTIZE
+
+
+model_registry.register("eeg_classifier", _load_classifier)
 
 CLASS_NAMES = ["Alzheimer", "Dementia", "Epilepsy", "Healthy", "Schizophrenia"]
 
+# /segments pagination: default and maximum segments per page
+SEGMENTS_PAGE_SIZE = 30
+MAX_SEGMENTS_PAGE = 1000
+
+# WebSocket player: speed range and disk block size used before the store is cached
+PLAYER_MIN_SPEED, PLAYER_MAX_SPEED = 0.25, 4.0
+PLAYER_BLOCK_S = 10.0
+
 # ------------------------------------------------------------
 #   Upload directory
 # ------------------------------------------------------------
-UPLOAD_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "uploads"))
+UPLOAD_DIR = EEG_UPLOAD_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
@@ -40,86 +71,421 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 @router.post("/upload")
 async def upload_eeg_file(file: UploadFile = File(...)):
     """
-    Upload EEG file and return metadata
+    Upload EEG file and return metadata (read from the header only)
     """
     file_path = os.path.join(UPLOAD_DIR, file.filename)
     with open(file_path, "wb") as f:
-        f.write(await file.read())
+        shutil.copyfileobj(file.file, f)
 
     try:
-        raw = load_raw(file_path)
+        header = read_header(file_path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to load EEG file: {e}")
 
-    return {
-        "filename": file.filename,
-        "sfreq": float(raw.info["sfreq"]),
-        "n_channels": len(raw.info["ch_names"]),
-        "duration_seconds": raw.n_times / raw.info["sfreq"],
-        "channels": raw.info["ch_names"],
-    }
+    return {"filename": file.filename, **header}
 
 
 @router.get("/segments")
 def get_segments(
     filename: str = Query(...),
     channels: list[str] | None = Query(None),
-    segment_duration: float = Query(2.0),
+    segment_duration: float = Query(2.0, gt=0),
     highpass: float = Query(0.5),
     resample_to: float | None = Query(None),
+    start: float | None = Query(None, ge=0, description="Window start (s); only this window is read from disk"),
+    end: float | None = Query(None, description="Window end (s), defaults to start + segment_duration"),
+    reference: str = Query("average", pattern="^(average|none)$"),
+    cursor: int | None = Query(None, ge=0, description="Index of the first segment to return (pagination)"),
+    limit: int | None = Query(None, ge=1, le=MAX_SEGMENTS_PAGE, description="Segments per page"),
+    format: str = Query("json", pattern="^(json|compact|f32)$"),
 ):
     """
     Return fixed-length EEG segments, filtered & converted to µV.
+    Without start/end the whole file is processed; with them only the window
+    (plus filter padding) is read, and with reference="none" only the picked channels.
+
+    cursor/limit page through the segments (next_cursor is null on the last page).
+    format:
+        json     legacy: per-segment (samples, ch) lists plus per-sample segment_times
+        compact  segments + start_time, fs and segment_samples instead of per-sample times
+        f32      one binary float32 frame (utils/stream_tools.py layout), metadata in X-EEG-* headers
     """
     file_path = os.path.join(UPLOAD_DIR, filename)
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
 
+    paged = cursor is not None or limit is not None
+    if paged and (start is not None or end is not None):
+        raise HTTPException(status_code=400, detail="Use either start/end or cursor/limit")
+    windowed = paged or start is not None or end is not None
+    cached = header = None
     try:
-        raw = load_raw(file_path)
-        raw = preprocess_raw(raw, highpass=highpass, resample_to=resample_to)
+        if windowed:
+            # an already preprocessed file answers a window with a slice
+            cached = eeg_cache.peek(file_path, highpass, resample_to, reference)
+            if cached is None:
+                header = read_header(file_path)
+            all_channels = cached.ch_names if cached else header["channels"]
+        else:
+            cached = eeg_cache.get_preprocessed(file_path, highpass, resample_to, reference)
+            all_channels = cached.ch_names
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to preprocess EEG: {e}")
 
     if not channels:
-        channels = raw.info["ch_names"]
+        channels = all_channels
 
-    picks = [ch for ch in channels if ch in raw.info["ch_names"]]
+    picks = [ch for ch in channels if ch in all_channels]
     if not picks:
         raise HTTPException(status_code=400, detail="No valid channels selected")
 
-    data, times = raw.get_data(picks=picks, return_times=True)  # V
-    data_uV = to_microvolts(data)                               # µV
-    fs = raw.info["sfreq"]
+    # output rate and segment grid are known before reading any samples
+    fs = cached.fs if cached else float(resample_to or header["sfreq"])
     samples_per_segment = int(segment_duration * fs)
+    if samples_per_segment < 1:
+        raise HTTPException(status_code=400, detail="segment_duration is shorter than one sample")
+    total_samples = cached.n_samples if cached else int(round(header["duration_seconds"] * fs))
+    total_segments = total_samples // samples_per_segment
+
+    offset = 0.0
+    if paged:
+        cursor = cursor or 0
+        limit = limit or SEGMENTS_PAGE_SIZE
+        offset = cursor * samples_per_segment / fs
+        end = (cursor + limit) * samples_per_segment / fs
+    elif windowed:
+        offset = start or 0.0
+        end = offset + segment_duration if end is None else end
+        if end <= offset:
+            raise HTTPException(status_code=400, detail="end must be greater than start")
+
+    if cached is not None:
+        s0 = min(int(round(offset * fs)), cached.n_samples)
+        s1 = min(int(round(end * fs)), cached.n_samples) if windowed else cached.n_samples
+        data_uV = np.asarray(cached.data[cached.picks(picks), s0:s1])  # µV
+    elif offset * fs >= total_samples:
+        s0, data_uV = total_samples, np.empty((len(picks), 0), dtype=np.float32)
+    else:
+        try:
+            raw = load_window(file_path, offset, end, picks=picks, highpass=highpass,
+                              resample_to=resample_to, reference=reference)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to preprocess EEG: {e}")
+        s0 = int(round(offset * fs))
+        data_uV = to_microvolts(raw.get_data(picks=picks))           # µV
 
-    segments = []
-    segment_times = []
+    # (segments, samples, ch) without copying per segment
+    n_segments = data_uV.shape[1] // samples_per_segment
+    blocks = data_uV[:, :n_segments * samples_per_segment].reshape(len(picks), n_segments, samples_per_segment)
+    blocks = blocks.transpose(1, 2, 0)
 
-    for start in range(0, data_uV.shape[1], samples_per_segment):
-        end = start + samples_per_segment
-        if end > data_uV.shape[1]:
-            break
-        segments.append(data_uV[:, start:end].T.tolist())       # (samples, ch)
-        segment_times.append(times[start:end].tolist())
+    page = {}
+    if paged:
+        next_cursor = cursor + n_segments
+        page = {
+            "cursor": cursor,
+            "next_cursor": next_cursor if n_segments and next_cursor < total_segments else None,
+            "total_segments": total_segments,
+        }
+
+    if format == "f32":
+        headers = {
+            "X-EEG-Fs": repr(float(fs)),
+            "X-EEG-Channels": json.dumps(picks),
+            "X-EEG-Segment-Samples": str(samples_per_segment),
+            "X-EEG-Segments": str(n_segments),
+            "X-EEG-Start-Time": repr(s0 / fs),
+        }
+        headers.update({f"X-EEG-{k.replace('_', '-').title()}": json.dumps(v) for k, v in page.items()})
+        frame = encode_frame(s0, blocks.reshape(-1, len(picks)), "float32")
+        return Response(content=frame, media_type="application/octet-stream", headers=headers)
+
+    if format == "compact":
+        return {
+            "segments": blocks.tolist(),
+            "start_time": s0 / fs,
+            "fs": fs,
+            "segment_samples": samples_per_segment,
+            "channels": picks,
+            **page,
+        }
 
+    times = (s0 + np.arange(n_segments * samples_per_segment)) / fs
     return {
-        "segments": segments,
-        "segment_times": segment_times,
+        "segments": blocks.tolist(),
+        "segment_times": times.reshape(n_segments, samples_per_segment).tolist(),
         "fs": fs,
         "channels": picks,
+        **page,
     }
 
 
+@router.get("/range")
+def get_range(
+    filename: str = Query(...),
+    channels: list[str] | None = Query(None),
+    start: float = Query(0.0, ge=0, description="Start time (s)"),
+    end: float | None = Query(None, description="End time (s), defaults to the end of the file"),
+    max_points: int = Query(2000, ge=1, le=100000, description="Max buckets per channel (≈ plot width in px)"),
+    highpass: float = Query(0.5),
+    resample_to: float | None = Query(None),
+):
+    """
+    Min/max envelope (µV) of the preprocessed channels over [start, end).
+    The pyramid is built on first use and cached next to the upload.
+    """
+    file_path = os.path.join(UPLOAD_DIR, filename)
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    def _source():
+        cached = eeg_cache.get_preprocessed(file_path, highpass, resample_to)
+        return cached.data.T, cached.fs, cached.ch_names
+
+    pyramid_path = f"{file_path}.hp{highpass:g}-rs{resample_to or 0:g}.pyr"
+    try:
+        pyramid = decimation.get_pyramid(
+            pyramid_path, (file_fingerprint(file_path), highpass, resample_to), _source
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to preprocess EEG: {e}")
+
+    if not channels:
+        channels = pyramid.channels
+    picks = [ch for ch in channels if ch in pyramid.channels]
+    if not picks:
+        raise HTTPException(status_code=400, detail="No valid channels selected")
+
+    result = pyramid.query(start, end, max_points, picks=[pyramid.channels.index(ch) for ch in picks])
+    result["channels"] = picks
+    return result
+
+
+# ------------------------------------------------------------
+#   Real-time playback (WebSocket)
+# ------------------------------------------------------------
+class EEGStreamSource(StreamSource):
+    """
+    Preprocessed µV samples of one uploaded EEG, for run_player.
+
+    Reads from the cached (memory-mapped) preprocessed store when it exists.
+    Otherwise it serves PLAYER_BLOCK_S windows read with load_window, one
+    block ahead, while the full store is built in the background; the first
+    sample therefore never waits for the whole file to be filtered.
+    """
+
+    def __init__(self, file_path, channels, highpass=0.5, resample_to=None, reference="average"):
+        super().__init__()
+        self.file_path = file_path
+        self.params = {"highpass": highpass, "resample_to": resample_to, "reference": reference}
+        self.store = eeg_cache.peek(file_path, highpass, resample_to, reference)
+        self._blocks = {}
+        self._pool = None
+
+        if self.store is not None:
+            self.fs = self.store.fs
+            self.n_samples = self.store.n_samples
+            self.channel_names = self.store.ch_names
+        else:
+            header = read_header(file_path)
+            self.fs = float(resample_to or header["sfreq"])
+            self.n_samples = int(round(header["duration_seconds"] * self.fs))
+            self.channel_names = header["channels"]
+            self._pool = ThreadPoolExecutor(max_workers=2)
+            self._building = self._pool.submit(self._build_store)
+        self._block_len = max(1, int(PLAYER_BLOCK_S * self.fs))
+        self.select(channels or self.channel_names)
+
+    def _build_store(self):
+        self.store = eeg_cache.get_preprocessed(self.file_path, **self.params)
+
+    def select(self, channels):
+        names = [str(ch) for ch in channels]
+        unknown = [ch for ch in names if ch not in self.channel_names]
+        if not names or unknown:
+            raise ValueError(f"Unknown channels: {unknown or names}")
+        self._rows = [self.channel_names.index(ch) for ch in names]
+        self.selected = names
+        return names
+
+    def _load_block(self, b):
+        t0 = b * self._block_len / self.fs
+        raw = load_window(self.file_path, t0, t0 + self._block_len / self.fs, **self.params)
+        return to_microvolts(raw.get_data()).astype(np.float32)  # (all channels, samples)
+
+    def _block(self, b):
+        for k in (b, b + 1):  # current block + prefetch of the next one
+            if k not in self._blocks and k * self._block_len < self.n_samples:
+                self._blocks[k] = self._pool.submit(self._load_block, k)
+        for k in [k for k in self._blocks if k not in (b, b + 1)]:
+            self._blocks.pop(k).cancel()
+        return self._blocks[b].result()
+
+    def read(self, start, stop):
+        store = self.store
+        if store is not None:
+            return np.asarray(store.data[self._rows, start:stop]).T
+
+        out = np.zeros((stop - start, len(self._rows)), dtype=np.float32)
+        pos = start
+        while pos < stop:
+            b = pos // self._block_len
+            block = self._block(b)
+            offset = pos - b * self._block_len
+            n = min(stop - pos, self._block_len - offset)
+            piece = block[self._rows, offset:offset + n].T
+            out[pos - start:pos - start + len(piece)] = piece  # a short last block stays zero-padded
+            pos += n
+        return out
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+@router.websocket("/ws/eeg/{filename}")
+async def stream_eeg(
+    websocket: WebSocket,
+    filename: str,
+    channels: list[str] | None = Query(None),
+    dtype: str = Query("float32", description="float32 or int16 (per-frame scaled)"),
+    speed: float = Query(1.0, description="Playback speed, 0.25x - 4x"),
+    chunk: int = Query(32, ge=1, le=5000, description="Samples per frame at 1x"),
+    highpass: float = Query(0.5),
+    resample_to: float | None = Query(None),
+    reference: str = Query("average"),
+):
+    """
+    Binary real-time playback of the preprocessed channels in µV (see
+    utils/stream_tools.py for the frame layout and the seek / speed /
+    channels control messages).
+    """
+    await websocket.accept()
+    source = None
+    try:
+        if dtype not in DTYPE_CODES:
+            raise ValueError("dtype must be 'float32' or 'int16'")
+        if reference not in ("average", "none"):
+            raise ValueError("reference must be 'average' or 'none'")
+        file_path = os.path.join(UPLOAD_DIR, filename)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(filename)
+        source = await asyncio.to_thread(
+            EEGStreamSource, file_path, channels, highpass, resample_to, reference
+        )
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": f"Failed to open EEG: {e}"})
+        await websocket.close(code=1011)
+        return
+
+    try:
+        await run_player(websocket, source, dtype=dtype, speed=speed, chunk=chunk,
+                         min_speed=PLAYER_MIN_SPEED, max_speed=PLAYER_MAX_SPEED)
+    finally:
+        source.close()
+        try:
+            await websocket.close()
+        except RuntimeError:
+            pass  # already closed by the client
+
+
 @router.post("/predict")
 async def predict(file: UploadFile = File(...), model_fs: int = 256):
     """
     Predict EEG class using pretrained model.
     Resamples & filters to match training preprocessing.
     """
+    try:
+        model = model_registry.get("eeg_classifier")
+    except model_registry.ModelUnavailable as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+
+    try:
+        data = await _upload_model_input(file, model_fs)
+        if isinstance(data, JSONResponse):
+            return data
+        return _classify(model, data)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@router.post("/predict/stream")
+async def predict_stream(file: UploadFile = File(...), model_fs: int = 256,
+                         group: int = Query(1, ge=1, description="Windows averaged per NDJSON line")):
+    """
+    Same as /predict, streamed as NDJSON while the batches run: a "start" line,
+    one "windows" line per ``group`` windows, then the "result" line with the
+    average over all windows.
+    """
+    try:
+        model = model_registry.get("eeg_classifier")
+    except model_registry.ModelUnavailable as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+
+    try:
+        data = await _upload_model_input(file, model_fs)
+        if isinstance(data, JSONResponse):
+            return data
+        return _classify_stream(model, data, model_fs, group)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@router.post("/predict/{filename}")
+def predict_uploaded(filename: str, model_fs: int = 256):
+    """
+    Predict EEG class for a file already uploaded with /upload.
+    Reuses the preprocessed array cached for viewing (0.5 Hz high-pass, notch,
+    average reference); only the first 19 channels are resampled to model_fs.
+    """
+    file_path = os.path.join(UPLOAD_DIR, filename)
+    if not os.path.exists(file_path):
+        return JSONResponse({"error": "File not found"}, status_code=404)
+
+    try:
+        model = model_registry.get("eeg_classifier")
+    except model_registry.ModelUnavailable as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+
+    try:
+        data = _stored_model_input(file_path, model_fs)
+        if isinstance(data, JSONResponse):
+            return data
+        return _classify(model, data)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@router.post("/predict/{filename}/stream")
+def predict_uploaded_stream(filename: str, model_fs: int = 256,
+                            group: int = Query(1, ge=1, description="Windows averaged per NDJSON line")):
+    """NDJSON timeline (see /predict/stream) for a file already uploaded with /upload."""
+    file_path = os.path.join(UPLOAD_DIR, filename)
+    if not os.path.exists(file_path):
+        return JSONResponse({"error": "File not found"}, status_code=404)
+
+    try:
+        model = model_registry.get("eeg_classifier")
+    except model_registry.ModelUnavailable as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+
+    try:
+        data = _stored_model_input(file_path, model_fs)
+        if isinstance(data, JSONResponse):
+            return data
+        return _classify_stream(model, data, model_fs, group)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def _upload_model_input(file, model_fs):
+    """(19, samples) model input from an uploaded file, or a JSONResponse error."""
     suffix = ".edf" if file.filename.endswith(".edf") else ".set"
     tmp_path = None
-
     try:
         contents = await file.read()
         with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
@@ -136,49 +502,217 @@ async def predict(file: UploadFile = File(...), model_fs: int = 256):
                 status_code=400,
             )
 
-        data = data[:19, :]              # first 19 channels
-        data = standardize(data)         # z-score per channel
+        return data[:19, :]              # first 19 channels
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except:
+                pass
 
-        # sliding windows
-        window_size = 256
-        step_size = 128
-        n_samples = data.shape[1]
 
-        segments = [
-            data[:, start:start + window_size]
-            for start in range(0, n_samples - window_size + 1, step_size)
-        ]
-        if not segments:
-            return JSONResponse(
-                {"error": f"EEG too short, need at least {window_size} samples"},
-                status_code=400,
-            )
+def _stored_model_input(file_path, model_fs):
+    """(19, samples) model input from the viewer's cached preprocessing, or a JSONResponse error."""
+    # a full-file entry at model_fs (e.g. viewed with resample_to) is used as is
+    cached = eeg_cache.peek(file_path, 0.5, model_fs) or eeg_cache.get_preprocessed(file_path, 0.5)
+    if len(cached.ch_names) < 19:
+        return JSONResponse(
+            {"error": f"File has {len(cached.ch_names)} channels, expected ≥19"},
+            status_code=400,
+        )
+    # µV instead of V does not matter: windows are z-scored per channel
+    return resample_data(cached.data[:19], cached.fs, model_fs)
 
-        batch = torch.tensor(np.stack(segments), dtype=torch.float32).unsqueeze(1)  # (N,1,19,256)
 
-        # inference
-        chunk_size = 128
-        all_probs = []
-        with torch.no_grad():
-            for i in range(0, batch.shape[0], chunk_size):
-                out = model(batch[i:i+chunk_size].to(device))
-                p = torch.nn.functional.softmax(out, dim=1).cpu()
-                all_probs.append(p)
-        probs = torch.cat(all_probs, dim=0)
-        avg_probs = probs.mean(dim=0)
-        pred_class = torch.argmax(avg_probs).item()
+def _prediction(avg_probs):
+    pred_class = int(np.argmax(avg_probs))
+    return {
+        "prediction": CLASS_NAMES[pred_class],
+        "confidence": float(avg_probs[pred_class]),
+        "probabilities": {CLASS_NAMES[i]: float(avg_probs[i]) for i in range(len(CLASS_NAMES))},
+    }
 
-        return {
-            "prediction": CLASS_NAMES[pred_class],
-            "confidence": float(avg_probs[pred_class]),
-            "probabilities": {CLASS_NAMES[i]: float(avg_probs[i]) for i in range(len(CLASS_NAMES))},
-        }
 
+def _classify(model, data):
+    """Mean softmax over sliding windows of (19, samples) ``data`` as the /predict response."""
+    # strided windows, z-scored per channel into a reusable batch buffer
+    engine = eeg_inference.WindowedClassifier(model, device=device)
+    try:
+        avg_probs, _ = engine.predict(data, standardize=True)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return _prediction(avg_probs)
+
+
+def _classify_stream(model, data, fs, group):
+    """
+    NDJSON response with one line per ``group`` windows as the batches finish.
+    Only the current batch and the running sums are held, never every window's output.
+    """
+    engine = eeg_inference.WindowedClassifier(model, device=device)
+    n = engine.n_windows(data.shape[1])
+    if n == 0:
+        return JSONResponse({"error": f"EEG too short, need at least {engine.window} samples"}, status_code=400)
+    step_s, window_s = engine.step / fs, engine.window / fs
+
+    def _line(obj):
+        return json.dumps(obj) + "\n"
+
+    def _group_line(first, count, probs_sum, done):
+        line = {"type": "windows", "start": first, "count": count,
+                "start_s": round(first * step_s, 6), "end_s": round((first + count - 1) * step_s + window_s, 6),
+                "done": done, "n_windows": n}
+        line.update(_prediction(probs_sum / count))
+        return _line(line)
+
+    def _lines():
+        yield _line({"type": "start", "n_windows": n, "group": group, "window_s": window_s,
+                     "step_s": step_s, "classes": CLASS_NAMES})
+        total = np.zeros(len(CLASS_NAMES))
+        group_sum, group_start, group_count = np.zeros(len(CLASS_NAMES)), 0, 0
+        try:
+            for b0, _, probs in engine.iter_window_probs(data, standardize=True):
+                total += probs.sum(axis=0, dtype=np.float64)
+                pos, end = b0, b0 + len(probs)
+                while pos < end:
+                    take = min(group - group_count, end - pos)
+                    group_sum += probs[pos - b0:pos - b0 + take].sum(axis=0, dtype=np.float64)
+                    group_count += take
+                    pos += take
+                    if group_count == group:
+                        yield _group_line(group_start, group_count, group_sum, pos)
+                        group_sum, group_start, group_count = np.zeros(len(CLASS_NAMES)), pos, 0
+            if group_count:
+                yield _group_line(group_start, group_count, group_sum, n)
+            result = {"type": "result", "n_windows": n}
+            result.update(_prediction(total / n))
+            yield _line(result)
+        except Exception as e:
+            yield _line({"type": "error", "error": str(e)})
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
+def _frame_range(n_frames, frame_step, start, end):
+    """Frames whose start time lies in [start, end)."""
+    f0 = min(n_frames, int(np.ceil(start / frame_step - 1e-9)))
+    f1 = n_frames if end is None else min(n_frames, max(f0, int(np.ceil(end / frame_step - 1e-9))))
+    return f0, f1
+
+
+def _derived_picks(file_path, channels, highpass, resample_to, reference):
+    names = eeg_cache.get_preprocessed(file_path, highpass, resample_to, reference).ch_names
+    picks = [ch for ch in (channels or names) if ch in names]
+    if not picks:
+        raise HTTPException(status_code=400, detail="No valid channels selected")
+    return picks, [names.index(ch) for ch in picks]
+
+
+@router.get("/bandpower")
+def get_bandpower(
+    filename: str = Query(...),
+    channels: list[str] | None = Query(None),
+    start: float = Query(0.0, ge=0, description="Start time (s)"),
+    end: float | None = Query(None, description="End time (s), defaults to the end of the file"),
+    window: float = Query(eeg_spectral.BANDPOWER_WINDOW_S, gt=0, le=60, description="Welch window (s)"),
+    step: float = Query(eeg_spectral.BANDPOWER_STEP_S, gt=0, le=60, description="Frame step (s)"),
+    highpass: float = Query(0.5),
+    resample_to: float | None = Query(None),
+    reference: str = Query("average", pattern="^(average|none)$"),
+):
+    """
+    Relative delta/theta/alpha/beta/gamma power per channel, one frame every
+    ``step`` seconds; frame i covers [start_time + i*step, ... + window).
+    Computed for all channels at once on first use and cached with the preprocessed data.
+    """
+    file_path = os.path.join(UPLOAD_DIR, filename)
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    def _compute(pre):
+        # the preprocessing low-pass removed everything above it, so gamma stops there
+        bands = eeg_spectral.bands_below(min(LOWPASS_HZ, pre.fs / 2.0))
+        series = eeg_spectral.band_power_series(pre.data, pre.fs, window_s=window, step_s=step, bands=bands)
+        return series, {"bands": list(bands), "band_edges": bands, "ch_names": pre.ch_names}
+
+    try:
+        picks, rows = _derived_picks(file_path, channels, highpass, resample_to, reference)
+        cached = eeg_cache.get_derived(
+            file_path, "bandpower", {"window": window, "step": step, "lowpass": LOWPASS_HZ}, _compute, highpass, resample_to, reference
+        )
+    except HTTPException:
+        raise
     except Exception as e:
-        return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.remove(tmp_path)
-            except:
-                pass
+        raise HTTPException(status_code=500, detail=f"Failed to compute band powers: {e}")
+
+    f0, f1 = _frame_range(cached.data.shape[2], step, start, end)
+    values = np.round(cached.data[:, rows, f0:f1].astype(np.float64), 4)
+    bands = cached.meta["bands"]
+    return {
+        "filename": filename,
+        "channels": picks,
+        "bands": bands,
+        "band_edges": cached.meta["band_edges"],
+        "window_s": window,
+        "step_s": step,
+        "start_time": f0 * step,
+        "frames": f1 - f0,
+        "power": {ch: {band: values[b, i].tolist() for b, band in enumerate(bands)} for i, ch in enumerate(picks)},
+    }
+
+
+@router.get("/spectrogram")
+def get_spectrogram(
+    filename: str = Query(...),
+    channels: list[str] | None = Query(None),
+    start: float = Query(0.0, ge=0, description="Start time (s)"),
+    end: float | None = Query(None, description="End time (s), defaults to the end of the file"),
+    nperseg: int = Query(eeg_spectral.SPECTROGRAM_NPERSEG, ge=16, le=8192, description="STFT frame length (samples)"),
+    hop: int = Query(eeg_spectral.SPECTROGRAM_HOP, ge=1, le=8192, description="Samples between frames"),
+    fmax: float = Query(eeg_spectral.SPECTROGRAM_FMAX, gt=0),
+    highpass: float = Query(0.5),
+    resample_to: float | None = Query(None),
+    reference: str = Query("average", pattern="^(average|none)$"),
+):
+    """
+    STFT power (dB) per channel as (freqs, frames) rows ready for a heatmap;
+    frame i is centred on start_time + i*step_s. Cached like /bandpower.
+    """
+    file_path = os.path.join(UPLOAD_DIR, filename)
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    hop = min(hop, nperseg)
+
+    def _compute(pre):
+        freqs, power = eeg_spectral.spectrogram(pre.data, pre.fs, nperseg=nperseg, hop=hop, fmax=fmax)
+        return power, {"freqs": freqs.tolist(), "fs": pre.fs, "ch_names": pre.ch_names}
+
+    try:
+        picks, rows = _derived_picks(file_path, channels, highpass, resample_to, reference)
+        cached = eeg_cache.get_derived(
+            file_path, "stft", {"nperseg": nperseg, "hop": hop, "fmax": fmax}, _compute,
+            highpass, resample_to, reference,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute spectrogram: {e}")
+
+    frame_step = hop / cached.meta["fs"]
+    f0, f1 = _frame_range(cached.data.shape[2], frame_step, start, end)
+    values = np.round(cached.data[rows, :, f0:f1].astype(np.float64), 1)
+    return {
+        "filename": filename,
+        "channels": picks,
+        "freqs": cached.meta["freqs"],
+        "step_s": frame_step,
+        "start_time": f0 * frame_step,
+        "frames": f1 - f0,
+        "power_db": {ch: values[i].tolist() for i, ch in enumerate(picks)},
+    }
+
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    """Hit/miss counters and memory use of the preprocessed-EEG cache."""
+    return eeg_cache.cache_stats()
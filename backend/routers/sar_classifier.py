@@ -1,16 +1,18 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException
 from fastapi.responses import FileResponse
 import numpy as np
-import rasterio
-from rasterio.enums import Resampling
-import matplotlib.pyplot as plt
-from sklearn.cluster import KMeans
 import tempfile, os
 
 router = APIRouter(tags=["SAR"])
 
 @router.post("/classify")
 async def classify_sar(vv_file: UploadFile = File(...), vh_file: UploadFile = File(...)):
+    # heavy imports deferred to the first SAR request
+    import rasterio
+    from rasterio.enums import Resampling
+    import matplotlib.pyplot as plt
+    from sklearn.cluster import KMeans
+
     try:
         # === Save uploaded files temporarily ===
         with tempfile.NamedTemporaryFile(delete=False, suffix=".tiff") as vv_tmp:
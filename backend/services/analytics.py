@@ -0,0 +1,218 @@
+# file: services/analytics.py
+import numpy as np
+
+from ..utils import signal_tools as st
+
+# -----------------------
+# XOR overlay, cross-recurrence and polar cycles
+# -----------------------
+# NumPy versions of the comparison views the ECG and EEG pages used to compute
+# per sample in JavaScript. Everything works on a stack of segments (R-R
+# cycles or fixed windows) so one call covers as many segments as a page asks for.
+
+XOR_HISTORY = 20            # chunks kept by the overlay, as in the browser
+THRESHOLD_SCALE = 0.1       # adaptive recurrence threshold = 0.1 * std of both signals
+MAX_DENSE_POINTS = 1000     # longer segments are only served as a binned matrix
+
+_DENSE_BLOCK = 1 << 22      # elements of the (segments, n, m) comparison computed at once
+
+
+def window_bounds(n_samples, window, step):
+    """[start, end) of every full ``window``-sample window taken every ``step`` samples."""
+    if n_samples < window:
+        return np.empty((0, 2), dtype=np.int64)
+    starts = np.arange(0, n_samples - window + 1, step, dtype=np.int64)
+    return np.stack([starts, starts + window], axis=1)
+
+
+def segment_stack(x, bounds, n_points=None):
+    """
+    (n_segments, length) float32 stack of the segments of 1-D ``x``; resampled
+    to ``n_points`` when given, otherwise all segments must have the same length.
+    """
+    bounds = np.asarray(bounds, dtype=np.int64).reshape(-1, 2)
+    if n_points:
+        return st.resample_segments(x, bounds, n_points)
+    lengths = bounds[:, 1] - bounds[:, 0]
+    if len(bounds) and (lengths != lengths[0]).any():
+        raise ValueError("Segments differ in length; pass n_points to resample them")
+    if len(bounds) == 0:
+        return np.empty((0, 0), dtype=np.float32)
+    index = bounds[:, :1] + np.arange(lengths[0])[None, :]
+    return np.asarray(x)[index].astype(np.float32)  # gather first: x may be a memmap row
+
+
+def minmax_normalize(x, axis=-1):
+    """Scale each row to [0, 1]; constant rows become 0.5."""
+    x = np.asarray(x, dtype=np.float32)
+    lo = x.min(axis=axis, keepdims=True)
+    span = x.max(axis=axis, keepdims=True) - lo
+    safe = np.where(span > 0, span, 1.0)
+    return np.where(span > 0, (x - lo) / safe, 0.5).astype(np.float32)
+
+
+def adaptive_threshold(a, b, scale=THRESHOLD_SCALE):
+    """``scale`` times the std of each row of ``a`` and ``b`` taken together."""
+    return scale * np.concatenate([a, b], axis=-1).std(axis=-1)
+
+
+# -----------------------
+# Cross-recurrence
+# -----------------------
+
+def recurrence_counts(A, B, threshold):
+    """
+    Sum over segments k of the cross-recurrence matrices |A[k, i] - B[k, j]| < threshold[k].
+    A is (k, n), B is (k, m); returns int64 (n, m). Segments are compared in
+    blocks so the (k, n, m) comparison never exists at once.
+    """
+    A = np.asarray(A, dtype=np.float32)
+    B = np.asarray(B, dtype=np.float32)
+    threshold = np.broadcast_to(np.asarray(threshold, dtype=np.float32), (len(A),))
+    counts = np.zeros((A.shape[1], B.shape[1]), dtype=np.int64)
+    per_block = max(1, _DENSE_BLOCK // max(1, A.shape[1] * B.shape[1]))
+    for k0 in range(0, len(A), per_block):
+        a, b, thr = A[k0:k0 + per_block], B[k0:k0 + per_block], threshold[k0:k0 + per_block]
+        counts += (np.abs(a[:, :, None] - b[:, None, :]) < thr[:, None, None]).sum(axis=0)
+    return counts
+
+
+def binned_recurrence(a, b, threshold, bins):
+    """
+    Cross-recurrence of 1-D ``a`` against ``b`` counted in a bins x bins grid
+    over (i, j) without forming the len(a) x len(b) matrix: the values of each
+    column bin are sorted once and every a[i] is counted against them with two
+    binary searches, O(bins * n log n) instead of O(n * m) memory.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    row_edges = np.linspace(0, len(a), bins + 1).astype(np.int64)
+    col_edges = np.linspace(0, len(b), bins + 1).astype(np.int64)
+    upper, lower = a + threshold, a - threshold
+
+    counts = np.zeros((bins, bins), dtype=np.int64)
+    for c in range(bins):
+        ys = np.sort(b[col_edges[c]:col_edges[c + 1]])
+        # |a - y| < t  <=>  a - t < y < a + t
+        per_row = np.searchsorted(ys, upper, side="left") - np.searchsorted(ys, lower, side="right")
+        cum = np.concatenate([[0], np.cumsum(per_row)])
+        counts[:, c] = cum[row_edges[1:]] - cum[row_edges[:-1]]
+    return counts
+
+
+# -----------------------
+# XOR overlay
+# -----------------------
+
+def rolling_xor(x, window, lag=None, step=1):
+    """
+    Mean absolute difference between each ``window``-sample chunk and the
+    chunk ``lag`` samples earlier (default: the previous window), for chunks
+    starting at lag, lag + step, ... Computed from one cumulative sum, O(n).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    lag = int(lag or window)
+    if len(x) < lag + window:
+        return np.empty(0)
+    diff = np.abs(x[lag:] - x[:-lag])
+    cum = np.concatenate([[0.0], np.cumsum(diff)])
+    return ((cum[window:] - cum[:-window]) / window)[::step]
+
+
+class XorOverlay:
+    """
+    Incremental XOR overlay: chunks are pushed in arrival order. Each one is
+    compared (mean absolute difference) with every chunk still shown; if any
+    is within ``tolerance``, those chunks are hidden and the new one is
+    dropped, otherwise it is added. The list keeps its last ``history``
+    entries (hidden ones included), like the browser version.
+
+    The state is the entry list plus the samples of the shown chunks, so a
+    later page resumes from it without replaying earlier chunks.
+    """
+
+    def __init__(self, tolerance, history=XOR_HISTORY):
+        self.tolerance = float(tolerance)
+        self.history = int(history)
+        self.n_seen = 0
+        self._entries = []   # [chunk index, hidden]
+        self._chunks = {}    # chunk index -> samples, for the shown entries
+
+    @property
+    def shown(self):
+        """Indices of the chunks currently shown."""
+        return [k for k, hidden in self._entries if not hidden]
+
+    def chunk(self, k):
+        return self._chunks[k]
+
+    @property
+    def nbytes(self):
+        return sum(int(c.nbytes) for c in self._chunks.values()) + 16 * len(self._entries)
+
+    def copy(self):
+        other = XorOverlay(self.tolerance, self.history)
+        other.n_seen = self.n_seen
+        other._entries = [list(e) for e in self._entries]
+        other._chunks = dict(self._chunks)   # chunks are never modified in place
+        return other
+
+    def push(self, chunks):
+        """
+        Add a (k, n) stack of chunks; returns each one's smallest mean
+        difference to a shown chunk (NaN when nothing was shown).
+        """
+        chunks = np.asarray(chunks, dtype=np.float32)
+        min_diff = np.full(len(chunks), np.nan)
+        for i, chunk in enumerate(chunks):
+            k = self.n_seen + i
+            shown = [e for e in self._entries if not e[1]]
+            duplicate = False
+            if shown:
+                diffs = np.abs(np.stack([self._chunks[e[0]] for e in shown]) - chunk).mean(axis=1)
+                min_diff[i] = diffs.min()
+                for entry, diff in zip(shown, diffs):
+                    if diff <= self.tolerance:
+                        entry[1] = duplicate = True
+                        del self._chunks[entry[0]]
+            if not duplicate:
+                self._entries.append([k, False])
+                self._chunks[k] = chunk.copy()   # not a view that pins the whole page
+                for old, hidden in self._entries[:-self.history]:
+                    self._chunks.pop(old, None)
+                self._entries = self._entries[-self.history:]
+        self.n_seen += len(chunks)
+        return min_diff
+
+
+def xor_overlay(chunks, tolerance, history=XOR_HISTORY):
+    """
+    Replay of the XOR overlay (see XorOverlay) over a (k, n) stack of chunks.
+
+    Returns (indices of the chunks still shown, each chunk's smallest mean
+    difference to a shown chunk, NaN when nothing was shown).
+    """
+    overlay = XorOverlay(tolerance, history)
+    min_diff = overlay.push(chunks)
+    return overlay.shown, min_diff
+
+
+# -----------------------
+# Polar cycles
+# -----------------------
+
+def polar_cycles(segments, normalize="minmax"):
+    """
+    Radius of each resampled segment for a polar plot, one revolution per
+    segment, and the shared angles in degrees. ``normalize``: "minmax" (each
+    cycle scaled to [0, 1]), "abs" (|value|) or "none".
+    """
+    segments = np.asarray(segments, dtype=np.float32)
+    if normalize == "minmax":
+        r = minmax_normalize(segments)
+    elif normalize == "abs":
+        r = np.abs(segments)
+    else:
+        r = segments
+    theta = np.arange(segments.shape[-1]) * (360.0 / max(1, segments.shape[-1]))
+    return r, theta
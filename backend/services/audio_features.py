@@ -0,0 +1,320 @@
+# file: services/audio_features.py
+import io
+import os
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+import scipy.fft
+import soundfile as sf
+from scipy.signal import resample_poly
+
+# -----------------------
+# Fast decode + MFCC for the drone classifier
+# -----------------------
+# Same features as pretrained_models/mfcc.py (librosa.load at 16 kHz, then
+# the mean over frames of librosa.feature.mfcc with n_mfcc=40), without
+# librosa at run time:
+#   decode    soundfile from a path, bytes or file object, mixed to mono
+#   resample  soxr "HQ" (what librosa.load itself uses; installed with librosa),
+#             else an integer-ratio polyphase filter (scipy resample_poly)
+#   STFT      float32 frames, Hann window, centred with zero padding
+#   mel       Slaney mel filterbank and orthonormal DCT-II, built once per shape
+# Defaults are librosa's: n_fft 2048, hop 512, 128 mels, power_to_db with top_db 80.
+
+SAMPLE_RATE = 16000
+N_MFCC = 40
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+TOP_DB = 80.0
+AMIN = 1e-10
+
+BLOCK_S = 30.0            # seconds of input decoded at a time by iter_audio_blocks
+
+_FRAMES_PER_BLOCK = 1024  # STFT frames materialized at once (8 MB of float32 at n_fft 2048)
+
+
+# -----------------------
+# Decode / resample
+# -----------------------
+
+try:
+    import soxr
+except ImportError:  # optional: without it, resampled clips drift slightly from the training features
+    soxr = None
+
+
+def resample(y, orig_sr, target_sr):
+    """
+    Resample 1-D ``y`` to ``target_sr`` as float32: soxr HQ when installed
+    (bit-compatible with librosa.load), otherwise polyphase filtering by the
+    reduced ratio target_sr / orig_sr with a sharp Kaiser window.
+    """
+    orig_sr, target_sr = int(orig_sr), int(target_sr)
+    y = np.asarray(y, dtype=np.float32)
+    if orig_sr == target_sr:
+        return y
+    if soxr is not None:
+        return soxr.resample(y, orig_sr, target_sr, quality="soxr_hq").astype(np.float32, copy=False)
+    g = gcd(orig_sr, target_sr)
+    return resample_poly(y, target_sr // g, orig_sr // g, window=("kaiser", 10.0)).astype(np.float32)
+
+
+def decode_audio(source, sr=SAMPLE_RATE):
+    """
+    Mono float32 samples of ``source`` (path, bytes or binary file object) at
+    ``sr`` Hz. Formats libsndfile cannot read fall back to librosa.load.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    try:
+        y, native_sr = sf.read(source, dtype="float32", always_2d=True)
+    except sf.LibsndfileError as e:
+        import librosa  # deferred: only for containers soundfile does not know (audioread)
+
+        if hasattr(source, "seek"):
+            source.seek(0)
+        try:
+            return librosa.load(source, sr=sr)[0]
+        except Exception:
+            raise ValueError(f"Could not decode audio: {e.error_string}") from None
+    y = y.mean(axis=1) if y.shape[1] > 1 else y[:, 0]
+    return resample(y, native_sr, sr)
+
+
+class BlockResampler:
+    """
+    resample() for consecutive blocks of one signal: the concatenated output
+    equals resampling the whole signal at once, with memory bounded by the
+    block size. soxr keeps its own filter state; the polyphase fallback keeps
+    enough input around each emitted span to cover the filter.
+    """
+
+    def __init__(self, orig_sr, target_sr):
+        orig_sr, target_sr = int(orig_sr), int(target_sr)
+        g = gcd(orig_sr, target_sr)
+        self.up, self.down = target_sr // g, orig_sr // g
+        self.identity = orig_sr == target_sr
+        self._stream = None
+        if soxr is not None and not self.identity:
+            self._stream = soxr.ResampleStream(orig_sr, target_sr, 1, dtype="float32", quality="HQ")
+        # resample_poly's filter reaches 10 * max(up, down) taps at the upsampled
+        # rate; keep that much input (rounded to whole output steps) as context
+        reach = -(-10 * max(self.up, self.down) // self.up) + 1
+        self._margin = -(-reach // self.down) * self.down
+        self._buf = np.zeros(0, dtype=np.float32)
+        self._ctx = 0   # samples at the start of _buf that were already emitted
+
+    def process(self, block, last=False):
+        block = np.asarray(block, dtype=np.float32)
+        if self.identity:
+            return block
+        if self._stream is not None:
+            return self._stream.resample_chunk(block, last=last).astype(np.float32, copy=False)
+
+        buf = np.concatenate([self._buf, block])
+        end = len(buf) if last else (len(buf) - self._margin) // self.down * self.down
+        if end <= self._ctx:
+            self._buf = buf
+            return np.zeros(0, dtype=np.float32)
+        y = resample_poly(buf, self.up, self.down, window=("kaiser", 10.0))
+        out_end = -(-end * self.up // self.down) if last else end * self.up // self.down
+        out = y[self._ctx * self.up // self.down:out_end].astype(np.float32)
+        keep = max(0, end - self._margin)   # a multiple of down, so output samples stay aligned
+        self._buf, self._ctx = buf[keep:], end - keep
+        return out
+
+
+def iter_audio_blocks(source, sr=SAMPLE_RATE, block_s=BLOCK_S):
+    """
+    Mono float32 blocks of ``source`` at ``sr`` Hz, decoded and resampled
+    ``block_s`` seconds of input at a time. Formats libsndfile cannot read
+    are decoded whole through decode_audio() and yielded as one block.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    try:
+        f = sf.SoundFile(source)
+    except sf.LibsndfileError:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        yield decode_audio(source, sr)
+        return
+    with f:
+        resampler = BlockResampler(f.samplerate, sr)
+        blocksize = max(1, int(block_s * f.samplerate))
+        while True:
+            block = f.read(blocksize, dtype="float32", always_2d=True)
+            if len(block) == 0:
+                tail = resampler.process(np.zeros(0, dtype=np.float32), last=True)
+                if len(tail):
+                    yield tail
+                return
+            out = resampler.process(block.mean(axis=1) if block.shape[1] > 1 else block[:, 0])
+            if len(out):
+                yield out
+
+
+# -----------------------
+# Mel filterbank / DCT (cached per shape)
+# -----------------------
+
+_F_SP = 200.0 / 3          # Slaney mel scale: linear below 1 kHz ...
+_MIN_LOG_HZ = 1000.0
+_MIN_LOG_MEL = _MIN_LOG_HZ / _F_SP
+_LOGSTEP = np.log(6.4) / 27.0   # ... logarithmic above
+
+
+def hz_to_mel(f):
+    f = np.asarray(f, dtype=np.float64)
+    log_part = _MIN_LOG_MEL + np.log(np.maximum(f, _MIN_LOG_HZ) / _MIN_LOG_HZ) / _LOGSTEP
+    return np.where(f >= _MIN_LOG_HZ, log_part, f / _F_SP)
+
+
+def mel_to_hz(m):
+    m = np.asarray(m, dtype=np.float64)
+    log_part = _MIN_LOG_HZ * np.exp(_LOGSTEP * (np.maximum(m, _MIN_LOG_MEL) - _MIN_LOG_MEL))
+    return np.where(m >= _MIN_LOG_MEL, log_part, _F_SP * m)
+
+
+@lru_cache(maxsize=16)
+def mel_filterbank(sr, n_fft=N_FFT, n_mels=N_MELS, fmin=0.0, fmax=None):
+    """(n_mels, 1 + n_fft // 2) Slaney-normalized triangular filters (librosa.filters.mel defaults)."""
+    fmax = sr / 2.0 if fmax is None else fmax
+    fft_freqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+    mel_f = mel_to_hz(np.linspace(hz_to_mel(fmin), hz_to_mel(fmax), n_mels + 2))
+    fdiff = np.diff(mel_f)
+    ramps = mel_f[:, None] - fft_freqs[None, :]
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0.0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_f[2:] - mel_f[:-2]))[:, None]
+    weights = weights.astype(np.float32)
+    weights.flags.writeable = False
+    return weights
+
+
+@lru_cache(maxsize=16)
+def dct_matrix(n_out, n_in):
+    """(n_out, n_in) orthonormal DCT-II, i.e. scipy.fft.dct(norm="ortho") truncated to n_out."""
+    k = np.arange(n_out)[:, None]
+    n = np.arange(n_in)[None, :]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2 * n_in)) * np.sqrt(2.0 / n_in)
+    basis[0] /= np.sqrt(2.0)
+    basis.flags.writeable = False
+    return basis
+
+
+@lru_cache(maxsize=16)
+def _hann(n_fft):
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)  # periodic
+    window.flags.writeable = False
+    return window
+
+
+# -----------------------
+# Features
+# -----------------------
+
+def _frames(y, n_fft, hop_length):
+    """Centred STFT frames of the last axis (zero padded by n_fft // 2): (..., frames, n_fft) view."""
+    pad = [(0, 0)] * (y.ndim - 1) + [(n_fft // 2, n_fft // 2)]
+    return np.lib.stride_tricks.sliding_window_view(np.pad(y, pad), n_fft, axis=-1)[..., ::hop_length, :]
+
+
+def _mel_power(frames, fb, window):
+    """(frames, n_mels) mel power of a (frames, n_fft) stack."""
+    spec = scipy.fft.rfft(frames * window, axis=-1)
+    return (spec.real ** 2 + spec.imag ** 2) @ fb.T
+
+
+def log_mel_spectrogram(y, sr=SAMPLE_RATE, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS, top_db=TOP_DB):
+    """
+    (n_mels, frames) power mel spectrogram in dB (ref 1.0, floored at max - top_db),
+    with frames centred on multiples of ``hop_length`` like librosa.
+    """
+    y = np.asarray(y, dtype=np.float32)
+    if y.size == 0:
+        raise ValueError("Audio is empty")
+    frames = _frames(y, n_fft, hop_length)
+    fb, window = mel_filterbank(sr, n_fft, n_mels), _hann(n_fft)
+
+    mel = np.empty((n_mels, len(frames)), dtype=np.float32)
+    for f0 in range(0, len(frames), _FRAMES_PER_BLOCK):
+        mel[:, f0:f0 + _FRAMES_PER_BLOCK] = _mel_power(frames[f0:f0 + _FRAMES_PER_BLOCK], fb, window).T
+
+    log_mel = 10.0 * np.log10(np.maximum(mel, AMIN))
+    if top_db is not None:
+        np.maximum(log_mel, log_mel.max() - top_db, out=log_mel)
+    return log_mel
+
+
+def mfcc(y, sr=SAMPLE_RATE, n_mfcc=N_MFCC, **kwargs):
+    """(n_mfcc, frames) MFCCs, as librosa.feature.mfcc(y=y, sr=sr, n_mfcc=n_mfcc)."""
+    log_mel = log_mel_spectrogram(y, sr, **kwargs)
+    return (dct_matrix(n_mfcc, log_mel.shape[0]) @ log_mel).astype(np.float32)
+
+
+def mean_mfcc(y, sr=SAMPLE_RATE, n_mfcc=N_MFCC, **kwargs):
+    """Mean MFCC vector over all frames (the DCT is linear, so it is applied to the mean log-mel)."""
+    log_mel = log_mel_spectrogram(y, sr, **kwargs)
+    return (dct_matrix(n_mfcc, log_mel.shape[0]) @ log_mel.mean(axis=1, dtype=np.float64)).astype(np.float32)
+
+
+def window_features(windows, sr=SAMPLE_RATE, n_mfcc=N_MFCC, n_fft=N_FFT, hop_length=HOP_LENGTH,
+                    n_mels=N_MELS, top_db=TOP_DB):
+    """
+    (k, n_mfcc) mean MFCCs of a (k, samples) stack of equal-length windows,
+    each treated as its own clip (row i equals mean_mfcc(windows[i])). The
+    STFT of several windows runs as one batch.
+    """
+    windows = np.asarray(windows, dtype=np.float32)
+    if windows.ndim != 2 or windows.shape[1] == 0:
+        raise ValueError("windows must be a non-empty (k, samples) array")
+    frames = _frames(windows, n_fft, hop_length)               # (k, F, n_fft) view
+    k, n_frames = frames.shape[:2]
+    fb, window = mel_filterbank(sr, n_fft, n_mels), _hann(n_fft)
+
+    log_mel = np.empty((k, n_frames, n_mels), dtype=np.float32)
+    rows = max(1, _FRAMES_PER_BLOCK // n_frames)
+    for r0 in range(0, k, rows):
+        block = frames[r0:r0 + rows]
+        power = _mel_power(block.reshape(-1, n_fft), fb, window)
+        log_mel[r0:r0 + rows] = power.reshape(len(block), n_frames, n_mels)
+    np.log10(np.maximum(log_mel, AMIN, out=log_mel), out=log_mel)
+    log_mel *= 10.0
+    if top_db is not None:
+        np.maximum(log_mel, log_mel.max(axis=(1, 2), keepdims=True) - top_db, out=log_mel)
+    mean_log_mel = log_mel.mean(axis=1, dtype=np.float64)     # (k, n_mels)
+    return (mean_log_mel @ dct_matrix(n_mfcc, n_mels).T).astype(np.float32)
+
+
+def extract_features(source, sr=SAMPLE_RATE, n_mfcc=N_MFCC):
+    """40 mean MFCCs of an audio path / bytes / file object: the drone classifier's input."""
+    if isinstance(source, os.PathLike):
+        source = os.fspath(source)
+    return mean_mfcc(decode_audio(source, sr), sr, n_mfcc)
+
+
+def extract_features_chunk(jobs):
+    """
+    Process-pool task: (index, features or None, error or None) for each
+    (index, path) job. Kept here so workers import only this module.
+    """
+    out = []
+    for index, path in jobs:
+        try:
+            out.append((index, extract_features(path), None))
+        except Exception as e:
+            out.append((index, None, str(e) or type(e).__name__))
+    return out
+
+
+def single_threaded_worker():
+    """Pool initializer: one BLAS thread per worker process, so workers do not oversubscribe cores."""
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(1)
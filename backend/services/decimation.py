@@ -0,0 +1,162 @@
+# file: services/decimation.py
+import json
+import math
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from ..utils import signal_tools as st
+from ..utils.cache_tools import LRUCache
+
+# -----------------------
+# Multi-resolution min/max pyramid for zoomable viewing
+# -----------------------
+
+PYRAMID_FACTOR = 4           # samples per bucket grow by this factor per level
+PYRAMID_TOP_BUCKETS = 1024   # stop adding levels once a level is this small
+PYRAMID_MAX_OPEN = int(os.environ.get("PYRAMID_MAX_OPEN", 64))
+
+# Levels are memory-mapped, so open pyramids are counted (size=1 each), not bytes
+_open_pyramids = LRUCache(PYRAMID_MAX_OPEN)
+
+
+class MinMaxPyramid:
+    """
+    Per-channel min/max decimation pyramid stored as a directory next to the upload:
+
+        meta.json    fs, n_samples, channels, factor, source fingerprint
+        level0.npy   (samples, channels) float32, full resolution
+        levelK.npy   (2, buckets, channels) float32, [min, max] over factor**K samples
+
+    Any time range is answered from the finest level that fits in
+    ``max_points`` buckets, so a query costs O(pixels), not O(samples).
+    """
+
+    def __init__(self, path, meta, levels):
+        self.path = path
+        self.meta = meta
+        self.levels = levels
+        self.fs = float(meta["fs"])
+        self.n_samples = int(meta["n_samples"])
+        self.channels = list(meta["channels"])
+        self.factor = int(meta["factor"])
+
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        levels = [
+            np.load(os.path.join(path, f"level{k}.npy"), mmap_mode="r")
+            for k in range(meta["n_levels"])
+        ]
+        return cls(path, meta, levels)
+
+    @classmethod
+    def build(cls, path, data, fs, channels, source=None, factor=PYRAMID_FACTOR):
+        """Build the pyramid for ``data`` shaped (samples, channels) and write it to ``path``."""
+        data = np.asarray(data, dtype=np.float32)
+        parent = os.path.dirname(os.path.abspath(path))
+        tmp = tempfile.mkdtemp(prefix=".pyr-", dir=parent)
+        try:
+            np.save(os.path.join(tmp, "level0.npy"), data)
+            mins, maxs, k = data, data, 1
+            while mins.shape[0] > PYRAMID_TOP_BUCKETS:
+                # mins of the previous level's mins, maxs of its maxs
+                mins = st.block_reduce(mins, factor, np.min, axis=0)
+                maxs = st.block_reduce(maxs, factor, np.max, axis=0)
+                np.save(os.path.join(tmp, f"level{k}.npy"), np.stack([mins, maxs]))
+                k += 1
+
+            meta = {
+                "fs": float(fs),
+                "n_samples": int(data.shape[0]),
+                "channels": [str(c) for c in channels],
+                "factor": int(factor),
+                "n_levels": k,
+                "source": source,
+            }
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump(meta, f)
+
+            # swap the finished directory in place of any stale one
+            if os.path.exists(path):
+                shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return cls.open(path)
+
+    def query(self, start=0.0, end=None, max_points=2000, picks=None):
+        """
+        Min/max envelope of channels ``picks`` (indices) between ``start`` and
+        ``end`` seconds with at most ``max_points`` buckets per channel.
+        """
+        picks = list(range(len(self.channels))) if picks is None else list(picks)
+        max_points = max(1, int(max_points))
+
+        s0 = min(max(int(math.floor(start * self.fs)), 0), self.n_samples)
+        s1 = self.n_samples if end is None else int(math.ceil(end * self.fs))
+        s1 = min(max(s1, s0), self.n_samples)
+        span = max(s1 - s0, 1)
+
+        level = 0
+        while level < len(self.levels) - 1 and math.ceil(span / self.factor ** level) > max_points:
+            level += 1
+        size = self.factor ** level
+        b0, b1 = s0 // size, math.ceil(s1 / size)
+        start_index = b0 * size
+
+        if level == 0:
+            mins = maxs = np.asarray(self.levels[0][b0:b1])[:, picks]
+        else:
+            block = np.asarray(self.levels[level][:, b0:b1])
+            mins, maxs = block[0][:, picks], block[1][:, picks]
+
+        # the coarsest level may still be too dense for a very small max_points
+        if mins.shape[0] > max_points:
+            extra = math.ceil(mins.shape[0] / max_points)
+            mins = st.block_reduce(mins, extra, np.min, axis=0)
+            maxs = st.block_reduce(maxs, extra, np.max, axis=0)
+            size *= extra
+
+        return {
+            "fs": self.fs,
+            "level": level,
+            "bucket_size": size,
+            "start_index": int(start_index),
+            "t0": start_index / self.fs,
+            "dt": size / self.fs,
+            "n_points": int(mins.shape[0]),
+            "min": mins.T.tolist(),
+            "max": maxs.T.tolist(),
+        }
+
+
+def _jsonable(value):
+    return json.loads(json.dumps(value))
+
+
+def get_pyramid(path, source, build_source):
+    """
+    Return the pyramid stored at ``path``, (re)building it when it is missing
+    or was built from a different ``source`` fingerprint.
+
+    build_source: callable returning (data (samples, channels), fs, channel_names)
+    """
+    source = _jsonable(source)
+
+    def _open_or_build():
+        if os.path.exists(os.path.join(path, "meta.json")):
+            try:
+                pyramid = MinMaxPyramid.open(path)
+                if pyramid.meta.get("source") == source:
+                    return pyramid
+            except (OSError, ValueError, KeyError):
+                pass  # corrupt or partial: rebuild below
+        data, fs, channels = build_source()
+        return MinMaxPyramid.build(path, data, fs, channels, source=source)
+
+    return _open_pyramids.get_or_create((path, json.dumps(source)), _open_or_build, size=1)
@@ -0,0 +1,253 @@
+# file: services/drone_batch.py
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from . import audio_features
+
+# -----------------------
+# Batch drone classification over many clips
+# -----------------------
+# Decoding and MFCCs run on a process pool (a chunk of files per task, a
+# bounded number of tasks in flight); the classifier sees large stacked
+# batches. Results stream out per file, in completion order, as NDJSON or
+# CSV, followed by a throughput summary.
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".oga", ".aif", ".aiff", ".mp3")
+BATCH_WORKERS = int(os.environ.get("DRONE_BATCH_WORKERS", 0)) or os.cpu_count() or 1
+BATCH_SIZE = 1024
+BATCH_MAX_SIZE = 65536
+FILES_PER_TASK = 16
+TASKS_PER_WORKER = 4          # tasks kept in flight per worker process
+LABELS = ("Noise", "Drone")
+CSV_FIELDS = ("file", "label", "confidence", "drone_probability", "error")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def list_audio_files(directory, recursive=True):
+    """(name relative to ``directory``, path) of every audio file in it, sorted."""
+    files = []
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".")) if recursive else []
+        for name in sorted(names):
+            if name.lower().endswith(AUDIO_EXTENSIONS) and not name.startswith("."):
+                path = os.path.join(root, name)
+                files.append((os.path.relpath(path, directory), path))
+    return files
+
+
+def new_pool(workers=BATCH_WORKERS, warm=True):
+    """
+    Spawned process pool for feature extraction: workers only import the
+    numpy / soundfile feature code, not the parent's torch state and threads
+    (this module imports torch lazily, so that holds for the CLI too).
+    ``warm`` starts every worker now, so throughput figures exclude start-up.
+    """
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=audio_features.single_threaded_worker)
+    if warm:
+        wait([pool.submit(time.sleep, 0.05) for _ in range(workers)])
+    return pool
+
+
+def shared_pool():
+    """Process pool reused by every batch request (started on first use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = new_pool()
+        return _pool
+
+
+def _reset_shared_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _classify(model, batch, device):
+    import torch
+
+    x = torch.from_numpy(np.stack([features for _, features in batch])).to(device)
+    with torch.inference_mode():
+        probs = torch.softmax(model(x), dim=1).float().cpu().numpy()
+    for (name, _), p in zip(batch, probs):
+        idx = int(np.argmax(p))
+        yield {
+            "file": name,
+            "label": LABELS[idx],
+            "confidence": round(float(np.clip(p[idx], 0.0, 1.0)) * 100, 2),
+            "drone_probability": round(float(p[1]), 4),
+        }
+
+
+def iter_classify(model, files, pool, batch_size=BATCH_SIZE, files_per_task=FILES_PER_TASK, device="cpu"):
+    """
+    Yield one result dict per (name, path) in ``files`` ({"file", "label",
+    "confidence", "drone_probability"} or {"file", "error"}), then
+    {"summary": {...}} with the files per second.
+    """
+    started = time.perf_counter()
+    done = errors = 0
+    jobs = iter(enumerate(path for _, path in files))
+    names = [name for name, _ in files]
+    max_in_flight = TASKS_PER_WORKER * max(1, getattr(pool, "_max_workers", 1))
+    in_flight = set()
+    batch = []
+
+    def _fill():
+        while len(in_flight) < max_in_flight:
+            chunk = [job for _, job in zip(range(files_per_task), jobs)]
+            if not chunk:
+                return
+            in_flight.add(pool.submit(audio_features.extract_features_chunk, chunk))
+
+    try:
+        _fill()
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                in_flight.discard(future)
+                for index, features, error in future.result():
+                    if error is not None:
+                        errors += 1
+                        yield {"file": names[index], "error": f"Failed to extract features: {error}"}
+                    else:
+                        batch.append((names[index], features))
+            _fill()
+
+            # the last, partial batch is flushed once nothing is left in flight
+            while len(batch) >= batch_size or (batch and not in_flight):
+                for result in _classify(model, batch[:batch_size], device):
+                    done += 1
+                    yield result
+                batch = batch[batch_size:]
+    except BrokenProcessPool as e:
+        if pool is _pool:
+            _reset_shared_pool(pool)
+        errors += len(files) - done - errors
+        yield {"error": f"Feature worker pool failed, remaining files were not classified: {e}"}
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+    elapsed = time.perf_counter() - started
+    yield {"summary": {
+        "classified": done,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "files_per_second": round((done + errors) / elapsed, 1) if elapsed > 0 else 0.0,
+        "workers": getattr(pool, "_max_workers", None),
+    }}
+
+
+# -----------------------
+# Output formats
+# -----------------------
+
+def to_ndjson(results):
+    for result in results:
+        yield json.dumps(result) + "\n"
+
+
+def to_csv(results):
+    """CSV rows with a header; the summary becomes a trailing '# key=value ...' comment line."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=CSV_FIELDS, lineterminator="\n")
+    writer.writeheader()
+    for result in results:
+        if "summary" in result:
+            buf.write("# " + " ".join(f"{k}={v}" for k, v in result["summary"].items()) + "\n")
+        else:
+            writer.writerow(result)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+FORMATS = {"ndjson": (to_ndjson, "application/x-ndjson"), "csv": (to_csv, "text/csv")}
+
+
+# -----------------------
+# Command line
+# -----------------------
+
+def main(argv=None):
+    """
+    Classify directories and zip / tar archives of clips:
+
+        python -m backend.services.drone_batch clips/ more.zip --format csv -o results.csv --workers 8
+    """
+    import torch
+
+    from ..utils.file_handler import extract_archive, is_archive
+    from . import model_registry, torch_runtime
+    from .drone_model import load_trained_model
+
+    parser = argparse.ArgumentParser(description=main.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="directories or .zip / .tar(.gz) archives")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--no-recursive", action="store_true", help="only the top level of directories")
+    parser.add_argument("--model", default=model_registry.pretrained_path("model.pth"))
+    args = parser.parse_args(argv)
+
+    workdirs = []
+    files = []
+    try:
+        for item in args.inputs:
+            if os.path.isdir(item):
+                files += [(os.path.join(os.path.basename(os.path.normpath(item)), name), path)
+                          for name, path in list_audio_files(item, recursive=not args.no_recursive)]
+            elif is_archive(item):
+                workdirs.append(tempfile.mkdtemp(prefix="drone-batch-"))
+                with open(item, "rb") as f:
+                    paths = extract_archive(f, item, workdirs[-1], extensions=AUDIO_EXTENSIONS)
+                files += [(os.path.join(os.path.basename(item), os.path.basename(p)), p) for p in sorted(paths)]
+            else:
+                parser.error(f"{item} is neither a directory nor a .zip / .tar archive")
+
+        model = torch_runtime.optimize(load_trained_model(args.model), torch.zeros(1, audio_features.N_MFCC))
+        summary = {}
+
+        def _remember_summary(results):
+            for result in results:
+                summary.update(result.get("summary", {}))
+                yield result
+
+        out = open(args.output, "w", newline="") if args.output else sys.stdout
+        try:
+            with new_pool(max(1, args.workers)) as pool:
+                results = iter_classify(model, files, pool, batch_size=max(1, args.batch_size))
+                for chunk in FORMATS[args.format][0](_remember_summary(results)):
+                    out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(f"{summary['classified']} classified, {summary['errors']} errors in {summary['seconds']} s "
+              f"({summary['files_per_second']} files/s, {summary['workers']} workers)", file=sys.stderr)
+    finally:
+        for workdir in workdirs:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# file: services/drone_inference.py
+import numpy as np
+import torch
+
+from . import audio_features
+
+# -----------------------
+# Sliding-window drone detection over long recordings
+# -----------------------
+# The recording is decoded and resampled block by block; every window is
+# scored as if it were its own clip (mean MFCCs, as in training) and the
+# windows go through the classifier in batches. Only one block of audio and
+# one batch of features exist at a time, whatever the recording length.
+
+WINDOW_S = 1.0
+HOP_S = 0.5
+BATCH_SIZE = 256
+THRESHOLD = 0.5
+DRONE_CLASS = 1
+
+
+class SlidingWindowDetector:
+    """
+    Drone probability of every window of a recording:
+
+        detector = SlidingWindowDetector(model, device)
+        result = detector.timeline(path_or_bytes)   # times_s, drone_probability, intervals
+
+    The model sees (batch, 40) mean-MFCC float32 input, like AudioClassifier.
+    """
+
+    def __init__(self, model, device="cpu", window_s=WINDOW_S, hop_s=HOP_S, batch_size=BATCH_SIZE,
+                 sr=audio_features.SAMPLE_RATE, block_s=audio_features.BLOCK_S):
+        self.model = model
+        self.device = torch.device(device)
+        self.sr = int(sr)
+        self.window = max(1, int(round(window_s * self.sr)))
+        self.hop = max(1, int(round(hop_s * self.sr)))
+        self.batch_size = int(batch_size)
+        self.block_s = block_s
+        self.n_samples = 0   # samples decoded by the last iter_window_probs run
+
+    def _score(self, windows):
+        x = torch.from_numpy(audio_features.window_features(windows, self.sr)).to(self.device)
+        with torch.inference_mode():
+            return torch.softmax(self.model(x), dim=1).float().cpu().numpy()
+
+    def iter_window_probs(self, source):
+        """
+        Yield (start sample of each window, (k, classes) softmax) per batch.
+        A recording shorter than one window is scored whole, as one window.
+        """
+        pending = np.zeros(0, dtype=np.float32)   # audio from the next window start on
+        offset = 0                                # sample index of the next window start
+        skip = 0                                  # samples still to drop before it (hop > window)
+        self.n_samples = 0
+        for block in audio_features.iter_audio_blocks(source, self.sr, self.block_s):
+            self.n_samples += len(block)
+            if skip:
+                block, skip = block[skip:], max(0, skip - len(block))
+            pending = np.concatenate([pending, block])
+            if len(pending) < self.window:
+                continue
+            n = (len(pending) - self.window) // self.hop + 1
+            windows = np.lib.stride_tricks.sliding_window_view(pending, self.window)[::self.hop][:n]
+            for b0 in range(0, n, self.batch_size):
+                batch = windows[b0:b0 + self.batch_size]
+                yield offset + (b0 + np.arange(len(batch))) * self.hop, self._score(batch)
+            skip = max(0, n * self.hop - len(pending))
+            pending, offset = pending[n * self.hop:], offset + n * self.hop
+
+        if self.n_samples == 0:
+            raise ValueError("Audio is empty")
+        if self.n_samples < self.window:
+            yield np.zeros(1, dtype=np.int64), self._score(pending[None])
+
+    def timeline(self, source, threshold=THRESHOLD, min_gap_s=0.0):
+        """
+        {"duration_s", "window_s", "hop_s", "times_s" (window starts),
+        "drone_probability", "intervals"} for the whole recording.
+        """
+        starts, drone = [], []
+        for batch_starts, probs in self.iter_window_probs(source):
+            starts.append(batch_starts)
+            drone.append(probs[:, DRONE_CLASS])
+        times_s = np.concatenate(starts) / self.sr
+        drone = np.concatenate(drone)
+        window_s = min(self.window, self.n_samples) / self.sr
+        return {
+            "duration_s": self.n_samples / self.sr,
+            "window_s": window_s,
+            "hop_s": self.hop / self.sr,
+            "times_s": times_s,
+            "drone_probability": drone,
+            "intervals": detection_intervals(times_s, drone, window_s, threshold, min_gap_s),
+        }
+
+
+def detection_intervals(starts_s, probs, window_s=WINDOW_S, threshold=THRESHOLD, min_gap_s=0.0):
+    """
+    Merge windows whose drone probability is >= threshold into intervals.
+    Windows that overlap (or are at most ``min_gap_s`` apart) join one
+    interval; each reports its start/end (s), peak and mean probability.
+    """
+    intervals = []
+    for start, p in zip(starts_s, probs):
+        if p < threshold:
+            continue
+        start, end, p = float(start), float(start) + window_s, float(p)
+        last = intervals[-1] if intervals else None
+        if last is not None and start <= last["end_s"] + min_gap_s:
+            last["end_s"] = max(last["end_s"], end)
+            last["max_probability"] = max(last["max_probability"], p)
+            last["mean_probability"] += p
+            last["n_windows"] += 1
+        else:
+            intervals.append({"start_s": start, "end_s": end, "max_probability": p,
+                              "mean_probability": p, "n_windows": 1})
+    for interval in intervals:
+        interval["mean_probability"] /= interval["n_windows"]
+    return intervals
+
+
+# -----------------------
+# Live PCM streams
+# -----------------------
+# LiveDetector scores the same windows as SlidingWindowDetector while audio
+# arrives. The hop is rounded to whole STFT hops, so the frames inside a
+# window that do not touch its zero-padded edges fall on one stream-wide frame
+# grid: each of those is transformed once and kept in a ring, and only the few
+# edge frames are computed per window.
+
+MAX_LIVE_BUFFER_S = 10.0   # audio held per connection beyond the current window
+
+
+class LiveDetector:
+    """
+    Incremental drone detection over pushed sample blocks:
+
+        detector = LiveDetector(model, input_sr=48000)
+        for result in detector.push(samples):     # mono float32 at input_sr
+            result["drone_probability"], result["start_s"], result["end_s"]
+
+    Each result equals scoring that window as its own clip (SlidingWindowDetector).
+    """
+
+    def __init__(self, model, input_sr=audio_features.SAMPLE_RATE, window_s=WINDOW_S, hop_s=HOP_S,
+                 device="cpu", sr=audio_features.SAMPLE_RATE):
+        self.model = model
+        self.device = torch.device(device)
+        self.sr = int(sr)
+        self.n_fft, self.frame_hop = audio_features.N_FFT, audio_features.HOP_LENGTH
+        self.window = max(1, int(round(window_s * self.sr)))
+        self.hop = max(1, int(round(hop_s * self.sr / self.frame_hop))) * self.frame_hop
+        self._resampler = audio_features.BlockResampler(input_sr, self.sr)
+        self._fb = audio_features.mel_filterbank(self.sr, self.n_fft)
+        self._hann = audio_features._hann(self.n_fft)
+        self._dct = audio_features.dct_matrix(audio_features.N_MFCC, self._fb.shape[0])
+
+        half = self.n_fft // 2
+        j = np.arange(1 + self.window // self.frame_hop)       # frames of one window (centred)
+        interior = (j * self.frame_hop >= half) & (j * self.frame_hop + half <= self.window)
+        self._interior, self._edge = j[interior], j[~interior]
+        self._n_frames = len(j)
+
+        # mel power of stream frame m (centred on sample m * frame_hop) in row m % len(ring)
+        self._ring = np.zeros((self._n_frames + self.hop // self.frame_hop + 1, self._fb.shape[0]), dtype=np.float32)
+        self._next_frame = 0
+        # samples from the next window's start on: audio[i] is stream sample audio_start + i
+        self._audio = np.zeros(self.window + self.hop + int(MAX_LIVE_BUFFER_S * self.sr), dtype=np.float32)
+        self._audio_start = 0
+        self._audio_len = 0
+        self._next_window = 0
+
+    @property
+    def samples_received(self):
+        """Samples (at sr) received so far."""
+        return self._audio_start + self._audio_len
+
+    def _append(self, y):
+        keep = self._next_window * self.hop - self._audio_start
+        if self._audio_len + len(y) > len(self._audio):
+            live = self._audio_len - keep
+            if live + len(y) > len(self._audio):
+                raise ValueError("Audio arrives faster than it can be buffered")
+            self._audio[:live] = self._audio[keep:self._audio_len]
+            self._audio_start += keep
+            self._audio_len = live
+        self._audio[self._audio_len:self._audio_len + len(y)] = y
+        self._audio_len += len(y)
+
+    def _slice(self, start, stop):
+        return self._audio[start - self._audio_start:stop - self._audio_start]
+
+    def _window_log_mel(self, start):
+        """(frames, n_mels) log-mel of the window starting at stream sample ``start``."""
+        half = self.n_fft // 2
+        mel = np.empty((self._n_frames, self._fb.shape[0]), dtype=np.float32)
+        if len(self._interior):
+            first = start // self.frame_hop + self._interior[0]
+            last = start // self.frame_hop + self._interior[-1]
+            m0 = max(self._next_frame, first)
+            if m0 <= last:
+                frames = np.lib.stride_tricks.sliding_window_view(
+                    self._slice(m0 * self.frame_hop - half, last * self.frame_hop + half), self.n_fft
+                )[::self.frame_hop]
+                rows = np.arange(m0, last + 1) % len(self._ring)
+                self._ring[rows] = audio_features._mel_power(frames, self._fb, self._hann)
+                self._next_frame = last + 1
+            mel[self._interior] = self._ring[np.arange(first, last + 1) % len(self._ring)]
+        if len(self._edge):
+            padded = np.pad(self._slice(start, start + self.window), half)
+            frames = np.stack([padded[j * self.frame_hop:j * self.frame_hop + self.n_fft] for j in self._edge])
+            mel[self._edge] = audio_features._mel_power(frames, self._fb, self._hann)
+
+        log_mel = 10.0 * np.log10(np.maximum(mel, audio_features.AMIN))
+        return np.maximum(log_mel, log_mel.max() - audio_features.TOP_DB)
+
+    def push(self, samples):
+        """Feed mono samples at input_sr; returns a result dict per window completed by them."""
+        y = self._resampler.process(samples)
+        # a long message goes in pieces that always fit once the windows before them are scored
+        piece = len(self._audio) - self.window - self.hop
+        results = []
+        for i in range(0, len(y), piece):
+            self._append(y[i:i + piece])
+            results += self._score_completed()
+        return results
+
+    def _score_completed(self):
+        starts, features = [], []
+        while self._next_window * self.hop + self.window <= self.samples_received:
+            start = self._next_window * self.hop
+            mean_log_mel = self._window_log_mel(start).mean(axis=0, dtype=np.float64)
+            features.append((self._dct @ mean_log_mel).astype(np.float32))
+            starts.append(start)
+            self._next_window += 1
+        if not features:
+            return []
+
+        x = torch.from_numpy(np.stack(features)).to(self.device)
+        with torch.inference_mode():
+            probs = torch.softmax(self.model(x), dim=1).float().cpu().numpy()
+        return [
+            {
+                "window": start // self.hop,
+                "start_s": start / self.sr,
+                "end_s": (start + self.window) / self.sr,
+                "drone_probability": float(p[DRONE_CLASS]),
+                "noise_probability": float(p[1 - DRONE_CLASS]),
+            }
+            for start, p in zip(starts, probs)
+        ]
@@ -0,0 +1,35 @@
+import torch
+import torch.nn as nn
+
+from . import audio_features
+
+# Drone / noise classifier over 40 mean MFCCs (trained in pretrained_models/model.py)
+class AudioClassifier(nn.Module):
+    def __init__(self):
+        super(AudioClassifier, self).__init__()
+        self.fc1 = nn.Linear(40, 128)
+        self.fc2 = nn.Linear(128, 64)
+        self.fc3 = nn.Linear(64, 2)
+        self.relu = nn.ReLU()
+        self.dropout = nn.Dropout(0.3)
+
+    def forward(self, x):
+        if x.ndim == 1:
+            x = x.unsqueeze(0)
+        x = self.relu(self.fc1(x))
+        x = self.dropout(self.relu(self.fc2(x)))
+        x = self.fc3(x)
+        return x
+
+# Feature extraction: 40 mean MFCCs at 16 kHz, as pretrained_models/mfcc.py
+# computes them with librosa (services/audio_features.py, no librosa import)
+def extract_features(source):
+    return torch.from_numpy(audio_features.extract_features(source))
+
+# Load model
+def load_trained_model(model_path: str, device="cpu"):
+    model = AudioClassifier()
+    model.load_state_dict(torch.load(model_path, map_location=device))
+    model.to(device)
+    model.eval()
+    return model
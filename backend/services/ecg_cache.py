@@ -0,0 +1,138 @@
+# file: services/ecg_cache.py
+import os
+import threading
+
+import numpy as np
+import wfdb
+
+from ..utils.cache_tools import LRUCache, file_fingerprint
+from . import ecg_processing as dsp
+from . import decimation
+
+# -----------------------
+# Decoded / filtered ECG record cache
+# -----------------------
+
+# Total memory the cache may hold (raw + filtered signals + R-peaks), in bytes
+CACHE_MAX_BYTES = int(os.environ.get("ECG_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+_cache = LRUCache(CACHE_MAX_BYTES)
+
+
+class ECGRecord:
+    """
+    One decoded WFDB record plus everything derived from it.
+
+    Exposes ``p_signal``, ``fs`` and ``sig_name`` like ``wfdb.Record`` so it can
+    be handed straight to the model preprocessors in ``models_processing``.
+    """
+
+    def __init__(self, p_signal, fs, sig_name, filtered):
+        self.p_signal = p_signal
+        self.fs = fs
+        self.sig_name = list(sig_name)
+        self.filtered = filtered
+        self.r_peaks = {}  # (lead, min_rr_s) -> list of sample indices
+        self._lock = threading.Lock()
+
+        # shared between requests: make accidental in-place edits fail loudly
+        self.p_signal.flags.writeable = False
+        self.filtered.flags.writeable = False
+
+    @property
+    def nbytes(self):
+        peaks = sum(8 * len(v) for v in self.r_peaks.values())
+        return int(self.p_signal.nbytes + self.filtered.nbytes + peaks)
+
+
+def _record_base(file_path: str) -> str:
+    # WFDB reads by base name (no extension)
+    base, ext = os.path.splitext(file_path)
+    return base if ext.lower() in (".dat", ".hea") else file_path
+
+
+def _record_key(base: str):
+    paths = [base + ".hea"]
+    if os.path.exists(base + ".dat"):
+        paths.append(base + ".dat")
+    return file_fingerprint(*paths)
+
+
+def record_fingerprint(file_path: str):
+    """Key that changes whenever the record's .hea / .dat files are rewritten."""
+    return _record_key(_record_base(file_path))
+
+
+def load_record(file_path: str) -> ECGRecord:
+    """
+    Return the decoded + filtered record at ``file_path``, parsing and filtering
+    it only if this version of the files is not cached yet.
+    """
+    base = _record_base(file_path)
+    key = _record_key(base)
+
+    def _decode():
+        record = wfdb.rdrecord(base)
+        raw = np.asarray(record.p_signal)
+        filtered = dsp.filter_ecg_signals(raw, record.fs)
+        return ECGRecord(raw, record.fs, record.sig_name, filtered)
+
+    return _cache.get_or_create(key, _decode)
+
+
+def read_record(file_path: str):
+    """
+    Raw decode for one-off work (e.g. bulk classification): returns the cached
+    record if it is already loaded, otherwise reads it without filtering or
+    caching. The lookup leaves the viewer cache's hit / miss counters alone.
+    """
+    base = _record_base(file_path)
+    cached = _cache.peek(_record_key(base))
+    return cached if cached is not None else wfdb.rdrecord(base)
+
+
+def get_r_peaks(file_path: str, leads=(0, 1, 2), min_rr_s=0.5):
+    """
+    R-peaks of the cached filtered record, detecting only the leads that have
+    not been computed for this record yet.
+    """
+    base = _record_base(file_path)
+    key = _record_key(base)
+    record = load_record(file_path)
+
+    with record._lock:
+        missing = [int(lead) for lead in leads if (int(lead), min_rr_s) not in record.r_peaks]
+        if missing:
+            found = dsp.detect_r_peaks(
+                record.filtered, record.fs, leads=missing, min_rr_s=min_rr_s, prefiltered=True
+            )
+            for lead, peaks in found.items():
+                record.r_peaks[(int(lead), min_rr_s)] = peaks
+            # re-account the entry size now that it carries more peaks
+            if key in _cache:
+                _cache.put(key, record)
+
+        return {int(lead): record.r_peaks[(int(lead), min_rr_s)] for lead in leads}
+
+
+def get_pyramid(file_path: str):
+    """
+    Min/max pyramid of the filtered record, stored as ``<record>.pyr`` next to
+    the upload and rebuilt only when the record files change.
+    """
+    base = _record_base(file_path)
+    key = _record_key(base)
+
+    def _source():
+        record = load_record(file_path)
+        return record.filtered, record.fs, record.sig_name
+
+    return decimation.get_pyramid(base + ".pyr", key, _source)
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,75 @@
+# file: services/ecg_inference.py
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Low-overhead Keras inference
+# -----------------------
+# model.predict() builds a data adapter and a tf.data pipeline on every call,
+# which costs more than the forward pass itself for a single (1, 4096, 12)
+# record. A tf.function traced once with a fixed input signature (batch
+# dimension left open) runs the same graph with none of that per-call setup.
+
+
+def _trace(model, input_shape):
+    """tf.function over ``model(x, training=False)``, or None when TensorFlow is unavailable."""
+    try:
+        import tensorflow as tf
+    except ImportError:
+        return None
+
+    spec = tf.TensorSpec(shape=(None, *input_shape), dtype=tf.float32)
+
+    @tf.function(input_signature=[spec])
+    def _infer(x):
+        return model(x, training=False)
+
+    return _infer
+
+
+class KerasPredictor:
+    """
+    Callable wrapper around a loaded Keras model:
+
+        predictor = KerasPredictor(load_model(path, compile=False))
+        predictor.warmup()
+        probs = predictor(X)          # same values as model.predict(X)
+
+    Falls back to an eager ``model(x, training=False)`` call if tracing is
+    not possible (no TensorFlow backend, or the trace fails during warm-up).
+    """
+
+    def __init__(self, model, input_shape=None):
+        self.model = model
+        self.input_shape = tuple(input_shape or model.input_shape[1:])
+        self._fn = _trace(model, self.input_shape)
+
+    @property
+    def compiled(self):
+        return self._fn is not None
+
+    def __call__(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != len(self.input_shape) + 1 or any(
+            want is not None and got != want for got, want in zip(X.shape[1:], self.input_shape)
+        ):
+            raise ValueError(f"Expected input shape (n, {', '.join(map(str, self.input_shape))}), got {X.shape}")
+        out = self._fn(X) if self._fn is not None else self.model(X, training=False)
+        return np.asarray(out)
+
+    def warmup(self, batch_sizes=(1,)):
+        """Trace / initialize the graph now so the first request does not pay for it."""
+        for n in batch_sizes:
+            shape = (n, *(d if d is not None else 1 for d in self.input_shape))
+            try:
+                self(np.zeros(shape, dtype=np.float32))
+            except Exception:
+                if self._fn is None:
+                    raise
+                logger.exception("Tracing failed, falling back to eager inference")
+                self._fn = None
+                self(np.zeros(shape, dtype=np.float32))
+        return self
@@ -2,25 +2,19 @@
 import os
 import wfdb
 import numpy as np
-from scipy.signal import find_peaks, butter, filtfilt, iirnotch, resample
-import matplotlib.pyplot as plt
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import find_peaks, resample
+from ..utils import signal_tools as st
 
 # -----------------------
 # DSP / ECG Processing
 # -----------------------
 
-def bandpass_filter(signal, fs, lowcut=0.5, highcut=30.0, order=2):
-    nyq = 0.5 * fs
-    low = lowcut / nyq
-    high = highcut / nyq
-    b, a = butter(order, [low, high], btype="band")
-    return filtfilt(b, a, signal)
+def bandpass_filter(signal, fs, lowcut=0.5, highcut=30.0, order=2, axis=0):
+    return st.bandpass(signal, fs, lowcut, highcut, order=order, axis=axis)
 
-def notch_filter(signal, fs, freq=50.0, quality=30):
-    nyq = 0.5 * fs
-    w0 = freq / nyq
-    b, a = iirnotch(w0, quality)
-    return filtfilt(b, a, signal)
+def notch_filter(signal, fs, freq=50.0, quality=30, axis=0):
+    return st.notch(signal, fs, freq=freq, quality=quality, axis=axis)
 
 # existing helper used by websocket endpoint (kept)
 def load_ecg_record(record_number: str):
@@ -43,24 +37,27 @@ def load_ecg_record_from_path(file_path: str):
     fs = record.fs
     leads = record.sig_name  # list of lead names, e.g. ["I", "II", "III", ..., "V6"]
 
-    filtered_signals = np.zeros_like(signals)
-    for i in range(signals.shape[1]):
-        sig = signals[:, i]
-        sig = bandpass_filter(sig, fs)
-        sig = notch_filter(sig, fs, freq=50.0)
-        filtered_signals[:, i] = sig
+    return filter_ecg_signals(signals, fs), fs, leads
 
-    return filtered_signals, fs, leads
+def filter_ecg_signals(signals, fs, float32=False):
+    """
+    Band-pass (0.5-30 Hz) and 50 Hz notch every lead of a (samples, leads) array
+    in a single fused, vectorized pass.
+    """
+    return st.bandpass_notch(signals, fs, lowcut=0.5, highcut=30.0, notch_freq=50.0,
+                             axis=0, float32=float32)
 
-def get_r_peaks_per_lead(signals, fs, leads=[0, 1, 2], min_rr_s=0.5):
+def get_r_peaks_per_lead(signals, fs, leads=[0, 1, 2], min_rr_s=0.5, prefiltered=False):
     """
     Simple, reliable R-peak detection - similar to what was working before
+    Pass prefiltered=True when ``signals`` already went through filter_ecg_signals
+    to skip the redundant band-pass.
     """
     peaks_dict = {}
     distance = int(min_rr_s * fs)
 
     for lead in leads:
-        sig = bandpass_filter(signals[:, lead], fs)
+        sig = signals[:, lead] if prefiltered else bandpass_filter(signals[:, lead], fs)
         
         # Simple approach: detect peaks on the absolute signal
         # This handles both positive and negative R-waves naturally
@@ -118,6 +115,91 @@ def get_r_peaks_per_lead(signals, fs, leads=[0, 1, 2], min_rr_s=0.5):
     return peaks_dict
 
 
+def _enforce_refractory(peaks, groups, distance):
+    """
+    Greedy refractory filter over peaks sorted within each group (lead).
+    A peak at least ``distance`` after its predecessor is always kept, so only
+    the rare runs of too-close peaks need the sequential pass.
+    """
+    keep = np.ones(len(peaks), dtype=bool)
+    if len(peaks) < 2:
+        return keep
+
+    close = (np.diff(peaks) < distance) & (groups[1:] == groups[:-1])
+    last = 0
+    prev = -2
+    for j in (np.flatnonzero(close) + 1).tolist():
+        if j != prev + 1:
+            last = peaks[j - 1]  # start of a run: its anchor is always kept
+        if peaks[j] - last >= distance:
+            last = peaks[j]
+        else:
+            keep[j] = False
+        prev = j
+    return keep
+
+
+def detect_r_peaks(signals, fs, leads=[0, 1, 2], min_rr_s=0.5, prefiltered=False):
+    """
+    Vectorized equivalent of get_r_peaks_per_lead (same peaks, same order).
+    All peaks of all leads are refined at once on strided windows, de-duplicated
+    with np.unique and passed through a mostly vectorized refractory filter.
+    """
+    leads = [int(lead) for lead in leads]
+    if not leads:
+        return {}
+
+    distance = int(min_rr_s * fs)
+    search_window = int(0.04 * fs)  # 40ms search window
+
+    if prefiltered:
+        sigs = np.ascontiguousarray(signals[:, leads].T)
+    else:
+        sigs = np.ascontiguousarray(bandpass_filter(signals[:, leads], fs, axis=0).T)
+    n_samples = sigs.shape[1]
+
+    # Candidate peaks on the absolute signal (find_peaks itself is compiled)
+    candidates, owners = [], []
+    for row, sig in enumerate(sigs):
+        abs_sig = np.abs(sig)
+        prominence = max(0.3 * np.std(abs_sig), 0.1 * np.max(abs_sig))
+        peaks, _ = find_peaks(
+            abs_sig,
+            distance=distance,
+            prominence=prominence,
+            height=0.2 * np.max(abs_sig)
+        )
+        candidates.append(peaks)
+        owners.append(np.full(len(peaks), row))
+    candidates = np.concatenate(candidates)
+    owners = np.concatenate(owners)
+
+    # Refine every candidate to the stronger of the local max / min.
+    # Windows near the record edges are shifted inwards and the samples outside
+    # [peak - w, peak + w] masked out, which reproduces the clipped slices.
+    width = min(2 * search_window + 1, n_samples)
+    starts = np.clip(candidates - search_window, 0, n_samples - width)
+    windows = sliding_window_view(sigs, width, axis=1)[owners, starts]    # (n_peaks, width)
+    positions = starts[:, None] + np.arange(width)
+    inside = np.abs(positions - candidates[:, None]) <= search_window
+    max_idx = np.argmax(np.where(inside, windows, -np.inf), axis=1)
+    min_idx = np.argmin(np.where(inside, windows, np.inf), axis=1)
+    rows = np.arange(len(candidates))
+    use_min = np.abs(windows[rows, min_idx]) > np.abs(windows[rows, max_idx])
+    refined = starts + np.where(use_min, min_idx, max_idx)
+
+    # Remove duplicates and sort per lead, then enforce the refractory period
+    keys = np.unique(owners * (n_samples + 1) + refined)
+    owners, refined = np.divmod(keys, n_samples + 1)
+    keep = _enforce_refractory(refined, owners, distance)
+    owners, refined = owners[keep], refined[keep]
+
+    bounds = np.searchsorted(owners, np.arange(len(leads) + 1))
+    return {
+        lead: refined[bounds[row]:bounds[row + 1]].tolist()
+        for row, lead in enumerate(leads)
+    }
+
 def extract_cycles(signals, r_peaks_dict, selected_leads=[0, 1, 2]):
     """
     Extract heartbeat cycles between R-peaks.
@@ -133,3 +215,38 @@ def extract_cycles(signals, r_peaks_dict, selected_leads=[0, 1, 2]):
                 lead_cycles.append(cycle.tolist())
         cycles[lead] = lead_cycles
     return cycles
+
+
+def cycle_bounds(r_peaks_dict):
+    """
+    Heartbeat cycles as [start, end) sample indices between consecutive R-peaks,
+    without copying any samples.
+    """
+    bounds = {}
+    for lead, r_peaks in r_peaks_dict.items():
+        peaks = np.asarray(r_peaks, dtype=np.int64)
+        pairs = np.stack([peaks[:-1], peaks[1:]], axis=1) if len(peaks) > 1 else np.empty((0, 2), np.int64)
+        bounds[lead] = pairs[pairs[:, 1] > pairs[:, 0]]
+    return bounds
+
+
+def beat_matrix(signal, r_peaks, n_points=200):
+    """
+    Resample every R-R cycle of a 1-D signal to ``n_points`` samples in one
+    vectorized step (linear interpolation, same as np.interp per cycle).
+    Returns a (n_beats, n_points) float32 array.
+    """
+    peaks = np.asarray(r_peaks, dtype=np.int64)
+    if len(peaks) < 2:
+        return np.empty((0, n_points), dtype=np.float32)
+    bounds = np.stack([peaks[:-1], peaks[1:]], axis=1)
+    return st.resample_segments(signal, bounds[bounds[:, 1] > bounds[:, 0]], n_points)
+
+
+def beat_template(beats, method="median"):
+    """Per-sample median (robust to ectopic beats) or mean of a beat matrix."""
+    if len(beats) == 0:
+        return np.empty(beats.shape[1], dtype=np.float32)
+    if method == "mean":
+        return beats.mean(axis=0).astype(np.float32)
+    return np.median(beats, axis=0).astype(np.float32)
@@ -0,0 +1,223 @@
+# file: services/eeg_cache.py
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from ..utils.cache_tools import DiskBudget, LRUCache, content_hash
+from .eeg_processing import load_raw, preprocess_raw, to_microvolts
+
+# -----------------------
+# Preprocessed EEG cache (memory LRU + memory-mapped .npy spill)
+# -----------------------
+
+# RAM budget for preprocessed arrays held in memory, in bytes (memory-mapped
+# entries count against the disk budget instead)
+CACHE_MAX_BYTES = int(os.environ.get("EEG_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+# Disk budget of the spill directory, and how long an unused spill is kept
+CACHE_DISK_MAX_BYTES = int(os.environ.get("EEG_CACHE_DISK_MAX_BYTES", 4 * 1024 * 1024 * 1024))
+CACHE_TTL_S = float(os.environ.get("EEG_CACHE_TTL_S", 7 * 24 * 3600))
+
+# Spill directory; files are named by content hash, so a re-uploaded or renamed
+# copy of the same recording hits the same entry
+CACHE_DIR = os.environ.get(
+    "EEG_CACHE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "cache", "eeg")),
+)
+
+_cache = LRUCache(CACHE_MAX_BYTES)
+_spills = None      # DiskBudget over CACHE_DIR, built on first use
+_spill_keys = {}    # spill base -> cache key, to drop memory maps of evicted spills
+
+
+def _spill_budget():
+    global _spills
+    if _spills is None:
+        _spills = DiskBudget(CACHE_DIR, CACHE_DISK_MAX_BYTES, CACHE_TTL_S, on_evict=_forget_spill)
+    return _spills
+
+
+def _forget_spill(base):
+    key = _spill_keys.pop(base, None)
+    if key is not None:
+        _cache.pop(key)
+
+
+class PreprocessedEEG:
+    """
+    Whole-file output of ``preprocess_raw`` as float32 µV, shape (channels, samples).
+    ``data`` is either an in-memory array or a read-only memmap of the spill file.
+    """
+
+    def __init__(self, data, fs, ch_names):
+        self.data = data
+        self.fs = float(fs)
+        self.ch_names = list(ch_names)
+        if isinstance(self.data, np.ndarray) and not isinstance(self.data, np.memmap):
+            self.data.flags.writeable = False
+
+    @property
+    def n_samples(self):
+        return int(self.data.shape[1])
+
+    @property
+    def nbytes(self):
+        """RAM held by the entry: a memmap lives in the page cache and counts against the disk budget."""
+        return 0 if isinstance(self.data, np.memmap) else int(self.data.nbytes)
+
+    def picks(self, channels):
+        """Row indices of ``channels`` (unknown names are skipped)."""
+        return [self.ch_names.index(ch) for ch in channels if ch in self.ch_names]
+
+
+def _key(file_path, highpass, resample_to, reference):
+    return (content_hash(file_path), float(highpass or 0), float(resample_to or 0), reference)
+
+
+def _spill_base(key):
+    digest, highpass, resample_to, reference = key[:4]
+    base = os.path.join(CACHE_DIR, f"{digest}-hp{highpass:g}-rs{resample_to:g}-{reference}")
+    if len(key) > 4:  # derived array: kind + its parameters
+        kind, params = key[4], key[5]
+        base += f"-{kind}" + "".join(f"-{name}{value:g}" for name, value in params)
+    return base
+
+
+def _open_spill(key):
+    """(array memmap, meta dict) of a complete spill, or None."""
+    base = _spill_base(key)
+    try:
+        with open(base + ".json") as f:
+            meta = json.load(f)
+        data = np.load(base + ".npy", mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    _spill_keys[base] = key
+    _spill_budget().touch(base)
+    return data, meta
+
+
+def _write_spill(key, data, meta):
+    """
+    Write ``<base>.npy`` then ``<base>.json`` atomically; the json marks the
+    spill complete. Older spills are then evicted to stay within the disk budget.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    base = _spill_base(key)
+    for suffix, write in (
+        (".npy", lambda f: np.save(f, data)),
+        (".json", lambda f: f.write(json.dumps(meta).encode())),
+    ):
+        fd, tmp = tempfile.mkstemp(prefix=".eeg-", dir=CACHE_DIR)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, base + suffix)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    _spill_keys[base] = key
+    _spill_budget().add(base)
+
+
+def _entry_from_spill(key):
+    spill = _open_spill(key)
+    if spill is None:
+        return None
+    data, meta = spill
+    try:
+        return PreprocessedEEG(data, meta["fs"], meta["ch_names"])
+    except KeyError:
+        return None
+
+
+def get_preprocessed(file_path, highpass=0.5, resample_to=None, reference="average"):
+    """
+    Preprocessed array for this file content and filter settings: from memory,
+    else from the spill file (memmap), else computed once, spilled and cached.
+    """
+    key = _key(file_path, highpass, resample_to, reference)
+
+    def _load():
+        entry = _entry_from_spill(key)
+        if entry is not None:
+            return entry
+        raw = preprocess_raw(load_raw(file_path), highpass=highpass, resample_to=resample_to, reference=reference)
+        entry = PreprocessedEEG(
+            to_microvolts(raw.get_data()).astype(np.float32), raw.info["sfreq"], raw.info["ch_names"]
+        )
+        try:
+            _write_spill(key, entry.data, {"fs": entry.fs, "ch_names": entry.ch_names})
+        except OSError:
+            pass  # read-only / full disk: still serve from memory
+        return entry
+
+    return _cache.get_or_create(key, _load)
+
+
+def peek(file_path, highpass=0.5, resample_to=None, reference="average"):
+    """Like get_preprocessed, but returns None instead of computing a missing entry."""
+    key = _key(file_path, highpass, resample_to, reference)
+    entry = _cache.get(key)
+    if entry is None:
+        entry = _entry_from_spill(key)
+        if entry is not None:
+            _cache.put(key, entry)
+    return entry
+
+
+class DerivedArray:
+    """
+    An array computed from a preprocessed recording (band powers, spectrogram...)
+    plus the JSON-serializable ``meta`` needed to interpret it.
+    """
+
+    def __init__(self, data, meta):
+        self.data = data
+        self.meta = dict(meta)
+        if isinstance(self.data, np.ndarray) and not isinstance(self.data, np.memmap):
+            self.data.flags.writeable = False
+
+    @property
+    def nbytes(self):
+        return 0 if isinstance(self.data, np.memmap) else int(self.data.nbytes)
+
+
+def get_derived(file_path, kind, params, compute, highpass=0.5, resample_to=None, reference="average"):
+    """
+    Cached ``compute(preprocessed) -> (array, meta)`` for this file, filter
+    settings, ``kind`` and numeric ``params`` (a dict). Shares the memory budget
+    and spill directory of the preprocessed arrays.
+    """
+    key = _key(file_path, highpass, resample_to, reference) + (
+        kind, tuple(sorted((name, float(value)) for name, value in params.items())),
+    )
+
+    def _load():
+        spill = _open_spill(key)
+        if spill is not None:
+            return DerivedArray(*spill)
+        data, meta = compute(get_preprocessed(file_path, highpass, resample_to, reference))
+        entry = DerivedArray(data, meta)
+        try:
+            _write_spill(key, entry.data, entry.meta)
+        except OSError:
+            pass
+        return entry
+
+    return _cache.get_or_create(key, _load)
+
+
+def cache_stats():
+    return {**_cache.stats(), "disk": _spill_budget().stats()}
+
+
+def clear_cache():
+    """Drop the memory tier; spill files stay, and the disk index is rescanned on next use."""
+    global _spills
+    _cache.clear()
+    _spill_keys.clear()
+    _spills = None
@@ -0,0 +1,136 @@
+# file: services/eeg_inference.py
+import os
+
+import numpy as np
+import torch
+
+from ..utils import signal_tools as st
+
+# -----------------------
+# Streaming sliding-window EEG inference
+# -----------------------
+# Windows are strided views of the (channels, samples) recording; each batch
+# is standardized straight into one reusable (pinned on CUDA) buffer and the
+# softmax outputs are summed as they come, so peak memory is set by
+# batch_size, not by recording length.
+
+WINDOW_SIZE = 256
+STEP_SIZE = 128
+BATCH_SIZE = 128
+
+# torch CPU threads (0 = torch default); applied by configure_threads()
+INTRA_OP_THREADS = int(os.environ.get("EEG_INTRA_OP_THREADS", 0))
+INTER_OP_THREADS = int(os.environ.get("EEG_INTER_OP_THREADS", 0))
+
+_STATS_BLOCK = 1 << 20  # samples per block when computing channel statistics
+
+
+def configure_threads(intra_op=INTRA_OP_THREADS, inter_op=INTER_OP_THREADS):
+    """Set torch's intra-/inter-op thread pools (process-wide). 0 or None leaves a setting alone."""
+    if intra_op:
+        torch.set_num_threads(int(intra_op))
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(int(inter_op))
+        except RuntimeError:
+            pass  # only settable before the first parallel op
+    return {"intra_op": torch.get_num_threads(), "inter_op": torch.get_num_interop_threads()}
+
+
+def channel_stats(data):
+    """
+    Per-channel mean and std of (channels, samples) ``data`` with the same
+    conventions as sklearn's StandardScaler (ddof=0, std 0 -> 1), computed
+    block by block so a memmap is never copied whole.
+    """
+    n = data.shape[1]
+    shift = np.asarray(data[:, :min(n, _STATS_BLOCK)], dtype=np.float64).mean(axis=1)
+    total = np.zeros(data.shape[0])
+    total_sq = np.zeros(data.shape[0])
+    for b0 in range(0, n, _STATS_BLOCK):
+        block = np.asarray(data[:, b0:b0 + _STATS_BLOCK], dtype=np.float64) - shift[:, None]
+        total += block.sum(axis=1)
+        total_sq += np.square(block).sum(axis=1)
+    mean_shifted = total / n
+    var = np.maximum(total_sq / n - mean_shifted ** 2, 0.0)
+    std = np.sqrt(var)
+    std[std == 0] = 1.0
+    return shift + mean_shifted, std
+
+
+class WindowedClassifier:
+    """
+    Averages a classifier's softmax over sliding windows of a recording:
+
+        engine = WindowedClassifier(model, device)
+        mean_probs, n_windows = engine.predict(data)       # data: (channels, samples)
+
+    ``iter_predict`` yields the running mean after every batch (for progress
+    streaming). The model sees (batch, 1, channels, window) float32 input.
+    """
+
+    def __init__(self, model, device="cpu", window=WINDOW_SIZE, step=STEP_SIZE,
+                 batch_size=BATCH_SIZE, n_channels=19):
+        self.model = model
+        self.device = torch.device(device)
+        self.window = int(window)
+        self.step = int(step)
+        self.batch_size = int(batch_size)
+        self.n_channels = int(n_channels)
+        pin = self.device.type == "cuda"
+        self._buffer = torch.empty(
+            (self.batch_size, 1, self.n_channels, self.window), dtype=torch.float32, pin_memory=pin
+        )
+        self._buffer_np = self._buffer.numpy()  # same memory, for numpy-side filling
+
+    def n_windows(self, n_samples):
+        return 0 if n_samples < self.window else (n_samples - self.window) // self.step + 1
+
+    def iter_window_probs(self, data, standardize=True):
+        """
+        Yield (first window index, n_windows, (k, classes) softmax of the batch)
+        as each batch finishes. ``data`` is (channels, samples) in any float
+        dtype, e.g. a memmap; only one batch of outputs exists at a time.
+        """
+        if data.shape[0] != self.n_channels:
+            raise ValueError(f"Expected {self.n_channels} channels, got {data.shape[0]}")
+        n = self.n_windows(data.shape[1])
+        if n == 0:
+            raise ValueError(f"EEG too short, need at least {self.window} samples")
+
+        if standardize:
+            mean, std = channel_stats(data)
+            center = mean.astype(np.float32)[:, None]
+            inv_scale = (1.0 / std).astype(np.float32)[:, None]
+
+        windows = st.sliding_windows(data[:, :(n - 1) * self.step + self.window], self.window, self.step, axis=-1)
+        for b0 in range(0, n, self.batch_size):
+            k = min(self.batch_size, n - b0)
+            out = self._buffer_np[:k, 0]                                   # (k, ch, window)
+            np.copyto(out, windows[:, b0:b0 + k].transpose(1, 0, 2), casting="unsafe")
+            if standardize:
+                out -= center
+                out *= inv_scale
+
+            # inference mode is thread-local and a streaming response may resume
+            # this generator on another thread, so it must not span the yield
+            with torch.inference_mode():
+                x = self._buffer[:k].to(self.device, non_blocking=True)
+                # .cpu() also waits for the async copy before the buffer is refilled
+                probs = torch.softmax(self.model(x), dim=1).float().cpu().numpy()
+            yield b0, n, probs
+
+    def iter_predict(self, data, standardize=True):
+        """Yield (windows_done, n_windows, running mean of softmax) after each batch."""
+        total = None
+        for b0, n, probs in self.iter_window_probs(data, standardize=standardize):
+            total = probs.sum(axis=0, dtype=np.float64) + (0 if total is None else total)
+            done = b0 + len(probs)
+            yield done, n, (total / done).astype(np.float32)
+
+    def predict(self, data, standardize=True):
+        """Mean softmax over all windows and the number of windows."""
+        result = None
+        for done, n, mean_probs in self.iter_predict(data, standardize=standardize):
+            result = mean_probs, n
+        return result
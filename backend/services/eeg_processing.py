@@ -1,27 +1,81 @@
 # backend/services/eeg_processing.py
 import mne
 import numpy as np
-from sklearn.preprocessing import StandardScaler
 
-def load_raw(file_path: str):
-    """Load EEG (.edf or .set) with MNE and return raw object."""
+# Upper edge of the preprocessing band-pass; nothing above it survives preprocess_raw
+LOWPASS_HZ = 40.0
+
+def load_raw(file_path: str, preload=True):
+    """
+    Load EEG (.edf or .set) with MNE and return raw object.
+    preload=False only parses the header; samples are read from disk on demand.
+    """
     if file_path.endswith(".set"):
-        return mne.io.read_raw_eeglab(file_path, preload=True, verbose=False)
+        return mne.io.read_raw_eeglab(file_path, preload=preload, verbose=False)
     elif file_path.endswith(".edf"):
-        return mne.io.read_raw_edf(file_path, preload=True, verbose=False)
+        return mne.io.read_raw_edf(file_path, preload=preload, verbose=False)
     else:
         raise ValueError("Unsupported file type. Use .edf or .set")
 
-def preprocess_raw(raw, highpass=0.5, resample_to=None):
+def read_header(file_path: str) -> dict:
+    """sfreq, channel names and duration without reading any samples."""
+    raw = load_raw(file_path, preload=False)
+    sfreq = float(raw.info["sfreq"])
+    return {
+        "sfreq": sfreq,
+        "n_channels": len(raw.info["ch_names"]),
+        "duration_seconds": raw.n_times / sfreq,
+        "channels": list(raw.info["ch_names"]),
+    }
+
+def filter_pad_seconds(highpass=0.5) -> float:
+    """
+    Context to read on each side of a window so the FIR filters in preprocess_raw
+    have settled: one filter length (MNE's default 3.3 / transition bandwidth).
+    """
+    if not highpass:
+        return 1.0
+    l_trans = min(max(0.25 * highpass, 2.0), highpass)
+    return max(1.0, 3.3 / l_trans)
+
+def load_window(file_path: str, tmin: float, tmax: float, picks=None,
+                highpass=0.5, resample_to=None, reference="average"):
+    """
+    Read only [tmin, tmax) seconds (plus filter padding) from disk, preprocess
+    it like preprocess_raw and return the raw cropped back to the window.
+    picks limits the channels read only when reference="none": the average
+    reference needs every channel, so then all channels of the span are read.
+    """
+    raw = load_raw(file_path, preload=False)
+    last = raw.times[-1]
+    duration = raw.n_times / raw.info["sfreq"]   # end of the last sample's interval
+    tmin = min(max(tmin, 0.0), last)
+    tmax = min(max(tmax, tmin), duration)
+
+    pad = filter_pad_seconds(highpass)
+    t0, t1 = max(tmin - pad, 0.0), min(tmax + pad, last)
+    if picks and reference == "none":
+        raw.pick(picks)
+    raw.crop(t0, t1)
+    raw = preprocess_raw(raw, highpass=highpass, resample_to=resample_to, reference=reference)
+
+    # crop() resets times to 0, so the window is relative to t0 now; a window
+    # reaching the end of the file keeps the last sample
+    if tmax >= duration:
+        return raw.crop(tmin - t0, None)
+    return raw.crop(tmin - t0, min(tmax - t0, raw.times[-1]), include_tmax=False)
+
+def preprocess_raw(raw, highpass=0.5, resample_to=None, reference="average"):
     raw.load_data()
     # Band-pass filter (e.g., 0.5-40 Hz) removes DC drift and high-freq noise
-    raw.filter(l_freq=highpass, h_freq=40.0)
+    raw.filter(l_freq=highpass, h_freq=LOWPASS_HZ)
     
     # remove 50 Hz (or 60 Hz) power-line noise
     raw.notch_filter(freqs=[50, 100])  # adjust to your mains frequency
 
     # common average reference
-    raw.set_eeg_reference('average', projection=False)
+    if reference == "average":
+        raw.set_eeg_reference('average', projection=False)
 
     # resample to smaller fs to reduce data size
     if resample_to:
@@ -29,11 +83,19 @@ def preprocess_raw(raw, highpass=0.5, resample_to=None):
 
     return raw
 
+def resample_data(data: np.ndarray, sfreq: float, resample_to=None) -> np.ndarray:
+    """Resample a (channels, samples) array the way Raw.resample(resample_to) would."""
+    if not resample_to or float(resample_to) == float(sfreq):
+        return data
+    data = np.asarray(data, dtype=np.float64)  # MNE resamples in float64 only
+    return mne.filter.resample(data, up=float(resample_to), down=float(sfreq), npad="auto", axis=-1, verbose=False)
+
 def to_microvolts(data_volts: np.ndarray) -> np.ndarray:
     """Convert Volts → microvolts for plotting."""
     return data_volts * 1e6
 
 def standardize(data: np.ndarray) -> np.ndarray:
     """Standard-score each channel separately (like during training)."""
+    from sklearn.preprocessing import StandardScaler  # deferred: sklearn is slow to import
     scaler = StandardScaler()
     return scaler.fit_transform(data.T).T   # keep shape (channels, samples)
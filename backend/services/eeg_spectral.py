@@ -0,0 +1,82 @@
+# file: services/eeg_spectral.py
+import numpy as np
+from scipy.signal import stft
+
+from ..utils import signal_tools as st
+
+# -----------------------
+# Band-power and spectrogram time series
+# -----------------------
+# Both are computed once over every channel of the preprocessed recording
+# (one batched Welch / STFT call per block of windows) and cached through
+# eeg_cache.get_derived, so playback only slices precomputed frames.
+
+EEG_BANDS = {
+    "delta": (0.5, 4.0),
+    "theta": (4.0, 8.0),
+    "alpha": (8.0, 13.0),
+    "beta": (13.0, 30.0),
+    "gamma": (30.0, 100.0),
+}
+
+BANDPOWER_WINDOW_S = 2.0
+BANDPOWER_STEP_S = 0.5
+
+SPECTROGRAM_NPERSEG = 256
+SPECTROGRAM_HOP = 128
+SPECTROGRAM_FMAX = 60.0
+
+_WINDOWS_PER_BLOCK = 512  # Welch input is (channels, block, window); bounds the temporary copies
+
+
+def _samples(seconds, fs):
+    return max(1, int(round(seconds * fs)))
+
+
+def bands_below(fmax, bands=EEG_BANDS):
+    """``bands`` with upper edges capped at ``fmax`` Hz; bands starting at or above it are dropped."""
+    return {name: (low, min(high, fmax)) for name, (low, high) in bands.items() if low < fmax}
+
+
+def band_power_series(data, fs, window_s=BANDPOWER_WINDOW_S, step_s=BANDPOWER_STEP_S, bands=EEG_BANDS):
+    """
+    Relative Welch band power of every channel in sliding windows.
+
+    data: (channels, samples). Returns float32 (bands, channels, frames);
+    frame i covers [i * step_s, i * step_s + window_s). Bands are capped at
+    Nyquist (see bands_below); pass them capped at the signal's low-pass too.
+    """
+    bands = bands_below(fs / 2.0, bands)
+    window, step = _samples(window_s, fs), _samples(step_s, fs)
+    n_samples = data.shape[1]
+    n_frames = 0 if n_samples < window else (n_samples - window) // step + 1
+    out = np.empty((len(bands), data.shape[0], n_frames), dtype=np.float32)
+    if n_frames == 0:
+        return out
+
+    # Welch segments of 1 s (at most the window) averaged inside each window
+    nperseg = min(window, _samples(1.0, fs))
+    windows = st.sliding_windows(data[:, :(n_frames - 1) * step + window], window, step, axis=-1)
+    for f0 in range(0, n_frames, _WINDOWS_PER_BLOCK):
+        block = np.asarray(windows[:, f0:f0 + _WINDOWS_PER_BLOCK], dtype=np.float64)
+        powers = st.band_powers(block, fs, bands, axis=-1, nperseg=nperseg)
+        for b, name in enumerate(bands):
+            out[b, :, f0:f0 + block.shape[1]] = powers[name]
+    return out
+
+
+def spectrogram(data, fs, nperseg=SPECTROGRAM_NPERSEG, hop=SPECTROGRAM_HOP, fmax=SPECTROGRAM_FMAX):
+    """
+    STFT power in dB of every channel, one Hann-windowed frame every ``hop`` samples.
+
+    Returns (freqs, float32 (channels, freqs, frames)); frame i is centred on
+    i * hop / fs seconds and only frequencies up to ``fmax`` are kept.
+    """
+    nperseg = min(int(nperseg), data.shape[1])
+    freqs, _, spec = stft(
+        np.asarray(data, dtype=np.float32), fs=fs, nperseg=nperseg, noverlap=nperseg - min(int(hop), nperseg),
+        boundary="even", padded=False, axis=-1,
+    )
+    keep = freqs <= fmax if fmax else slice(None)
+    power = np.abs(spec[:, keep, :]) ** 2
+    return freqs[keep], (10.0 * np.log10(power + 1e-12)).astype(np.float32)
@@ -0,0 +1,132 @@
+# file: services/model_registry.py
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Lazily loaded pretrained models
+# -----------------------
+# Routers register a loader per model at import time (cheap) and call
+# get(name) when a request needs it. Loading happens once, on first use or
+# in the background warm-up started with the app, so startup does not wait
+# for TensorFlow / torch weights and one missing file only disables the
+# endpoints that need it.
+
+PRETRAINED_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "pretrained_models"))
+
+# Set MODEL_WARMUP=0 to skip the background warm-up (e.g. with uvicorn --reload)
+WARMUP_ON_STARTUP = os.environ.get("MODEL_WARMUP", "1") != "0"
+
+# Models the app is not ready without (comma-separated names, e.g.
+# "ecg_multiclass,eeg_classifier"); every other model only degrades readiness
+REQUIRED_MODELS = tuple(n.strip() for n in os.environ.get("MODEL_REQUIRED", "").split(",") if n.strip())
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+def pretrained_path(filename):
+    """Absolute path of a file in backend/pretrained_models, independent of the working directory."""
+    return os.path.join(PRETRAINED_DIR, filename)
+
+
+class ModelUnavailable(RuntimeError):
+    """Raised by get() when a model failed to load."""
+
+    def __init__(self, name, error):
+        super().__init__(f"Model '{name}' is unavailable: {error}")
+        self.name = name
+        self.error = error
+
+
+class ModelEntry:
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.state = PENDING
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.state == READY:
+            return self.value
+        with self._lock:
+            if self.state != READY:
+                # failed loads are retried, so dropping the file in place fixes it without a restart
+                self.state = LOADING
+                started = time.perf_counter()
+                try:
+                    self.value = self.loader()
+                    self.state, self.error = READY, None
+                except Exception as e:
+                    self.state, self.error = FAILED, f"{type(e).__name__}: {e}"
+                    logger.warning("Loading model %s failed: %s", self.name, self.error)
+                finally:
+                    self.load_seconds = time.perf_counter() - started
+            if self.state == FAILED:
+                raise ModelUnavailable(self.name, self.error)
+            return self.value
+
+    def status(self):
+        return {
+            "state": self.state,
+            "load_seconds": None if self.load_seconds is None else round(self.load_seconds, 3),
+            "error": self.error,
+        }
+
+
+_models = {}
+_registry_lock = threading.Lock()
+
+
+def register(name, loader):
+    """Register ``loader()`` under ``name`` (idempotent; returns the entry)."""
+    with _registry_lock:
+        entry = _models.get(name)
+        if entry is None:
+            entry = _models[name] = ModelEntry(name, loader)
+        return entry
+
+
+def get(name):
+    """Loaded model for ``name``; loads it now if needed. Raises ModelUnavailable on failure."""
+    return _models[name].get()
+
+
+def status(required=None):
+    """
+    Readiness report: "ready" once every required model (default
+    REQUIRED_MODELS) is loaded; "degraded" lists the models that are not
+    loaded yet or failed to load.
+    """
+    required = REQUIRED_MODELS if required is None else tuple(required)
+    with _registry_lock:
+        entries = list(_models.values())
+    models = {e.name: e.status() for e in entries}
+    return {
+        "ready": all(models.get(name, {}).get("state") == READY for name in required),
+        "required": list(required),
+        "degraded": sorted(name for name, m in models.items() if m["state"] != READY),
+        "models": models,
+    }
+
+
+def warmup(names=None):
+    """Load ``names`` (default: all registered models), logging instead of raising on failure."""
+    with _registry_lock:
+        entries = [e for n, e in _models.items() if names is None or n in names]
+    for entry in entries:
+        try:
+            entry.get()
+        except ModelUnavailable:
+            pass
+
+
+def start_background_warmup(names=None):
+    thread = threading.Thread(target=warmup, args=(names,), name="model-warmup", daemon=True)
+    thread.start()
+    return thread
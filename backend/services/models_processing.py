@@ -1,8 +1,45 @@
+import math
+from fractions import Fraction
+
 import numpy as np
-from scipy.signal import resample
+from scipy.signal import resample_poly
 
 BINARY_TARGET_LEN = 300 * 30 
 
+# Extra input (seconds) kept past the crop point so the polyphase filter's
+# tail at the end of the kept window still sees real signal
+RESAMPLE_GUARD_S = 0.5
+
+
+def resample_ratio(fs, target_fs, max_denominator=1000):
+    """Rational up/down factors for fs -> target_fs (exact for integer rates below max_denominator)."""
+    ratio = Fraction(float(target_fs) / float(fs)).limit_denominator(max_denominator)
+    return ratio.numerator, ratio.denominator
+
+
+def input_span(fs, target_fs, target_len):
+    """Input samples crop_resample reads to produce ``target_len`` output samples."""
+    if fs == target_fs:
+        return target_len
+    up, down = resample_ratio(fs, target_fs)
+    return math.ceil(target_len * down / up) + math.ceil(RESAMPLE_GUARD_S * fs)
+
+
+def crop_resample(x, fs, target_fs, target_len):
+    """
+    First ``target_len`` output samples of ``x`` (time on axis 0) resampled
+    from ``fs`` to ``target_fs``. Only the input needed for those samples
+    plus RESAMPLE_GUARD_S is filtered (polyphase), instead of FFT-resampling
+    the whole record and discarding most of it.
+    """
+    if fs == target_fs:
+        return x[:target_len]
+    up, down = resample_ratio(fs, target_fs)
+    n_in = input_span(fs, target_fs, target_len)
+    # same output length as resampling the full record, when that is shorter than target_len
+    n_out = min(target_len, int(round(x.shape[0] * up / down)))
+    return resample_poly(x[:n_in], up, down, axis=0, padtype="line")[:n_out]
+
 # Preprocessing for the 6-class model
 def preprocess_ecg_with_mapping_from_record(record,
                                             target_fs=400,
@@ -14,8 +51,8 @@ def preprocess_ecg_with_mapping_from_record(record,
     Steps:
       - Map lead names to model expected names
       - Reorder leads to model order
-      - Resample to target_fs
-      - Crop or pad to target_length
+      - Crop, then resample to target_fs (polyphase)
+      - Pad to target_length
       - Per-lead normalization (zero mean, unit variance)
       - Returns numpy array dtype=float32
     """
@@ -52,15 +89,14 @@ def preprocess_ecg_with_mapping_from_record(record,
         else:
             raise ValueError(f"Lead {lead} is missing in the ECG record! Found leads: {orig_leads}")
 
-    signals_selected = signals[:, indices]  # shape (n_samples, 12)
+    # crop before the lead gather so long records are not copied in full
+    signals_selected = signals[:input_span(fs, target_fs, target_length)][:, indices]  # shape (n_samples, 12)
 
-    # Resample if needed
-    if fs != target_fs:
-        num_samples = int(round(signals_selected.shape[0] * target_fs / fs))
-        signals_selected = resample(signals_selected, num_samples, axis=0)
-        fs = target_fs
+    # Crop + resample if needed
+    signals_selected = crop_resample(signals_selected, fs, target_fs, target_length)
+    fs = target_fs
 
-    # Crop or pad to target_length
+    # Pad to target_length
     curr_len = signals_selected.shape[0]
     if curr_len > target_length:
         signals_selected = signals_selected[:target_length, :]
@@ -89,11 +125,9 @@ def preprocess_for_binary_model(rec, target_fs=300, target_len=300*30):
     x = rec.p_signal[:, 0]
     fs = rec.fs
 
-    # Resample to 300 Hz if needed
-    if fs != target_fs:
-        num_samples = int(round(len(x) * target_fs / fs))
-        x = resample(x, num_samples)
-        fs = target_fs
+    # Crop + resample to 300 Hz if needed
+    x = crop_resample(x, fs, target_fs, target_len)
+    fs = target_fs
 
     # Pad or truncate to target length
     if len(x) > target_len:
@@ -0,0 +1,170 @@
+# file: services/torch_runtime.py
+import copy
+import io
+import logging
+import os
+import tempfile
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+# -----------------------
+# Compiled / quantized CPU inference for the torch models
+# -----------------------
+# The EEG, drone and Doppler networks are small enough that eager PyTorch
+# spends much of each call in Python dispatch. TorchPredictor wraps a loaded
+# model in one of:
+#   eager    the model itself
+#   script   torch.jit.trace + freeze + optimize_for_inference
+#   compile  torch.compile (inductor; needs a C++ toolchain)
+#   onnx     ONNX export run by onnxruntime (optional dependency)
+# optionally after dynamic int8 quantization of the nn.Linear layers. Every
+# float runtime is checked against the eager model when it is built and falls
+# back to eager if it fails or disagrees.
+
+RUNTIMES = ("eager", "script", "compile", "onnx")
+
+# Deployment defaults, read by optimize()
+TORCH_RUNTIME = os.environ.get("TORCH_RUNTIME", "eager")
+TORCH_QUANTIZE = os.environ.get("TORCH_QUANTIZE", "0") == "1"
+
+# Largest |compiled - eager| accepted for a float runtime, relative to max |eager|
+PARITY_RTOL = 1e-4
+
+
+def quantize_dynamic(model):
+    """Copy of ``model`` with nn.Linear weights in int8 (activations quantized per call)."""
+    return torch.ao.quantization.quantize_dynamic(copy.deepcopy(model), {nn.Linear}, dtype=torch.qint8)
+
+
+def _script(model, example):
+    """Most optimized TorchScript graph that runs: optimized+frozen, frozen, or the plain trace."""
+    traced = torch.jit.trace(model, example, check_trace=False)
+    candidates = (
+        lambda: torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval())),
+        lambda: torch.jit.freeze(traced.eval()),
+    )
+    for build in candidates:
+        try:
+            module = build()
+            module(example)  # e.g. the MKLDNN rewrite rejects some adaptive pooling shapes at run time
+            return module
+        except Exception:
+            continue
+    return traced
+
+
+def _compile(model, example):
+    return torch.compile(model, dynamic=True)
+
+
+class _OnnxModule:
+    """onnxruntime session behind a torch-in / torch-out call."""
+
+    def __init__(self, model, example, quantize):
+        import onnxruntime as ort  # optional dependency
+
+        buffer = io.BytesIO()
+        torch.onnx.export(
+            model, (example,), buffer, input_names=["x"], output_names=["y"],
+            dynamic_axes={"x": {0: "batch"}, "y": {0: "batch"}}, dynamo=False,
+        )
+        onnx_bytes = buffer.getvalue()
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic as ort_quantize
+
+            with tempfile.TemporaryDirectory() as tmp:
+                src, dst = os.path.join(tmp, "model.onnx"), os.path.join(tmp, "model.int8.onnx")
+                with open(src, "wb") as f:
+                    f.write(onnx_bytes)
+                ort_quantize(src, dst, weight_type=QuantType.QInt8, op_types_to_quantize=["MatMul", "Gemm"])
+                with open(dst, "rb") as f:
+                    onnx_bytes = f.read()
+        self.session = ort.InferenceSession(onnx_bytes, providers=["CPUExecutionProvider"])
+
+    def __call__(self, x):
+        out = self.session.run(None, {"x": x.detach().cpu().numpy().astype(np.float32, copy=False)})[0]
+        return torch.from_numpy(out)
+
+
+class TorchPredictor:
+    """
+    Drop-in callable for a loaded eval-mode model:
+
+        predictor = TorchPredictor(model, example, runtime="script", quantize=True)
+        out = predictor(x)                       # same as model(x), up to quantization
+        predictor.check_parity(x)                # {"max_abs_diff": ..., "argmax_agreement": ...}
+
+    ``example`` is one representative input batch; an input with one dimension
+    fewer is run as a batch of one (as AudioClassifier.forward does). Compiled runtimes only run on CPU;
+    on another device, or if building / checking the runtime fails, the
+    predictor falls back to the (optionally quantized) eager model.
+    """
+
+    def __init__(self, model, example, runtime="eager", quantize=False):
+        if runtime not in RUNTIMES:
+            raise ValueError(f"runtime must be one of {RUNTIMES}, got {runtime!r}")
+        self.model = model.eval()
+        self.example = example
+        on_cpu = all(p.device.type == "cpu" for p in model.parameters())
+        self.quantized = bool(quantize and on_cpu)
+        self.runtime = runtime if on_cpu else "eager"
+
+        base = quantize_dynamic(self.model) if self.quantized else self.model
+        self._fn = base
+        if self.runtime != "eager":
+            try:
+                with torch.inference_mode():
+                    self._fn = self._build(base, example)
+                    self._fn(example)  # trace / compile now, not on the first request
+                if not self.quantized:
+                    parity = self.check_parity(example)
+                    with torch.inference_mode():
+                        scale = float(self.model(example).abs().max()) or 1.0
+                    if parity["max_abs_diff"] > PARITY_RTOL * scale:
+                        raise RuntimeError(f"output differs from eager by {parity['max_abs_diff']:.3g}")
+            except ImportError as e:
+                logger.warning("%s runtime unavailable (%s), falling back to eager", self.runtime, e)
+                self.runtime, self._fn = "eager", base
+            except Exception:
+                logger.exception("Building the %s runtime failed, falling back to eager", self.runtime)
+                self.runtime, self._fn = "eager", base
+
+    def _build(self, model, example):
+        if self.runtime == "script":
+            return _script(model, example)
+        if self.runtime == "compile":
+            return _compile(model, example)
+        return _OnnxModule(self.model, example, self.quantized)
+
+    def __call__(self, x):
+        if x.ndim == self.example.ndim - 1:
+            x = x.unsqueeze(0)
+        with torch.inference_mode():
+            return self._fn(x)
+
+    def check_parity(self, x):
+        """Largest absolute output difference to the eager float model and the argmax agreement."""
+        with torch.inference_mode():
+            expected = self.model(x).float().cpu()
+            got = self(x).float().cpu()
+        agreement = (expected.argmax(dim=-1) == got.argmax(dim=-1)).float().mean() if expected.ndim > 1 else 1.0
+        return {"max_abs_diff": float((expected - got).abs().max()), "argmax_agreement": float(agreement)}
+
+
+def optimize(model, example, runtime=None, quantize=None):
+    """
+    Wrap ``model`` with the deployment's TORCH_RUNTIME / TORCH_QUANTIZE
+    settings; returns the model unchanged for plain eager float inference.
+    """
+    runtime = runtime or TORCH_RUNTIME
+    quantize = TORCH_QUANTIZE if quantize is None else quantize
+    if runtime == "eager" and not quantize:
+        return model
+    predictor = TorchPredictor(model, example, runtime=runtime, quantize=quantize)
+    logger.info("%s: %s runtime%s", type(model).__name__, predictor.runtime,
+                " (int8 linear layers)" if predictor.quantized else "")
+    return predictor
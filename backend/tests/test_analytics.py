@@ -0,0 +1,124 @@
+"""
+test_analytics.py
+------------------
+Vectorized XOR / cross-recurrence / polar kernels (services/analytics.py)
+against straightforward per-sample loops like the ones the pages ran in JS,
+and the paged /xor route.
+"""
+import numpy as np
+import pytest
+
+from backend.services import analytics
+
+
+@pytest.fixture(scope="module")
+def rng():
+    return np.random.default_rng(0)
+
+
+def test_recurrence_counts_sum_dense_matrices(rng):
+    A = rng.standard_normal((7, 40)).astype(np.float32)
+    B = rng.standard_normal((7, 30)).astype(np.float32)
+    thr = analytics.adaptive_threshold(A, B)
+
+    expected = sum((np.abs(A[k][:, None] - B[k][None, :]) < thr[k]).astype(int) for k in range(7))
+    assert np.array_equal(analytics.recurrence_counts(A, B, thr), expected)
+
+
+def test_binned_recurrence_matches_dense_grid(rng):
+    a, b = rng.standard_normal(1003), rng.standard_normal(777)
+    bins, thr = 10, 0.05
+    dense = np.abs(a[:, None] - b[None, :]) < thr
+    rows = np.linspace(0, len(a), bins + 1).astype(int)
+    cols = np.linspace(0, len(b), bins + 1).astype(int)
+    expected = np.array([[dense[rows[i]:rows[i + 1], cols[j]:cols[j + 1]].sum() for j in range(bins)]
+                         for i in range(bins)])
+
+    assert np.array_equal(analytics.binned_recurrence(a, b, thr, bins), expected)
+
+
+def test_rolling_xor_matches_window_loop(rng):
+    x = rng.standard_normal(500)
+    window, lag = 32, 20
+    expected = [np.abs(x[t:t + window] - x[t - lag:t - lag + window]).mean() for t in range(lag, 500 - window + 1)]
+
+    assert np.allclose(analytics.rolling_xor(x, window, lag=lag), expected)
+    assert np.allclose(analytics.rolling_xor(x, window, lag=lag, step=7), expected[::7])
+
+
+def test_xor_overlay_cancels_repeated_chunks():
+    base = np.linspace(0, 1, 50)
+    chunks = np.stack([base, base + 5, base + 0.01, base + 10])  # chunk 2 repeats chunk 0
+
+    shown, min_diff = analytics.xor_overlay(chunks, tolerance=0.1)
+
+    assert shown == [1, 3]
+    assert np.isnan(min_diff[0]) and min_diff[2] == pytest.approx(0.01, abs=1e-6)
+    shown, _ = analytics.xor_overlay(chunks, tolerance=0.1, history=1)
+    assert shown == [3]
+
+
+def test_polar_cycles_are_minmax_scaled(rng):
+    x = np.cumsum(rng.standard_normal(1000))
+    bounds = np.array([[0, 180], [180, 410], [410, 700]])
+
+    r, theta = analytics.polar_cycles(analytics.segment_stack(x, bounds, n_points=200))
+
+    assert r.shape == (3, 200) and theta[0] == 0 and theta[-1] < 360
+    assert np.allclose(r.min(axis=1), 0) and np.allclose(r.max(axis=1), 1)
+    cycle = np.interp(np.linspace(0, 229, 200), np.arange(230), x[180:410])
+    assert np.allclose(r[1], (cycle - cycle.min()) / np.ptp(cycle), atol=1e-5)
+
+
+def test_xor_overlay_resumes_from_a_saved_state(rng):
+    base = rng.standard_normal((12, 40)).astype(np.float32)
+    chunks = np.concatenate([base, base[[3, 7, 11]] + 0.01, base[:5] + 3.0])
+    shown, min_diff = analytics.xor_overlay(chunks, tolerance=0.1, history=6)
+
+    overlay = analytics.XorOverlay(tolerance=0.1, history=6)
+    diffs = [overlay.push(chunks[i:i + 4]) for i in range(0, 8, 4)]
+    resumed = overlay.copy()
+    diffs += [resumed.push(chunks[i:i + 4]) for i in range(8, len(chunks), 4)]
+
+    assert resumed.shown == shown and overlay.n_seen == 8
+    np.testing.assert_array_equal(np.concatenate(diffs), min_diff)
+    assert all(np.array_equal(resumed.chunk(k), chunks[k]) for k in shown)
+
+
+def test_xor_pages_resume_instead_of_replaying(tmp_path, monkeypatch):
+    wfdb = pytest.importorskip("wfdb")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from backend.routers import analytics as analytics_routes
+    from backend.utils import file_handler
+
+    fs = 250
+    t = np.arange(60 * fs) / fs
+    signal = np.sin(2 * np.pi * 1.0 * t) + 0.2 * np.sin(2 * np.pi * 0.13 * t)
+    wfdb.wrsamp("rec", fs=fs, units=["mV"], sig_name=["I"], p_signal=signal[:, None], fmt=["16"], write_dir=str(tmp_path))
+    monkeypatch.setattr(file_handler, "ECG_UPLOAD_DIR", str(tmp_path))
+    analytics_routes._xor_states.clear()
+
+    pushed = []
+    push = analytics.XorOverlay.push
+    monkeypatch.setattr(analytics.XorOverlay, "push", lambda self, chunks: pushed.append(len(chunks)) or push(self, chunks))
+    app = FastAPI()
+    app.include_router(analytics_routes.router, prefix="/api/analytics")
+    client = TestClient(app)
+    params = {"source": "ecg", "filename": "rec", "channel": "I", "segment": "windows",
+              "window": 1.0, "tolerance": 0.05, "history": 8}
+
+    whole = client.get("/api/analytics/xor", params={**params, "limit": 1000}).json()
+    pushed.clear()
+    pages, cursor = [], 0
+    while cursor is not None:
+        page = client.get("/api/analytics/xor", params={**params, "cursor": cursor, "limit": 7}).json()
+        pages.append(page)
+        cursor = page["next_cursor"]
+
+    assert pushed == [0, 7] + [7] * 7 + [4]   # first page: empty replay, then only new chunks
+    assert pages[-1]["shown"] == whole["shown"]
+    assert sum((p["min_diff"] for p in pages), []) == whole["min_diff"]
+    assert {k: v for p in pages for k, v in p["chunks"].items() if int(k) in whole["shown"]} == whole["chunks"]
+    analytics_routes._xor_states.clear()
@@ -0,0 +1,80 @@
+"""
+test_audio_features.py
+-----------------------
+The fast drone MFCC path (services/audio_features.py) against the librosa
+features the classifier was trained on (pretrained_models/mfcc.py).
+"""
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from backend.services import audio_features
+
+librosa = pytest.importorskip("librosa")
+
+
+def _clip(sr, seconds, channels=1, seed=0):
+    """Drone-like hum (harmonics of 180 Hz) in noise, PCM_16 WAV bytes."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sr * seconds)) / sr
+    hum = sum(np.sin(2 * np.pi * 180 * k * t) / k for k in range(1, 6))
+    y = 0.2 * hum[:, None] + 0.05 * rng.standard_normal((len(t), channels))
+    buf = io.BytesIO()
+    sf.write(buf, y, sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+def _librosa_features(path):
+    y, sr = librosa.load(path, sr=16000)
+    return np.mean(librosa.feature.mfcc(y=y, sr=sr, n_mfcc=40).T, axis=0)
+
+
+def test_filterbank_and_dct_match_librosa():
+    fb = audio_features.mel_filterbank(16000)
+    np.testing.assert_allclose(fb, librosa.filters.mel(sr=16000, n_fft=2048, n_mels=128), atol=1e-7)
+
+    x = np.random.default_rng(1).standard_normal((128, 7))
+    expected = librosa.feature.mfcc(S=x, n_mfcc=40)
+    np.testing.assert_allclose(audio_features.dct_matrix(40, 128) @ x, expected, atol=1e-10)
+
+
+@pytest.mark.parametrize("sr, seconds, channels", [(16000, 1.0, 1), (16000, 0.05, 1), (44100, 2.5, 2)])
+def test_features_match_training_pipeline(tmp_path, sr, seconds, channels):
+    data = _clip(sr, seconds, channels)
+    path = tmp_path / "clip.wav"
+    path.write_bytes(data)
+
+    expected = _librosa_features(str(path))
+    from_bytes = audio_features.extract_features(data)
+    from_path = audio_features.extract_features(path)
+
+    np.testing.assert_array_equal(from_bytes, from_path)
+    if sr != 16000 and audio_features.soxr is None:
+        tol = 0.05 * np.abs(expected).max()  # polyphase fallback instead of librosa's soxr
+    else:
+        tol = 1e-4 * np.abs(expected).max()
+    np.testing.assert_allclose(from_bytes, expected, atol=tol)
+
+    frames = audio_features.mfcc(audio_features.decode_audio(data))
+    np.testing.assert_allclose(frames.mean(axis=1), from_bytes, atol=1e-3)
+
+
+@pytest.mark.parametrize("use_soxr", [True, False])
+def test_block_resampler_matches_one_shot(monkeypatch, use_soxr):
+    if not use_soxr:
+        monkeypatch.setattr(audio_features, "soxr", None)
+    x = np.random.default_rng(2).standard_normal(44100 * 3 + 17).astype(np.float32)
+    resampler = audio_features.BlockResampler(44100, 16000)
+    parts = [resampler.process(x[i:i + 4000]) for i in range(0, len(x), 4000)]
+    parts.append(resampler.process(np.zeros(0, dtype=np.float32), last=True))
+
+    np.testing.assert_allclose(np.concatenate(parts), audio_features.resample(x, 44100, 16000), atol=1e-6)
+
+
+def test_window_features_match_single_clips():
+    windows = np.random.default_rng(3).standard_normal((5, 16000)).astype(np.float32)
+    windows *= np.linspace(0.01, 1.0, 5, dtype=np.float32)[:, None]
+    expected = np.stack([audio_features.mean_mfcc(w) for w in windows])
+    np.testing.assert_allclose(audio_features.window_features(windows), expected, atol=1e-4)
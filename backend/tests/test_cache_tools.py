@@ -0,0 +1,97 @@
+"""
+test_cache_tools.py
+--------------------
+Unit tests for the byte-budgeted LRU cache used by the record caches and
+the disk budget over spill directories.
+"""
+import os
+import time
+
+import numpy as np
+
+from backend.utils.cache_tools import DiskBudget, LRUCache, content_hash, file_fingerprint
+
+
+def test_lru_evicts_least_recently_used_over_budget():
+    cache = LRUCache(max_bytes=3 * 800)
+    for key in "abc":
+        cache.put(key, np.zeros(100))  # 800 bytes each
+
+    cache.get("a")                     # "b" is now the oldest
+    cache.put("d", np.zeros(100))
+
+    assert "b" not in cache
+    assert all(k in cache for k in "acd")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_counts_hits_and_misses_and_builds_once():
+    cache = LRUCache(max_bytes=10_000)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return np.arange(10)
+
+    cache.get_or_create("x", factory)
+    cache.get_or_create("x", factory)
+
+    stats = cache.stats()
+    assert len(calls) == 1
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_oversized_value_is_not_stored():
+    cache = LRUCache(max_bytes=100)
+    value = cache.put("big", np.zeros(1000))
+    assert value.shape == (1000,)
+    assert "big" not in cache
+
+
+def test_file_fingerprint_changes_on_rewrite(tmp_path):
+    path = tmp_path / "rec.dat"
+    path.write_bytes(b"1234")
+    before = file_fingerprint(str(path))
+    path.write_bytes(b"123456")
+    assert file_fingerprint(str(path)) != before
+
+
+def test_content_hash_ignores_name_and_tracks_content(tmp_path):
+    a, b = tmp_path / "a.edf", tmp_path / "b.edf"
+    a.write_bytes(b"same bytes")
+    b.write_bytes(b"same bytes")
+    assert content_hash(str(a)) == content_hash(str(b))
+
+    b.write_bytes(b"other bytes")
+    assert content_hash(str(a)) != content_hash(str(b))
+
+
+def _spill(root, name, size, age=0.0):
+    base = os.path.join(root, name)
+    for suffix, n in ((".npy", size - 2), (".json", 2)):
+        with open(base + suffix, "wb") as f:
+            f.write(b"x" * n)
+        t = time.time() - age
+        os.utime(base + suffix, (t, t))
+    return base
+
+
+def test_disk_budget_evicts_least_recently_used_and_expired(tmp_path):
+    root = str(tmp_path)
+    old = _spill(root, "old", 100, age=3600)
+    a = _spill(root, "a", 100, age=20)
+    b = _spill(root, "b", 100, age=10)
+    evicted = []
+    budget = DiskBudget(root, max_bytes=250, ttl_seconds=600, on_evict=evicted.append)
+
+    budget.touch(a)                       # rescans the directory; "old" is past its TTL
+    assert evicted == [old] and not os.path.exists(old + ".npy")
+    c = _spill(root, "c", 100)
+    budget.add(c)                         # 300 > 250 bytes: "b" is now the least recently used
+    assert evicted == [old, b]
+    assert not os.path.exists(b + ".json") and not os.path.exists(b + ".npy")
+    assert budget.stats()["entries"] == 2 and budget.stats()["bytes"] == 200
+
+    restarted = DiskBudget(root, max_bytes=250)   # order recovered from the files' mtimes
+    restarted.add(_spill(root, "d", 100))
+    assert not os.path.exists(a + ".npy") and os.path.exists(c + ".npy")
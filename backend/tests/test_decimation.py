@@ -0,0 +1,74 @@
+"""
+test_decimation.py
+-------------------
+Min/max decimation pyramid (services/decimation.py): level choice for a
+pixel width, bucket bounds against a brute-force reduction, and rebuilds
+when the source fingerprint changes.
+"""
+import numpy as np
+import pytest
+
+from backend.services import decimation
+from backend.services.decimation import MinMaxPyramid
+
+FS = 500.0
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    return np.cumsum(rng.standard_normal((100_003, 3)), axis=0).astype(np.float32)
+
+
+def test_query_uses_finest_level_that_fits(data, tmp_path):
+    pyramid = MinMaxPyramid.build(str(tmp_path / "rec.pyr"), data, FS, ["a", "b", "c"])
+    assert [level.shape[-2] for level in pyramid.levels[1:]] == [25001, 6251, 1563, 391]
+
+    full = pyramid.query(max_points=2000)
+    assert (full["level"], full["bucket_size"], full["n_points"]) == (3, 64, 1563)
+
+    zoomed = pyramid.query(start=10.0, end=12.0, max_points=2000)   # 1000 samples
+    assert (zoomed["level"], zoomed["bucket_size"]) == (0, 1)
+    assert zoomed["start_index"] == 5000 and zoomed["n_points"] == 1000
+
+    tiny = pyramid.query(max_points=10)   # coarser than the top level: reduced further
+    assert tiny["n_points"] <= 10 and tiny["bucket_size"] % 256 == 0
+
+
+@pytest.mark.parametrize("start, end, max_points", [(0.0, None, 2000), (13.37, 151.2, 700), (3.0, 3.5, 40), (0.0, None, 7)])
+def test_buckets_match_brute_force_min_max(data, tmp_path, start, end, max_points):
+    pyramid = MinMaxPyramid.build(str(tmp_path / "rec.pyr"), data, FS, ["a", "b", "c"])
+    result = pyramid.query(start, end, max_points, picks=[2, 0])
+
+    size, first = result["bucket_size"], result["start_index"]
+    assert result["n_points"] <= max_points
+    for i in range(result["n_points"]):
+        block = data[first + i * size:first + (i + 1) * size][:, [2, 0]]
+        assert np.array_equal([m[i] for m in result["min"]], block.min(axis=0))
+        assert np.array_equal([m[i] for m in result["max"]], block.max(axis=0))
+
+    # the buckets cover the requested range
+    s1 = len(data) if end is None else min(int(np.ceil(end * FS)), len(data))
+    assert first <= int(start * FS) and first + result["n_points"] * size >= s1
+
+
+def test_pyramid_is_rebuilt_when_the_source_changes(data, tmp_path):
+    path = str(tmp_path / "rec.pyr")
+    builds = []
+
+    def _source(values):
+        def _build():
+            builds.append(1)
+            return values, FS, ["a", "b", "c"]
+        return _build
+
+    first = decimation.get_pyramid(path, {"mtime": 1}, _source(data))
+    assert decimation.get_pyramid(path, {"mtime": 1}, _source(data)) is first
+    decimation._open_pyramids.clear()
+    reopened = decimation.get_pyramid(path, {"mtime": 1}, _source(data))   # from disk, no rebuild
+    assert len(builds) == 1 and reopened.meta["source"] == {"mtime": 1}
+
+    changed = decimation.get_pyramid(path, {"mtime": 2}, _source(-data[:5000]))
+    assert len(builds) == 2 and changed.n_samples == 5000
+    assert np.array_equal(changed.levels[0], -data[:5000])
+    decimation._open_pyramids.clear()
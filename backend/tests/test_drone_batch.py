@@ -0,0 +1,98 @@
+"""
+test_drone_batch.py
+--------------------
+Batch drone classification (services/drone_batch.py and the /predict/batch
+routes). A thread pool stands in for the process pool to keep the tests fast.
+"""
+import csv
+import io
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import soundfile as sf
+import torch
+
+from backend.services import audio_features, drone_batch
+
+
+class _LoudnessModel(torch.nn.Module):
+    def forward(self, x):
+        score = (x[:, 0] + 430.0) / 10.0
+        return torch.stack([-score, score], dim=1)
+
+
+@pytest.fixture
+def clip_dir(tmp_path):
+    rng = np.random.default_rng(0)
+    t = np.arange(16000) / 16000
+    for i in range(7):
+        y = 0.9 * np.sin(2 * np.pi * 200 * t) if i % 2 else 1e-3 * rng.standard_normal(len(t))
+        sf.write(tmp_path / f"clip{i}.wav", y, 16000, subtype="PCM_16")
+    (tmp_path / "sub").mkdir()
+    sf.write(tmp_path / "sub" / "nested.flac", 0.9 * np.sin(2 * np.pi * 300 * t), 16000)
+    (tmp_path / "sub" / "broken.wav").write_bytes(b"not audio")
+    (tmp_path / "notes.txt").write_text("skip")
+    return tmp_path
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(2) as pool:
+        yield pool
+
+
+def test_iter_classify_batches_and_reports_errors(clip_dir, pool):
+    files = drone_batch.list_audio_files(clip_dir)
+    assert [name for name, _ in files] == [f"clip{i}.wav" for i in range(7)] + ["sub/broken.wav", "sub/nested.flac"]
+
+    results = list(drone_batch.iter_classify(_LoudnessModel(), files, pool, batch_size=3, files_per_task=2))
+    summary = results.pop()["summary"]
+    by_name = {r["file"]: r for r in results}
+
+    assert summary["classified"] == 8 and summary["errors"] == 1 and summary["files_per_second"] > 0
+    assert "error" in by_name["sub/broken.wav"]
+    for name, path in files:
+        if name == "sub/broken.wav":
+            continue
+        features = torch.from_numpy(audio_features.extract_features(path))[None]
+        expected = float(torch.softmax(_LoudnessModel()(features), dim=1)[0, 1])
+        assert by_name[name]["drone_probability"] == round(expected, 4)
+        assert by_name[name]["label"] == ("Drone" if expected >= 0.5 else "Noise")
+
+
+def test_batch_routes_stream_csv_and_ndjson(clip_dir, pool, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from backend.routers import api
+    from backend.services import model_registry
+
+    monkeypatch.setattr(model_registry, "get", lambda name: _LoudnessModel())
+    monkeypatch.setattr(api, "BATCH_ROOT", str(clip_dir.parent))
+    monkeypatch.setattr(drone_batch, "shared_pool", lambda: pool)
+    app = FastAPI()
+    app.include_router(api.router)
+    client = TestClient(app)
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        for i in range(3):
+            z.write(clip_dir / f"clip{i}.wav", f"batch/clip{i}.wav")
+        z.writestr("batch/readme.txt", "skip")
+    r = client.post("/predict/batch?format=csv", files={"archive": ("batch.zip", buf.getvalue(), "application/zip")})
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/csv")
+    lines = r.text.strip().splitlines()
+    assert lines[-1].startswith("# classified=3 errors=0")
+    rows = list(csv.DictReader(lines[:-1]))
+    assert sorted(row["file"] for row in rows) == ["clip0.wav", "clip1.wav", "clip2.wav"]
+
+    r = client.post("/predict/batch/directory", json={"directory": clip_dir.name, "recursive": False})
+    lines = [json.loads(line) for line in r.text.strip().splitlines()]
+    assert lines[-1]["summary"]["classified"] == 7
+
+    assert client.post("/predict/batch/directory", json={"directory": "../.."}).status_code == 403
+    assert client.post("/predict/batch", files={"archive": ("clip.wav", b"x", "audio/wav")}).status_code == 400
+    assert client.post("/predict/batch/directory", json={"directory": clip_dir.name, "batch_size": 0}).status_code == 422
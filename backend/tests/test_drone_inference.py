@@ -0,0 +1,156 @@
+"""
+test_drone_inference.py
+------------------------
+Sliding-window drone timeline (services/drone_inference.py): block-wise
+decoding, per-window scores and merged detection intervals; the live PCM
+detector and its WebSocket route.
+"""
+import io
+
+import numpy as np
+import soundfile as sf
+import torch
+
+from backend.services import audio_features, drone_inference
+
+
+class _LoudnessModel(torch.nn.Module):
+    """Stand-in classifier: 'drone' when the first MFCC (overall level) is high."""
+
+    def forward(self, x):
+        score = (x[:, 0] + 430.0) / 10.0
+        return torch.stack([-score, score], dim=1)
+
+
+def _wav(y, sr):
+    buf = io.BytesIO()
+    sf.write(buf, y, sr, format="WAV", subtype="FLOAT")
+    return buf.getvalue()
+
+
+def test_timeline_scores_each_window_like_a_clip():
+    rng = np.random.default_rng(0)
+    sr = 16000
+    y = 1e-3 * rng.standard_normal(sr * 8).astype(np.float32)
+    y[3 * sr:5 * sr] += np.sin(2 * np.pi * 200 * np.arange(2 * sr) / sr).astype(np.float32)
+
+    # 1.3 s decode blocks: windows straddle block boundaries
+    detector = drone_inference.SlidingWindowDetector(_LoudnessModel(), window_s=1.0, hop_s=0.5, batch_size=4, block_s=1.3)
+    result = detector.timeline(_wav(y, sr), threshold=0.5)
+
+    assert result["duration_s"] == 8.0
+    np.testing.assert_allclose(result["times_s"], np.arange(15) * 0.5)
+    for i in (0, 5, 8, 14):
+        start = int(result["times_s"][i] * sr)
+        features = torch.from_numpy(audio_features.mean_mfcc(y[start:start + sr]))[None]
+        expected = torch.softmax(_LoudnessModel()(features), dim=1)[0, 1]
+        assert abs(result["drone_probability"][i] - float(expected)) < 1e-4
+
+    [interval] = result["intervals"]
+    assert 2.0 <= interval["start_s"] <= 3.0 and 5.0 <= interval["end_s"] <= 6.0
+
+
+def test_hop_longer_than_window_keeps_window_positions():
+    sr = 16000
+    y = 1e-3 * np.random.default_rng(2).standard_normal(sr * 10).astype(np.float32)
+    y[int(4.5 * sr):int(5.5 * sr)] += np.sin(2 * np.pi * 200 * np.arange(sr) / sr).astype(np.float32)
+
+    results = [
+        drone_inference.SlidingWindowDetector(_LoudnessModel(), window_s=1.0, hop_s=1.5, block_s=block_s).timeline(_wav(y, sr))
+        for block_s in (0.4, 1.3, 30)
+    ]
+    for result in results:
+        np.testing.assert_allclose(result["times_s"], np.arange(7) * 1.5)
+        np.testing.assert_allclose(result["drone_probability"], results[-1]["drone_probability"], atol=1e-4)
+    assert results[-1]["drone_probability"][3] > 0.5 and results[-1]["drone_probability"][4] < 0.5
+
+
+def test_short_clip_is_one_window():
+    y = np.random.default_rng(1).standard_normal(4000).astype(np.float32)
+    result = drone_inference.SlidingWindowDetector(_LoudnessModel()).timeline(_wav(y, 8000))
+    assert result["times_s"].tolist() == [0.0] and result["window_s"] == 0.5
+
+
+def test_detection_intervals_merge_overlaps_and_gaps():
+    starts = np.arange(10) * 0.5
+    probs = np.array([0.9, 0.8, 0.1, 0.1, 0.1, 0.1, 0.7, 0.1, 0.1, 0.6])
+    intervals = drone_inference.detection_intervals(starts, probs, window_s=1.0, threshold=0.5)
+    assert [(i["start_s"], i["end_s"], i["n_windows"]) for i in intervals] == [(0.0, 1.5, 2), (3.0, 4.0, 1), (4.5, 5.5, 1)]
+    assert intervals[0]["max_probability"] == 0.9 and abs(intervals[0]["mean_probability"] - 0.85) < 1e-12
+
+    merged = drone_inference.detection_intervals(starts, probs, window_s=1.0, threshold=0.5, min_gap_s=0.5)
+    assert [(i["start_s"], i["end_s"]) for i in merged] == [(0.0, 1.5), (3.0, 5.5)]
+
+
+class _Recorder(torch.nn.Module):
+    """Keeps every feature batch it is given; always answers 50/50."""
+
+    def __init__(self):
+        super().__init__()
+        self.inputs = []
+
+    def forward(self, x):
+        self.inputs.append(x.clone())
+        return torch.zeros(len(x), 2)
+
+
+def test_live_detector_matches_whole_window_features():
+    rng = np.random.default_rng(2)
+    sr = 22050
+    y = (0.1 * rng.standard_normal(sr * 6)).astype(np.float32)
+    y[2 * sr:4 * sr] += np.sin(2 * np.pi * 300 * np.arange(2 * sr) / sr).astype(np.float32)
+
+    recorder = _Recorder()
+    live = drone_inference.LiveDetector(recorder, input_sr=sr, window_s=1.0, hop_s=0.5)
+    results, pos = [], 0
+    while pos < len(y):
+        n = int(rng.integers(1, 5000))
+        results += live.push(y[pos:pos + n])
+        pos += n
+
+    assert live.hop == 8192   # 0.5 s rounded to whole 512-sample STFT hops
+    assert [r["window"] for r in results] == list(range(len(results))) and len(results) >= 9
+    y16 = audio_features.resample(y, sr, 16000)
+    windows = np.stack([y16[r["window"] * live.hop:r["window"] * live.hop + 16000] for r in results])
+    np.testing.assert_allclose(torch.cat(recorder.inputs).numpy(), audio_features.window_features(windows), atol=1e-3)
+
+
+def test_live_detector_accepts_messages_longer_than_its_buffer():
+    sr = 22050
+    y = (0.1 * np.random.default_rng(3).standard_normal(sr * 14)).astype(np.float32)
+
+    whole, pieces = _Recorder(), _Recorder()
+    at_once = drone_inference.LiveDetector(whole, input_sr=sr).push(y)
+    live = drone_inference.LiveDetector(pieces, input_sr=sr)
+    chunked = [r for i in range(0, len(y), 4000) for r in live.push(y[i:i + 4000])]
+
+    assert [r["window"] for r in at_once] == [r["window"] for r in chunked] == list(range(len(chunked)))
+    assert len(at_once) == 26
+    np.testing.assert_allclose(torch.cat(whole.inputs).numpy(), torch.cat(pieces.inputs).numpy(), atol=1e-4)
+
+
+def test_live_websocket_streams_predictions_and_caps_connections(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from backend.routers import api
+    from backend.services import model_registry
+
+    monkeypatch.setattr(model_registry, "get", lambda name: _LoudnessModel())
+    app = FastAPI()
+    app.include_router(api.router)
+    client = TestClient(app)
+
+    pcm = (0.9 * np.sin(2 * np.pi * 200 * np.arange(32000) / 16000) * 32767).astype("<i2").tobytes()
+    with client.websocket_connect("/ws/drone?sample_rate=16000&dtype=int16") as ws:
+        assert ws.receive_json()["hop_s"] == 0.512
+        for i in range(0, len(pcm), 1001):   # odd sizes split int16 samples across messages
+            ws.send_bytes(pcm[i:i + 1001])
+        first, second = ws.receive_json(), ws.receive_json()
+        assert (first["window"], second["window"]) == (0, 1)
+        assert first["label"] == "Drone" and first["end_s"] == 1.0
+
+    monkeypatch.setattr(api, "LIVE_MAX_CONNECTIONS", 0)
+    with client.websocket_connect("/ws/drone") as ws:
+        assert ws.receive_json()["type"] == "error"
+    assert api._live_connections == 0
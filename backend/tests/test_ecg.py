@@ -4,10 +4,141 @@ test_ecg.py
 Unit tests for ECG endpoints and processing logic.
 Uses FastAPI's TestClient to verify API responses.
 """
+import io
+import json
+import os
+import zipfile
+
+import numpy as np
 from fastapi import FastAPI
 
+from backend.services import ecg_processing as dsp
+from backend.benchmarks._signals import synthetic_ecg
+
 app = FastAPI()
 
 @app.get("/")
 def read_root():
     return {"message": "Hello World"}
+
+
+# -----------------------
+# R-peak detection
+# -----------------------
+def test_vectorized_r_peaks_match_reference_detector():
+    fs = 360.0
+    signals = synthetic_ecg(120, fs, n_leads=6, seed=3)
+    # a beat right at the start exercises the clipped edge windows
+    signals[:2] += 4.0
+    leads = list(range(6))
+
+    for prefiltered in (False, True):
+        expected = dsp.get_r_peaks_per_lead(signals, fs, leads, prefiltered=prefiltered)
+        assert dsp.detect_r_peaks(signals, fs, leads, prefiltered=prefiltered) == expected
+
+
+def test_refractory_filter_matches_greedy_loop():
+    rng = np.random.default_rng(0)
+    peaks = np.unique(rng.integers(0, 5000, 400))
+    groups = np.zeros(len(peaks), dtype=int)
+    distance = 25
+
+    expected = []
+    for p in peaks:
+        if not expected or p - expected[-1] >= distance:
+            expected.append(p)
+
+    keep = dsp._enforce_refractory(peaks, groups, distance)
+    assert peaks[keep].tolist() == expected
+
+
+# -----------------------
+# Beat matrix
+# -----------------------
+def test_beat_matrix_matches_per_cycle_interp():
+    rng = np.random.default_rng(0)
+    signal = rng.standard_normal(3000)
+    r_peaks = [10, 200, 420, 421, 700, 1300]
+
+    beats = dsp.beat_matrix(signal, r_peaks, n_points=64)
+
+    expected = [
+        np.interp(np.linspace(0, end - start - 1, 64), np.arange(end - start), signal[start:end])
+        for start, end in zip(r_peaks[:-1], r_peaks[1:])
+    ]
+    assert beats.dtype == np.float32
+    assert np.allclose(beats, expected, atol=1e-6)
+    assert [b.tolist() for b in dsp.cycle_bounds({0: r_peaks})[0]][:2] == [[10, 200], [200, 420]]
+
+
+# -----------------------
+# Bulk classification
+# -----------------------
+LEADS = ["I", "II", "III", "aVR", "aVL", "aVF", "V1", "V2", "V3", "V4", "V5", "V6"]
+
+
+def _record_archive(tmp_path, names):
+    import wfdb
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for i, name in enumerate(names):
+            signals = synthetic_ecg(12, 500, n_leads=12, seed=i)
+            wfdb.wrsamp(name, fs=500, units=["mV"] * 12, sig_name=LEADS, p_signal=signals,
+                        fmt=["16"] * 12, write_dir=str(tmp_path))
+            for ext in (".hea", ".dat"):
+                archive.write(os.path.join(tmp_path, name + ext), f"records/{name}{ext}")
+        archive.writestr("records/broken.hea", "broken 12 500 6000\n")   # no signal lines / .dat
+    return buf.getvalue()
+
+
+def test_bulk_upload_streams_a_line_per_record_and_a_summary(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from backend.routers import ecg
+    from backend.services import ecg_cache
+
+    batches = []
+
+    def predict_multi(X):
+        # the first record of each batch is confident, the rest go to the binary model
+        batches.append(len(X))
+        probs = np.full((len(X), 6), 1 / 6)
+        probs[0] = [0.9, 0.02, 0.02, 0.02, 0.02, 0.02]
+        return probs
+
+    def predict_binary(X):
+        assert X.shape[1:] == (9000, 1)
+        return np.full((len(X), 1), 0.8)
+
+    monkeypatch.setattr(ecg, "_get_predictors", lambda: (predict_multi, predict_binary))
+    app = FastAPI()
+    app.include_router(ecg.router, prefix="/api/ecg")
+    client = TestClient(app)
+    misses = ecg_cache.cache_stats()["misses"]
+
+    r = client.post("/api/ecg/classify/bulk/upload", params={"batch_size": 2},
+                    files={"archive": ("records.zip", _record_archive(tmp_path, ["a", "b", "c"]), "application/zip")})
+    assert r.status_code == 200 and r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+
+    results = {line["record"]: line for line in lines[:-1]}
+    assert sorted(results) == ["a", "b", "broken", "c"]
+    assert "error" in results["broken"]
+    labels = sorted(results[name]["label"] for name in "abc")
+    assert labels == ["1dAVb", "1dAVb", "Other Cardiac Abnormalities"]
+    assert sorted(batches) == [1, 2]
+    assert lines[-1]["summary"]["classified"] == 3 and lines[-1]["summary"]["errors"] == 1
+    assert ecg_cache.cache_stats()["misses"] == misses   # bulk reads stay out of the viewer cache stats
+
+    too_big = client.post("/api/ecg/classify/bulk", json={"record_numbers": ["a"], "batch_size": 100_000})
+    assert too_big.status_code == 422
+
+    # the same record name in two folders would overwrite one another once flattened
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for folder in ("x", "y"):
+            for ext in (".hea", ".dat"):
+                archive.write(os.path.join(tmp_path, "a" + ext), f"{folder}/a{ext}")
+    clash = client.post("/api/ecg/classify/bulk/upload", files={"archive": ("records.zip", buf.getvalue(), "application/zip")})
+    assert clash.status_code == 400 and "Duplicate file name" in clash.json()["detail"]
@@ -0,0 +1,91 @@
+"""
+test_ecg_inference.py
+----------------------
+Unit tests for the Keras inference wrapper in services/ecg_inference.py:
+a numpy stand-in for the wrapper logic, and real Keras models (when
+TensorFlow is installed) for the traced path and its eager fallback.
+"""
+import numpy as np
+import pytest
+
+from backend.services.ecg_inference import KerasPredictor
+
+
+class _LinearModel:
+    """Stands in for a Keras model: softmax over a fixed linear projection."""
+
+    input_shape = (None, 16, 3)
+
+    def __init__(self):
+        self.w = np.random.default_rng(0).standard_normal((16 * 3, 4)).astype(np.float32)
+        self.calls = []
+
+    def __call__(self, x, training=False):
+        self.calls.append(training)
+        z = np.asarray(x).reshape(len(x), -1) @ self.w
+        e = np.exp(z - z.max(axis=1, keepdims=True))
+        return e / e.sum(axis=1, keepdims=True)
+
+    def predict(self, x, **kwargs):
+        return self(x)
+
+
+def test_matches_predict_for_any_batch_size():
+    model = _LinearModel()
+    predictor = KerasPredictor(model).warmup(batch_sizes=(1, 8))
+    X = np.random.default_rng(1).standard_normal((5, 16, 3))
+
+    got = predictor(X)
+    assert got.shape == (5, 4)
+    assert np.allclose(got, model.predict(X.astype(np.float32)), atol=1e-6)
+    assert not any(model.calls)  # always inference mode
+
+
+def test_rejects_wrong_input_shape():
+    predictor = KerasPredictor(_LinearModel()).warmup()
+    with pytest.raises(ValueError):
+        predictor(np.zeros((1, 12, 3)))
+
+
+def _tiny_keras_model(tf):
+    keras = tf.keras
+    keras.utils.set_random_seed(0)
+    return keras.Sequential([
+        keras.Input(shape=(16, 3)),
+        keras.layers.Conv1D(4, 3, activation="relu"),
+        keras.layers.GlobalAveragePooling1D(),
+        keras.layers.Dense(2, activation="softmax"),
+    ])
+
+
+def test_traced_keras_model_matches_predict_without_retracing():
+    tf = pytest.importorskip("tensorflow")
+    model = _tiny_keras_model(tf)
+    predictor = KerasPredictor(model).warmup(batch_sizes=(1, 8))
+    assert predictor.compiled
+    traces = predictor._fn.experimental_get_tracing_count()
+    assert traces == 1   # batch dimension left open in the signature
+
+    rng = np.random.default_rng(2)
+    for n in (1, 5, 32, 3):
+        X = rng.standard_normal((n, 16, 3)).astype(np.float32)
+        np.testing.assert_allclose(predictor(X), model.predict(X, verbose=0), atol=1e-5)
+    assert predictor._fn.experimental_get_tracing_count() == traces
+
+
+def test_untraceable_keras_model_falls_back_to_eager():
+    tf = pytest.importorskip("tensorflow")
+
+    class _EagerOnly(tf.keras.Model):
+        """Reads tensor values in Python: works eagerly, cannot be traced."""
+
+        def build(self, input_shape):
+            pass
+
+        def call(self, x, training=False):
+            return tf.constant(x.numpy().reshape(len(x), -1)[:, :2])
+
+    predictor = KerasPredictor(_EagerOnly(), input_shape=(16, 3)).warmup()
+    assert not predictor.compiled
+    X = np.arange(2 * 16 * 3, dtype=np.float32).reshape(2, 16, 3)
+    np.testing.assert_array_equal(predictor(X), X.reshape(2, -1)[:, :2])
@@ -0,0 +1,254 @@
+"""
+test_eeg.py
+------------
+Unit tests for EEG loading, preprocessing and the segments endpoint.
+"""
+import os
+
+import numpy as np
+import pytest
+
+mne = pytest.importorskip("mne")
+pytest.importorskip("edfio")  # needed by mne.export to write the fixture
+
+from backend.services import eeg_processing as ep
+from backend.utils.stream_tools import decode_frame
+
+FS = 256.0
+CHANNELS = [f"EEG{i}" for i in range(8)]
+
+
+@pytest.fixture(scope="module")
+def edf_path(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(60 * FS)) / FS
+    data = 20e-6 * np.sin(2 * np.pi * 10 * t) + 5e-6 * rng.standard_normal((len(CHANNELS), len(t)))
+    raw = mne.io.RawArray(data, mne.create_info(CHANNELS, FS, ch_types="eeg"), verbose=False)
+    path = str(tmp_path_factory.mktemp("eeg") / "rec.edf")
+    mne.export.export_raw(path, raw, fmt="edf", verbose=False)
+    return path
+
+
+def test_header_only_metadata(edf_path):
+    header = ep.read_header(edf_path)
+    assert header["channels"] == CHANNELS
+    assert header["sfreq"] == FS
+    assert header["duration_seconds"] == pytest.approx(60.0, abs=1.0)
+
+
+@pytest.mark.parametrize("reference", ["average", "none"])
+@pytest.mark.parametrize("tmin, tmax", [(20.0, 24.0), (56.0, 60.0), (58.0, 75.0)])   # the file ends at 60 s
+def test_window_matches_full_preprocessing(edf_path, reference, tmin, tmax):
+    picks = ["EEG1", "EEG5"]
+    full = ep.preprocess_raw(ep.load_raw(edf_path), reference=reference)
+    expected = full.get_data(picks=picks)[:, int(tmin * FS):int(tmax * FS)]
+
+    window = ep.load_window(edf_path, tmin, tmax, picks=picks, reference=reference)
+    got = window.get_data(picks=picks)
+
+    assert got.shape == expected.shape
+    assert np.allclose(got, expected, atol=1e-9)
+    if reference == "none":
+        assert window.info["ch_names"] == picks  # only the picked channels were read
+
+
+def test_resampling_cached_rows_matches_raw_resample(edf_path):
+    # /predict/{filename} resamples rows of the cached native-rate array
+    expected = ep.preprocess_raw(ep.load_raw(edf_path), resample_to=128).get_data()[:4]
+    native = ep.to_microvolts(ep.preprocess_raw(ep.load_raw(edf_path)).get_data()).astype(np.float32)
+
+    got = ep.resample_data(native[:4], FS, 128) * 1e-6
+
+    assert got.shape == expected.shape
+    assert np.allclose(got, expected, atol=1e-3 * np.abs(expected).max())
+
+
+def test_preprocessed_cache_spills_and_reopens(edf_path, tmp_path, monkeypatch):
+    from backend.services import eeg_cache
+
+    monkeypatch.setattr(eeg_cache, "CACHE_DIR", str(tmp_path))
+    eeg_cache.clear_cache()
+
+    first = eeg_cache.get_preprocessed(edf_path)
+    assert first.data.dtype == np.float32 and first.ch_names == CHANNELS
+    assert eeg_cache.get_preprocessed(edf_path) is first  # memory hit
+
+    eeg_cache.clear_cache()
+    reopened = eeg_cache.peek(edf_path)  # from the spill file, no preprocessing
+    assert isinstance(reopened.data, np.memmap)
+    assert np.array_equal(reopened.data, first.data)
+    assert eeg_cache.peek(edf_path, highpass=1.0) is None
+    stats = eeg_cache.cache_stats()
+    assert stats["bytes"] == 0 and stats["disk"]["bytes"] > first.data.nbytes  # mapped, not in RAM
+    eeg_cache.clear_cache()
+
+
+def test_spill_directory_stays_within_its_disk_budget(edf_path, tmp_path, monkeypatch):
+    from backend.services import eeg_cache
+
+    monkeypatch.setattr(eeg_cache, "CACHE_DIR", str(tmp_path))
+    eeg_cache.clear_cache()
+    eeg_cache.get_preprocessed(edf_path)
+    spill_bytes = eeg_cache.cache_stats()["disk"]["bytes"]
+    monkeypatch.setattr(eeg_cache, "CACHE_DISK_MAX_BYTES", int(1.5 * spill_bytes))
+    eeg_cache.clear_cache()
+
+    assert isinstance(eeg_cache.peek(edf_path).data, np.memmap)
+    eeg_cache.get_preprocessed(edf_path, highpass=1.0)   # a second spill: the first one goes
+    assert eeg_cache.peek(edf_path) is None              # memory map dropped along with its files
+    assert os.listdir(tmp_path) and all("-hp1-" in name for name in os.listdir(tmp_path))
+    assert eeg_cache.cache_stats()["disk"]["entries"] == 1
+    eeg_cache.clear_cache()
+
+
+@pytest.fixture
+def client(edf_path, tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from backend.routers import eeg
+    from backend.services import eeg_cache
+
+    monkeypatch.setattr(eeg, "UPLOAD_DIR", os.path.dirname(edf_path))
+    monkeypatch.setattr(eeg_cache, "CACHE_DIR", str(tmp_path))
+    eeg_cache.clear_cache()
+    app = FastAPI()
+    app.include_router(eeg.router, prefix="/api/eeg")
+    yield TestClient(app)
+    eeg_cache.clear_cache()
+
+
+def test_segment_pages_reassemble_full_response(edf_path, client):
+    from backend.services import eeg_cache
+
+    params = {"filename": os.path.basename(edf_path), "channels": ["EEG2", "EEG6"]}
+
+    def _pages():
+        pages, cursor = [], 0
+        while cursor is not None:
+            page = client.get("/api/eeg/segments", params={**params, "cursor": cursor, "limit": 7, "format": "compact"}).json()
+            assert page["start_time"] == cursor * page["segment_samples"] / page["fs"]
+            assert page["segments"] or cursor == 0   # next_cursor is null right after the last segment
+            pages += page["segments"]
+            cursor = page["next_cursor"]
+        return np.array(pages)
+
+    uncached = _pages()   # nothing preprocessed yet: every page is read through load_window
+    assert eeg_cache.peek(edf_path) is None
+    full = client.get("/api/eeg/segments", params=params).json()
+    assert uncached.shape == np.shape(full["segments"]) == (30, 512, 2)
+    assert np.allclose(uncached, full["segments"], atol=1e-3)
+    assert np.array_equal(_pages(), np.array(full["segments"]))   # cached slices
+
+    r = client.get("/api/eeg/segments", params={**params, "cursor": 3, "limit": 2, "format": "f32"})
+    frame = decode_frame(r.content)
+    assert int(r.headers["X-EEG-Segments"]) == 2
+    assert np.array_equal(frame["samples"].reshape(2, -1, 2), np.array(full["segments"][3:5], dtype=np.float32))
+
+
+def test_playback_socket_seeks_and_switches_channels(edf_path, client):
+    name = os.path.basename(edf_path)
+    full = client.get("/api/eeg/segments", params={"filename": name, "channels": ["EEG0", "EEG4"]}).json()
+    expected = np.array(full["segments"], dtype=np.float32).reshape(-1, 2)
+
+    with client.websocket_connect(f"/api/eeg/ws/eeg/{name}?channels=EEG0&channels=EEG4&speed=10&chunk=128") as ws:
+        meta = ws.receive_json()
+        assert meta["speed"] == 4.0  # clamped to the EEG player's range
+        frame = decode_frame(ws.receive_bytes())
+        assert frame["start_index"] == 0
+        assert np.array_equal(frame["samples"], expected[:len(frame["samples"])])
+
+        ws.send_json({"type": "seek", "time": 30.0})
+        ws.send_json({"type": "channels", "channels": ["EEG4"]})
+        while True:
+            msg = ws.receive()
+            if msg.get("bytes") and decode_frame(msg["bytes"])["samples"].shape[1] == 1:
+                frame = decode_frame(msg["bytes"])
+                break
+        start = frame["start_index"]
+        assert start >= 30 * FS
+        assert np.array_equal(frame["samples"][:, 0], expected[start:start + len(frame["samples"]), 1])
+
+
+def test_playback_block_load_does_not_block_other_requests(edf_path, client, monkeypatch):
+    import threading
+
+    from backend.routers import eeg
+
+    loading, release, loaded = threading.Event(), threading.Event(), threading.Event()
+    load_block = eeg.EEGStreamSource._load_block
+
+    def slow_load_block(self, b):
+        loading.set()
+        release.wait(5)
+        try:
+            return load_block(self, b)
+        finally:
+            loaded.set()
+
+    monkeypatch.setattr(eeg.EEGStreamSource, "_build_store", lambda self: None)
+    monkeypatch.setattr(eeg.EEGStreamSource, "_load_block", slow_load_block)
+    name = os.path.basename(edf_path)
+
+    with client, client.websocket_connect(f"/api/eeg/ws/eeg/{name}?channels=EEG0") as ws:
+        try:
+            assert ws.receive_json()["type"] == "meta"
+            assert loading.wait(5)
+            r = client.get("/api/eeg/segments", params={"filename": name, "channels": ["EEG1"], "limit": 1})
+            assert r.status_code == 200
+            assert not loaded.is_set()  # served while the player's first block was still loading
+        finally:
+            release.set()
+        assert decode_frame(ws.receive_bytes())["start_index"] == 0
+
+
+def test_bandpower_is_cached_and_sliced(edf_path, client):
+    from backend.services import eeg_cache
+
+    name = os.path.basename(edf_path)
+    full = client.get("/api/eeg/bandpower", params={"filename": name}).json()
+    misses = eeg_cache.cache_stats()["misses"]
+    part = client.get("/api/eeg/bandpower", params={"filename": name, "channels": ["EEG3"], "start": 10, "end": 20})
+
+    assert part.status_code == 200
+    body = part.json()
+    assert eeg_cache.cache_stats()["misses"] == misses  # served from the cached series
+    assert body["channels"] == ["EEG3"] and body["start_time"] == 10.0 and body["frames"] == 20
+    assert body["power"]["EEG3"]["alpha"] == full["power"]["EEG3"]["alpha"][20:40]
+    assert sum(body["power"]["EEG3"][band][0] for band in body["bands"]) == pytest.approx(1.0, abs=1e-3)
+    assert body["band_edges"]["gamma"] == [30.0, 40.0]   # stops at the preprocessing low-pass
+
+
+def test_prediction_stream_groups_windows_and_ends_with_average(edf_path, client, monkeypatch):
+    import json
+
+    import torch
+
+    from backend.routers import eeg
+    from backend.services import model_registry
+    from backend.services.eeg_model import EEGNet
+
+    torch.manual_seed(0)
+    model = EEGNet().eval()
+    monkeypatch.setattr(model_registry, "get", lambda name: model)
+
+    rng = np.random.default_rng(1)
+    names = [f"EEG{i}" for i in range(19)]
+    raw = mne.io.RawArray(5e-6 * rng.standard_normal((19, int(30 * FS))),
+                          mne.create_info(names, FS, ch_types="eeg"), verbose=False)
+    name = "rec19.edf"
+    mne.export.export_raw(os.path.join(eeg.UPLOAD_DIR, name), raw, fmt="edf", verbose=False, overwrite=True)
+
+    response = client.post(f"/api/eeg/predict/{name}/stream", params={"group": 7})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    summary = client.post(f"/api/eeg/predict/{name}").json()
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    start, groups, result = lines[0], lines[1:-1], lines[-1]
+    assert start["type"] == "start" and result["type"] == "result"
+    assert [g["start"] for g in groups] == list(range(0, start["n_windows"], 7))
+    assert sum(g["count"] for g in groups) == start["n_windows"] == groups[-1]["done"]
+    weighted = sum(np.array(list(g["probabilities"].values())) * g["count"] for g in groups) / start["n_windows"]
+    assert np.allclose(weighted, list(result["probabilities"].values()), atol=1e-6)
+    assert result["prediction"] == summary["prediction"]
+    assert result["confidence"] == pytest.approx(summary["confidence"], abs=1e-6)
@@ -0,0 +1,80 @@
+"""
+test_eeg_inference.py
+----------------------
+Streaming sliding-window inference (services/eeg_inference.py) against the
+list-of-slices + np.stack path it replaces.
+"""
+import numpy as np
+import pytest
+import torch
+
+from backend.services.eeg_inference import WindowedClassifier, channel_stats
+from backend.services.eeg_model import EEGNet
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    return EEGNet().eval()
+
+
+def _reference(model, data, window=256, step=128, chunk=128):
+    mean = data.mean(axis=1, keepdims=True)
+    std = data.std(axis=1, keepdims=True)
+    std[std == 0] = 1.0
+    z = (data - mean) / std
+    segments = [z[:, s:s + window] for s in range(0, z.shape[1] - window + 1, step)]
+    batch = torch.tensor(np.stack(segments), dtype=torch.float32).unsqueeze(1)
+    with torch.no_grad():
+        probs = [torch.softmax(model(batch[i:i + chunk]), dim=1) for i in range(0, len(batch), chunk)]
+    return torch.cat(probs).mean(dim=0).numpy(), len(segments)
+
+
+def test_matches_stacked_windows(model):
+    data = 1e-5 * np.random.default_rng(0).standard_normal((19, 256 * 75 + 77))
+    data[3] = 0.0  # flat channel: std 0 -> scale 1, like StandardScaler
+
+    expected, n_expected = _reference(model, data)
+    got, n = WindowedClassifier(model, batch_size=32).predict(data)
+
+    assert n == n_expected
+    assert np.allclose(got, expected, atol=1e-5)
+
+
+def test_running_mean_and_memmap_input(model, tmp_path):
+    data = np.random.default_rng(1).standard_normal((19, 256 * 20)).astype(np.float32)
+    path = tmp_path / "eeg.npy"
+    np.save(path, data)
+    mm = np.load(path, mmap_mode="r")
+
+    steps = list(WindowedClassifier(model, batch_size=8).iter_predict(mm))
+    assert [done for done, _, _ in steps][-1] == steps[-1][1] == 39
+    assert np.allclose(steps[-1][2], WindowedClassifier(model).predict(data)[0], atol=1e-6)
+
+    mean, std = channel_stats(mm)
+    assert np.allclose(mean, data.mean(axis=1), atol=1e-6)
+    assert np.allclose(std, data.std(axis=1), rtol=1e-5)
+
+
+def test_inference_mode_does_not_leak_across_threads(model):
+    import threading
+
+    data = np.random.default_rng(2).standard_normal((19, 256 * 10)).astype(np.float32)
+    batches = WindowedClassifier(model, batch_size=4).iter_window_probs(data)
+    leaked = []
+
+    def _step():  # like a streaming response: each next() on a new worker thread
+        next(batches, None)
+        leaked.append(torch.is_inference_mode_enabled())
+
+    for _ in range(3):
+        worker = threading.Thread(target=_step)
+        worker.start()
+        worker.join()
+    assert leaked == [False, False, False]
+    batches.close()
+
+
+def test_too_short_is_rejected(model):
+    with pytest.raises(ValueError):
+        WindowedClassifier(model).predict(np.zeros((19, 100)))
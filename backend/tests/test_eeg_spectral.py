@@ -0,0 +1,58 @@
+"""
+test_eeg_spectral.py
+---------------------
+Batched band-power and spectrogram series (services/eeg_spectral.py) against
+one Welch / FFT call per window.
+"""
+import numpy as np
+import pytest
+
+from backend.services import eeg_spectral
+from backend.utils import signal_tools as st
+
+FS = 256.0
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    t = np.arange(int(30 * FS)) / FS
+    alpha = np.sin(2 * np.pi * 10 * t) * (t > 15)  # alpha appears halfway through
+    return (alpha + 0.3 * rng.standard_normal((3, len(t)))).astype(np.float32)
+
+
+def test_band_power_series_matches_per_window_welch(data, monkeypatch):
+    monkeypatch.setattr(eeg_spectral, "_WINDOWS_PER_BLOCK", 7)  # several blocks, last one partial
+    series = eeg_spectral.band_power_series(data, FS, window_s=2.0, step_s=0.5)
+
+    window, step = 512, 128
+    n_frames = (data.shape[1] - window) // step + 1
+    assert series.shape == (len(eeg_spectral.EEG_BANDS), 3, n_frames)
+    for i in (0, 5, n_frames - 1):
+        ref = st.band_powers(data[:, i * step:i * step + window].astype(np.float64), FS,
+                             eeg_spectral.EEG_BANDS, nperseg=256)
+        for b, band in enumerate(eeg_spectral.EEG_BANDS):
+            assert np.allclose(series[b, :, i], ref[band], atol=1e-6)
+
+    alpha = series[list(eeg_spectral.EEG_BANDS).index("alpha")]
+    assert alpha[:, :10].mean() < 0.5 < alpha[:, -10:].mean()
+
+
+def test_bands_stop_at_nyquist_and_low_pass(data):
+    assert eeg_spectral.bands_below(40.0)["gamma"] == (30.0, 40.0)
+    assert list(eeg_spectral.bands_below(10.0)) == ["delta", "theta", "alpha"]
+
+    # at 64 Hz gamma ends at Nyquist, so it is the same as the explicitly capped band
+    series = eeg_spectral.band_power_series(data[:, ::4], FS / 4, window_s=2.0, step_s=1.0)
+    capped = eeg_spectral.band_power_series(data[:, ::4], FS / 4, window_s=2.0, step_s=1.0,
+                                            bands=eeg_spectral.bands_below(32.0))
+    assert series.shape[0] == 5 and np.array_equal(series, capped)
+
+
+def test_spectrogram_frames_are_centred_on_hops(data):
+    freqs, power = eeg_spectral.spectrogram(data, FS, nperseg=256, hop=128, fmax=40)
+
+    assert freqs.max() <= 40
+    assert power.shape == (3, len(freqs), data.shape[1] // 128 + 1)
+    peak = freqs[power[0, :, -5].argmax()]
+    assert peak == pytest.approx(10.0, abs=1.0)
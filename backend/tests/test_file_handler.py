@@ -0,0 +1,107 @@
+"""
+test_file_handler.py
+---------------------
+Unit tests for archive extraction and the content-addressed upload store
+in utils/file_handler.py.
+"""
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from backend.utils.file_handler import extract_archive, is_archive
+
+
+def test_zip_is_flattened_and_filtered(tmp_path):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("batch/00001_hr.hea", "header")
+        z.writestr("batch/00001_hr.dat", b"\x00\x01")
+        z.writestr("batch/notes.txt", "skip me")
+        z.writestr("../../evil.hea", "outside")
+        z.writestr("__MACOSX/._00001_hr.hea", "resource fork")
+    buf.seek(0)
+
+    written = extract_archive(buf, "batch.zip", tmp_path, extensions=(".dat", ".hea"))
+
+    assert sorted(p.rsplit("/", 1)[-1] for p in written) == ["00001_hr.dat", "00001_hr.hea", "evil.hea"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["00001_hr.dat", "00001_hr.hea", "evil.hea"]
+
+
+def test_duplicate_names_in_different_folders_are_rejected(tmp_path):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("a/100.dat", b"first")
+        z.writestr("b/100.dat", b"second")
+    buf.seek(0)
+
+    with pytest.raises(ValueError, match="100.dat"):
+        extract_archive(buf, "batch.zip", tmp_path)
+
+
+def test_tar_gz(tmp_path):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as t:
+        data = b"header"
+        info = tarfile.TarInfo("records/1.hea")
+        info.size = len(data)
+        t.addfile(info, io.BytesIO(data))
+    buf.seek(0)
+
+    assert is_archive("records.tar.gz")
+    written = extract_archive(buf, "records.tar.gz", tmp_path)
+    assert len(written) == 1 and (tmp_path / "1.hea").read_bytes() == b"header"
+
+
+def test_content_store_dedupes_and_hashes(tmp_path):
+    import hashlib
+
+    from backend.utils.file_handler import ContentStore
+
+    store = ContentStore(tmp_path, max_bytes=1 << 20, suffix=".wav")
+    payload = b"RIFF" + bytes(range(256)) * 10
+    digest, created = store.put(io.BytesIO(payload))
+    again, created_again = store.put(io.BytesIO(payload))
+
+    assert digest == again == hashlib.sha256(payload).hexdigest()
+    assert created and not created_again
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{digest}.wav"]
+    assert store.get(digest) == str(tmp_path / f"{digest}.wav")
+    assert store.get("../etc/passwd") is None
+
+
+def test_content_store_evicts_lru_and_expired(tmp_path):
+    import os
+    import time
+
+    from backend.utils.file_handler import ContentStore
+
+    evicted = []
+    store = ContentStore(tmp_path, max_bytes=250, on_evict=evicted.append)
+    a, _ = store.put(io.BytesIO(b"a" * 100))
+    b, _ = store.put(io.BytesIO(b"b" * 100))
+    store.get(a)                                  # b is now least recently used
+    c, _ = store.put(io.BytesIO(b"c" * 100))
+    assert evicted == [b] and store.get(b) is None
+    assert store.stats()["bytes"] == 200
+
+    # A fresh store rebuilds the last-use order from mtimes and applies the TTL
+    old = time.time() - 3600
+    os.utime(tmp_path / a, (old, old))
+    store = ContentStore(tmp_path, max_bytes=250, ttl_seconds=60, on_evict=evicted.append)
+    assert store.get(a) is None and store.get(c) is not None
+    assert evicted[-1] == a
+
+
+def test_content_store_does_not_evict_held_files(tmp_path):
+    import os
+
+    from backend.utils.file_handler import ContentStore
+
+    store = ContentStore(tmp_path, max_bytes=150)
+    with store.hold(io.BytesIO(b"a" * 100)) as (a, path, created):
+        b, _ = store.put(io.BytesIO(b"b" * 100))     # over budget, but a is held
+        assert created and os.path.exists(path)
+        assert store.get(b) is None                   # so the unheld file goes instead
+    assert store.get(a) == path
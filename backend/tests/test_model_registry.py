@@ -0,0 +1,56 @@
+"""
+test_model_registry.py
+-----------------------
+Unit tests for the lazy model registry in services/model_registry.py.
+"""
+import pytest
+
+from backend.services import model_registry
+
+
+def test_loads_once_on_first_use():
+    calls = []
+    entry = model_registry.ModelEntry("demo", lambda: calls.append(1) or "weights")
+    assert entry.status()["state"] == model_registry.PENDING
+
+    assert entry.get() == "weights"
+    assert entry.get() == "weights"
+    assert calls == [1]
+    assert entry.status()["state"] == model_registry.READY
+
+
+def test_failure_is_reported_and_retried():
+    attempts = []
+
+    def _loader():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise FileNotFoundError("model.pth")
+        return "weights"
+
+    entry = model_registry.ModelEntry("flaky", _loader)
+    with pytest.raises(model_registry.ModelUnavailable):
+        entry.get()
+    status = entry.status()
+    assert status["state"] == model_registry.FAILED and "model.pth" in status["error"]
+
+    assert entry.get() == "weights"
+    assert entry.status()["error"] is None
+
+
+def test_readiness_waits_only_for_required_models(monkeypatch):
+    monkeypatch.setattr(model_registry, "_models", {})
+
+    def _missing():
+        raise FileNotFoundError("eeg.pth")
+
+    model_registry.register("ecg", lambda: "weights")
+    model_registry.register("eeg", _missing)
+    assert model_registry.status(required=["ecg"])["ready"] is False
+    assert model_registry.status(required=[])["ready"] is True   # nothing required: ready at once
+
+    model_registry.warmup()
+    status = model_registry.status(required=["ecg"])
+    assert status["ready"] is True and status["degraded"] == ["eeg"]
+    assert status["models"]["eeg"]["state"] == model_registry.FAILED
+    assert model_registry.status(required=["ecg", "eeg"])["ready"] is False
@@ -0,0 +1,56 @@
+"""
+test_models_processing.py
+--------------------------
+Crop-first polyphase preprocessing in services/models_processing.py against
+the previous full-record FFT resample (scipy.signal.resample, then crop).
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from scipy.signal import resample
+
+from backend.benchmarks._signals import synthetic_ecg
+from backend.services import models_processing as mp
+from backend.utils import signal_tools as st
+
+LEADS = ["I", "II", "III", "aVR", "aVL", "aVF", "V1", "V2", "V3", "V4", "V5", "V6"]
+
+
+def _fft_reference(x, fs, target_fs, target_len):
+    if fs != target_fs:
+        x = resample(x, int(round(x.shape[0] * target_fs / fs)), axis=0)
+    x = x[:target_len]
+    x = np.concatenate([x, np.zeros((target_len - len(x),) + x.shape[1:])])
+    return (x - x.mean(axis=0)) / (x.std(axis=0) + 1e-8)
+
+
+def _record(fs, duration_s):
+    # in-band (< 40 Hz) content: the two resamplers differ only near Nyquist
+    signals = st.lowpass(synthetic_ecg(duration_s, fs, 12, seed=1), fs, 40.0, axis=0)
+    return SimpleNamespace(p_signal=signals, fs=fs, sig_name=LEADS)
+
+
+@pytest.mark.parametrize("fs, duration_s", [(500, 60), (360, 30), (257, 45), (1000, 12), (250, 8), (400, 20)])
+def test_matches_full_fft_resample(fs, duration_s):
+    rec = _record(fs, duration_s)
+    for target_fs, target_len, got in [
+        (400, 4096, mp.preprocess_ecg_with_mapping_from_record(rec)[0]),
+        (300, 9000, mp.preprocess_for_binary_model(rec)[0]),
+    ]:
+        x = rec.p_signal if got.shape[1] == 12 else rec.p_signal[:, :1]
+        expected = _fft_reference(x, fs, target_fs, target_len)
+        assert got.shape == expected.shape
+
+        # the FFT path wraps around at the record's ends, so compare away from them
+        n = min(target_len, int(round(len(x) * target_fs / fs)))
+        core = slice(100, n - 100)
+        assert np.abs(got[core] - expected[core]).max() < 0.02
+        assert np.all(got[n:] == got[-1])  # padding stays constant
+
+
+def test_only_needed_input_is_resampled():
+    x = np.random.default_rng(0).standard_normal((500 * 3600, 2))  # one hour at 500 Hz
+    out = mp.crop_resample(x, 500, 400, 4096)
+    assert out.shape == (4096, 2)
+    assert mp.resample_ratio(500, 400) == (4, 5)
@@ -0,0 +1,119 @@
+"""
+test_stream_tools.py
+---------------------
+Round-trip tests for the binary frames sent by the WebSocket players, and
+the player loop itself against an in-memory socket.
+"""
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+from fastapi import WebSocketDisconnect
+
+from backend.utils.stream_tools import StreamSource, decode_frame, encode_frame, run_player
+
+
+def test_float32_frame_round_trip_with_peaks():
+    samples = np.random.default_rng(0).standard_normal((50, 3))
+    peaks = [np.array([1010, 1030]), np.array([], dtype=np.int64), np.array([1049])]
+
+    frame = decode_frame(encode_frame(1000, samples, "float32", peaks))
+
+    assert frame["start_index"] == 1000
+    assert np.allclose(frame["samples"], samples, atol=1e-6)
+    assert [p.tolist() for p in frame["peaks"]] == [[1010, 1030], [], [1049]]
+
+
+def test_int16_frame_is_scaled_per_channel():
+    samples = np.stack([np.linspace(-2.0, 2.0, 40), np.linspace(0.0, 1e-3, 40)], axis=1)
+
+    frame = decode_frame(encode_frame(0, samples, "int16"))
+
+    assert np.allclose(frame["samples"], samples, rtol=0, atol=np.abs(samples).max(axis=0) / 30000)
+
+
+class _Ramp(StreamSource):
+    fs = 100.0
+    n_samples = 10_000
+    channel_names = ["a"]
+
+    def select(self, channels):
+        self.selected = list(channels)
+        return self.selected
+
+    def read(self, start, stop):
+        return np.arange(start, stop, dtype=np.float32)[:, None]
+
+
+class _Socket:
+    """Just enough of a WebSocket for run_player; a None message disconnects."""
+
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.frames = []
+
+    async def receive_json(self):
+        msg = await self.incoming.get()
+        if msg is None:
+            raise WebSocketDisconnect()
+        return msg
+
+    async def send_json(self, msg):
+        pass
+
+    async def send_bytes(self, frame):
+        self.frames.append(decode_frame(frame)["start_index"])
+
+
+def test_stream_source_requires_select_and_read():
+    class _NoRead(StreamSource):
+        def select(self, channels):
+            return channels
+
+    with pytest.raises(TypeError):
+        _NoRead()
+    assert _Ramp().read(3, 5).tolist() == [[3.0], [4.0]]
+
+
+def test_control_messages_that_wake_the_player_keep_their_order():
+    async def _play():
+        socket, source = _Socket(), _Ramp()
+        source.select(["a"])
+        player = asyncio.create_task(run_player(socket, source, chunk=10))
+        await asyncio.sleep(0.03)            # first frame sent, player sleeping until the next one
+        socket.incoming.put_nowait({"type": "seek", "index": 5000})
+        socket.incoming.put_nowait({"type": "seek", "index": 200})
+        await asyncio.sleep(0.05)
+        socket.incoming.put_nowait(None)
+        await asyncio.wait_for(player, timeout=5)
+        return socket.frames
+
+    frames = asyncio.run(_play())
+    assert frames[0] == 0
+    after_seek = [start for start in frames if start >= 200]
+    assert after_seek and 200 <= after_seek[0] < 5000   # the later seek wins
+    assert all(start < 5000 for start in frames)
+
+
+def test_channel_switch_runs_off_the_event_loop():
+    class _RecordsThread(_Ramp):
+        threads = []
+
+        def select(self, channels):
+            self.threads.append(threading.get_ident())
+            return super().select(channels)
+
+    async def _play():
+        socket, source = _Socket(), _RecordsThread()
+        source.select(["a"])
+        player = asyncio.create_task(run_player(socket, source, chunk=10))
+        socket.incoming.put_nowait({"type": "channels", "channels": ["a"]})
+        await asyncio.sleep(0.05)
+        socket.incoming.put_nowait(None)
+        await asyncio.wait_for(player, timeout=5)
+        return source.threads
+
+    loop_thread = threading.get_ident()   # asyncio.run runs the loop in this thread
+    threads = asyncio.run(_play())
+    assert len(threads) == 2 and threads[0] == loop_thread and threads[1] != loop_thread
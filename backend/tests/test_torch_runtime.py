@@ -0,0 +1,57 @@
+"""
+test_torch_runtime.py
+----------------------
+Compiled / quantized predictors (services/torch_runtime.py) against the
+eager models they wrap.
+"""
+import pytest
+import torch
+
+from backend.services import torch_runtime
+from backend.services.drone_model import AudioClassifier
+from backend.services.eeg_model import EEGNet
+
+
+@pytest.fixture(scope="module")
+def eegnet():
+    torch.manual_seed(0)
+    return EEGNet().eval()
+
+
+def test_script_runtime_matches_eager(eegnet):
+    x = torch.randn(37, 1, 19, 256)  # batch size differs from the traced example
+    predictor = torch_runtime.TorchPredictor(eegnet, x[:1], runtime="script")
+
+    assert predictor.runtime == "script"
+    with torch.inference_mode():
+        assert torch.allclose(predictor(x), eegnet(x), atol=1e-5)
+
+
+def test_int8_linear_layers_keep_predictions(eegnet):
+    x = torch.randn(64, 1, 19, 256)
+    predictor = torch_runtime.TorchPredictor(eegnet, x[:1], quantize=True)
+
+    assert predictor.quantized
+    assert isinstance(predictor._fn.fc, torch.ao.nn.quantized.dynamic.Linear)
+    assert predictor.check_parity(x)["argmax_agreement"] >= 0.95
+
+
+def test_single_sample_keeps_batch_dimension():
+    torch.manual_seed(0)
+    model = AudioClassifier().eval()
+    predictor = torch_runtime.TorchPredictor(model, torch.zeros(1, 40), runtime="script")
+
+    x = torch.randn(40)
+    with torch.inference_mode():
+        assert predictor(x).shape == model(x).shape == (1, 2)
+
+
+def test_unavailable_runtime_falls_back_to_eager(eegnet, monkeypatch):
+    def _fail(model, example):
+        raise RuntimeError("no compiler")
+
+    monkeypatch.setattr(torch_runtime, "_compile", _fail)
+    predictor = torch_runtime.TorchPredictor(eegnet, torch.zeros(1, 1, 19, 256), runtime="compile")
+
+    assert predictor.runtime == "eager"
+    assert torch_runtime.optimize(eegnet, torch.zeros(1, 1, 19, 256), runtime="eager", quantize=False) is eegnet
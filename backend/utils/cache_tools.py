@@ -0,0 +1,302 @@
+"""
+cache_tools.py
+---------------
+In-process caching helpers shared by the signal services:
+- Byte-budgeted LRU cache with hit/miss counters
+- Byte / age budget over the spill files of an on-disk cache directory
+- File fingerprints (path + mtime + size) used as cache keys
+- Content hashes, memoized per file fingerprint
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def file_fingerprint(*paths):
+    """
+    Return a hashable key for the current on-disk version of ``paths``.
+    Any rewrite of one of the files (new mtime or size) yields a new key.
+    """
+    parts = []
+    for path in paths:
+        st = os.stat(path)
+        parts.append((os.path.abspath(path), st.st_mtime_ns, st.st_size))
+    return tuple(parts)
+
+
+_HASH_CHUNK = 1 << 20
+_content_hashes = {}  # fingerprint -> hex digest
+_content_hashes_lock = threading.Lock()
+_MAX_MEMO_HASHES = 4096
+
+
+def content_hash(path):
+    """
+    SHA-256 of the file contents, read in 1 MB chunks. Memoized per file
+    fingerprint, so an unchanged file is hashed once per process.
+    """
+    key = file_fingerprint(path)
+    with _content_hashes_lock:
+        digest = _content_hashes.get(key)
+    if digest is not None:
+        return digest
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(block)
+    digest = h.hexdigest()
+
+    with _content_hashes_lock:
+        if len(_content_hashes) >= _MAX_MEMO_HASHES:
+            _content_hashes.clear()
+        _content_hashes[key] = digest
+    return digest
+
+
+def nbytes(obj):
+    """Approximate memory footprint of an array or a container of arrays."""
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sum(nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        # lists of ints / floats: ~8 bytes per item is close enough for budgeting
+        return sum(nbytes(v) if isinstance(v, (np.ndarray, dict, list, tuple)) else 8 for v in obj)
+    return 0
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by a total byte budget.
+
+    Values are evicted least-recently-used first once the summed size of the
+    stored values exceeds ``max_bytes``. A single value larger than the budget
+    is returned to the caller but never stored.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self._items = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def peek(self, key, default=None):
+        """Like get(), but neither counts a hit / miss nor refreshes the entry's recency."""
+        with self._lock:
+            item = self._items.get(key)
+            return default if item is None else item[0]
+
+    def put(self, key, value, size=None):
+        """Insert or refresh ``key``; re-putting an existing key updates its size."""
+        size = nbytes(value) if size is None else int(size)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            if size > self.max_bytes:
+                return value
+            self._items[key] = (value, size)
+            self.current_bytes += size
+            self._evict_locked()
+        return value
+
+    def get_or_create(self, key, factory, size=None):
+        """
+        Return the cached value for ``key`` or build it with ``factory()``.
+        Concurrent misses on the same key run the factory only once.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # another thread may have filled it while we waited
+            with self._lock:
+                item = self._items.get(key)
+                if item is not None:
+                    self._items.move_to_end(key)
+                    return item[0]
+            try:
+                return self.put(key, factory(), size=size)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is None:
+                return default
+            self.current_bytes -= item[1]
+            return item[0]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def _evict_locked(self):
+        while self.current_bytes > self.max_bytes and self._items:
+            _, (_, size) = self._items.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+
+class DiskBudget:
+    """
+    Byte and age budget over the spill files of a cache directory.
+
+    An entry is the group of files ``<base><suffix>`` for one base path; the
+    first suffix is the completion marker and is removed first, so readers
+    never open a half-deleted entry. Entries unused for ``ttl_seconds`` are
+    removed, and least-recently-used entries go first once the directory
+    holds more than ``max_bytes``. The last use is the files' mtime, so the
+    order survives a restart (the directory is scanned on first use).
+    ``on_evict(base)`` is called for every removed entry, e.g. to drop the
+    memory maps of its files so their disk space is actually released.
+    """
+
+    def __init__(self, root, max_bytes, ttl_seconds=None, suffixes=(".json", ".npy"), on_evict=None):
+        self.root = root
+        self.on_evict = on_evict
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self.suffixes = tuple(suffixes)
+        self.current_bytes = 0
+        self.evictions = 0
+        self._index = None   # base -> (size, last_used), least recently used first
+        self._lock = threading.Lock()
+
+    def _load_index_locked(self):
+        if self._index is not None:
+            return
+        entries = {}
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            suffix = next((s for s in self.suffixes if name.endswith(s)), None)
+            if suffix is None or name.startswith("."):
+                continue
+            try:
+                st = os.stat(os.path.join(self.root, name))
+            except FileNotFoundError:
+                continue
+            base = os.path.join(self.root, name[:-len(suffix)])
+            size, last_used = entries.get(base, (0, 0.0))
+            entries[base] = (size + st.st_size, max(last_used, st.st_mtime))
+        self._index = OrderedDict(sorted(entries.items(), key=lambda item: item[1][1]))
+        self.current_bytes = sum(size for size, _ in self._index.values())
+
+    def _size(self, base):
+        size = 0
+        for suffix in self.suffixes:
+            try:
+                size += os.path.getsize(base + suffix)
+            except OSError:
+                pass
+        return size
+
+    def add(self, base):
+        """Account for a freshly written entry and evict others to stay within budget."""
+        with self._lock:
+            self._load_index_locked()
+            self._touch_locked(base, self._size(base))
+            self._evict_locked(keep=base)
+
+    def touch(self, base):
+        """Mark an entry as used (e.g. its spill was opened)."""
+        with self._lock:
+            self._load_index_locked()
+            item = self._index.get(base)
+            self._touch_locked(base, item[0] if item is not None else self._size(base))
+            self._evict_locked(keep=base)
+
+    def _touch_locked(self, base, size):
+        now = time.time()
+        old = self._index.pop(base, None)
+        if old is not None:
+            self.current_bytes -= old[0]
+        self._index[base] = (size, now)
+        self.current_bytes += size
+        for suffix in self.suffixes:
+            try:
+                os.utime(base + suffix, (now, now))
+            except OSError:
+                pass
+
+    def _evict_locked(self, keep=None):
+        now = time.time()
+        for base in list(self._index):
+            size, last_used = self._index[base]
+            expired = self.ttl_seconds is not None and now - last_used > self.ttl_seconds
+            if not expired and self.current_bytes <= self.max_bytes:
+                break  # index is in last-use order: nothing later is older
+            if base == keep:
+                continue
+            self._index.pop(base)
+            self.current_bytes -= size
+            self.evictions += 1
+            for suffix in self.suffixes:
+                try:
+                    os.remove(base + suffix)
+                except OSError:
+                    pass  # already gone, or still open elsewhere (Windows): picked up by a later rescan
+            if self.on_evict is not None:
+                self.on_evict(base)
+
+    def stats(self):
+        with self._lock:
+            self._load_index_locked()
+            return {
+                "entries": len(self._index),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": self.evictions,
+            }
@@ -2,7 +2,256 @@
 file_handler.py
 ----------------
 Handles file operations:
-- Upload storage
+- Upload directories of the signal viewers
+- Upload storage (content-addressed, deduplicated, quota / TTL bounded)
 - File parsing (CSV, EDF, etc.)
 - Input validation
 """
+import hashlib
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# Upload directories of the ECG and EEG viewers (also read by the analytics routes)
+_BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ECG_UPLOAD_DIR = os.path.join(_BACKEND_DIR, "uploaded_data")
+EEG_UPLOAD_DIR = os.path.join(_BACKEND_DIR, "uploads")
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _safe_target(dest_dir, member_name):
+    """Flatten an archive member into ``dest_dir``, rejecting absolute / parent paths."""
+    name = os.path.basename(member_name.replace("\\", "/"))
+    if not name or name.startswith("."):
+        return None
+    return os.path.join(dest_dir, name)
+
+
+def extract_archive(fileobj, filename, dest_dir, extensions=None):
+    """
+    Extract the regular files of a zip / tar archive into ``dest_dir`` (flat,
+    directories inside the archive are dropped) and return the written paths.
+    Raises ValueError if two kept files share a name, rather than letting one
+    overwrite the other.
+
+    extensions: optional iterable of lower-case suffixes to keep, e.g. (".dat", ".hea")
+    """
+    extensions = tuple(e.lower() for e in extensions) if extensions else None
+    written = []
+
+    def _keep(name):
+        return extensions is None or name.lower().endswith(extensions)
+
+    def _claim(target, member_name):
+        if target in written:
+            raise ValueError(f"Duplicate file name in archive: {os.path.basename(target)} ({member_name})")
+
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                target = _safe_target(dest_dir, info.filename)
+                if info.is_dir() or target is None or not _keep(target):
+                    continue
+                _claim(target, info.filename)
+                with archive.open(info) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                written.append(target)
+    elif is_archive(filename):
+        with tarfile.open(fileobj=fileobj, mode="r:*") as archive:
+            for member in archive:
+                target = _safe_target(dest_dir, member.name)
+                if not member.isfile() or target is None or not _keep(target):
+                    continue
+                _claim(target, member.name)
+                with archive.extractfile(member) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                written.append(target)
+    else:
+        raise ValueError(f"Unsupported archive type: {filename}")
+
+    return written
+
+
+# -----------------------
+# Content-addressed upload store
+# -----------------------
+
+_COPY_CHUNK = 1 << 20
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_digest(value: str) -> bool:
+    return bool(_DIGEST_RE.match(value or ""))
+
+
+class ContentStore:
+    """
+    Files stored once per content as ``<root>/<sha256><suffix>``.
+
+    put() hashes an upload while copying it into the store, so identical
+    uploads end up as one file and are recognised without a second read.
+    Files unused for ``ttl_seconds`` are dropped, and least-recently-used
+    files go first once the store exceeds ``max_bytes``. The last-use time is
+    the file's mtime, so the order survives a restart. ``on_evict(digest)`` is
+    called for every removed file (e.g. to drop derived caches). Files held
+    with hold() are not evicted until they are released.
+    """
+
+    def __init__(self, root, max_bytes, ttl_seconds=None, suffix="", on_evict=None):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self.suffix = suffix
+        self.on_evict = on_evict
+        self.current_bytes = 0
+        self.evictions = 0
+        self._index = None   # digest -> (size, last_used), least recently used first
+        self._pins = Counter()
+        self._lock = threading.Lock()
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest + self.suffix)
+
+    def _load_index_locked(self):
+        if self._index is not None:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.root):
+            digest = name[:len(name) - len(self.suffix)] if self.suffix else name
+            if not name.endswith(self.suffix) or not is_digest(digest):
+                continue
+            st = os.stat(os.path.join(self.root, name))
+            entries.append((st.st_mtime, digest, st.st_size))
+        entries.sort()
+        self._index = OrderedDict((digest, (size, mtime)) for mtime, digest, size in entries)
+        self.current_bytes = sum(size for _, _, size in entries)
+
+    def _touch_locked(self, digest, size):
+        now = time.time()
+        old = self._index.pop(digest, None)
+        if old is not None:
+            self.current_bytes -= old[0]
+        self._index[digest] = (size, now)
+        self.current_bytes += size
+        try:
+            os.utime(self._path(digest), (now, now))
+        except OSError:
+            pass
+
+    def _evict_locked(self, keep=None):
+        now = time.time()
+        for digest in list(self._index):
+            size, last_used = self._index[digest]
+            expired = self.ttl_seconds is not None and now - last_used > self.ttl_seconds
+            if not expired and self.current_bytes <= self.max_bytes:
+                break  # index is in last-use order: nothing later is older
+            if digest == keep or digest in self._pins:
+                continue
+            self._remove_locked(digest)
+
+    def _remove_locked(self, digest):
+        size, _ = self._index.pop(digest)
+        self.current_bytes -= size
+        self.evictions += 1
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+        if self.on_evict is not None:
+            self.on_evict(digest)
+
+    def put(self, fileobj, pin=False):
+        """
+        Store the contents of ``fileobj`` (read in 1 MB chunks); returns
+        (digest, created). A duplicate only refreshes the existing file's last use.
+        ``pin=True`` keeps the file from eviction until unpin(digest).
+        """
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".upload-", dir=self.root)
+        h, size = hashlib.sha256(), 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for block in iter(lambda: fileobj.read(_COPY_CHUNK), b""):
+                    h.update(block)
+                    out.write(block)
+                    size += len(block)
+            digest = h.hexdigest()
+            with self._lock:
+                self._load_index_locked()
+                created = digest not in self._index or not os.path.exists(self._path(digest))
+                if created:
+                    os.replace(tmp, self._path(digest))
+                    tmp = None
+                self._touch_locked(digest, size)
+                if pin:
+                    self._pins[digest] += 1
+                self._evict_locked(keep=digest)
+            return digest, created
+        finally:
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def unpin(self, digest):
+        with self._lock:
+            self._pins[digest] -= 1
+            if self._pins[digest] <= 0:
+                del self._pins[digest]
+            if self._index is not None:
+                self._evict_locked()
+
+    @contextmanager
+    def hold(self, fileobj):
+        """
+        put() for the duration of a request: yields (digest, path, created),
+        and the file cannot be evicted by other uploads until the block exits.
+        """
+        digest, created = self.put(fileobj, pin=True)
+        try:
+            yield digest, self._path(digest), created
+        finally:
+            self.unpin(digest)
+
+    def get(self, digest):
+        """Path of a stored file (refreshing its last use), or None if unknown or expired."""
+        if not is_digest(digest):
+            return None
+        with self._lock:
+            self._load_index_locked()
+            self._evict_locked()
+            if digest not in self._index or not os.path.exists(self._path(digest)):
+                return None
+            self._touch_locked(digest, self._index[digest][0])
+            return self._path(digest)
+
+    def remove(self, digest):
+        """Drop a stored file (e.g. an upload that turned out to be unreadable)."""
+        with self._lock:
+            self._load_index_locked()
+            if digest in self._index:
+                self._remove_locked(digest)
+
+    def stats(self):
+        with self._lock:
+            self._load_index_locked()
+            self._evict_locked()
+            return {
+                "files": len(self._index),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": self.evictions,
+            }
+
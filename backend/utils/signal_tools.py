@@ -6,4 +6,205 @@ Provides common DSP utilities shared across signals:
 - Band-pass filtering
 - Normalization
 - Segmentation
+
+All kernels work on whole N-D arrays along an ``axis`` so a multi-lead record
+is processed in one call instead of one Python-level call per channel.
+Filter coefficients are designed once per (type, fs, cutoffs, order) and
+reused as second-order sections (SOS), which are numerically safer than (b, a).
 """
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import butter, iirnotch, iirpeak, sosfiltfilt, tf2sos, welch
+
+
+# -----------------------
+# Filter design (memoized)
+# -----------------------
+
+@lru_cache(maxsize=256)
+def design_sos(kind: str, fs: float, cutoff, order: int = 2, quality: float = 30.0):
+    """
+    Return SOS coefficients for a filter, designed once per parameter set.
+
+    kind:    "bandpass", "lowpass", "highpass", "notch" or "peak"
+    cutoff:  (low, high) tuple for "bandpass", a single frequency otherwise (Hz)
+    order:   Butterworth order (ignored for notch / peak)
+    quality: Q factor for notch / peak filters
+    """
+    fs = float(fs)
+    if kind == "bandpass":
+        low, high = cutoff
+        sos = butter(order, [low, high], btype="band", fs=fs, output="sos")
+    elif kind in ("lowpass", "highpass"):
+        sos = butter(order, cutoff, btype=kind[:-4], fs=fs, output="sos")
+    elif kind == "notch":
+        sos = tf2sos(*iirnotch(cutoff, quality, fs=fs))
+    elif kind == "peak":
+        sos = tf2sos(*iirpeak(cutoff, quality, fs=fs))
+    else:
+        raise ValueError(f"Unknown filter type: {kind}")
+
+    sos = np.ascontiguousarray(sos, dtype=np.float64)
+    sos.flags.writeable = False  # shared by every caller through the cache
+    return sos
+
+
+def cascade(*sos_list):
+    """Chain several SOS filters into one so the data is traversed once."""
+    return np.vstack(sos_list)
+
+
+# -----------------------
+# Zero-phase filtering
+# -----------------------
+
+def filtfilt_sos(x, sos, axis=0, float32=False):
+    """
+    Zero-phase filter ``x`` along ``axis`` with SOS coefficients.
+    With ``float32=True`` the data and coefficients are kept in single
+    precision, halving memory traffic for large multi-channel arrays.
+    """
+    x = np.asarray(x)
+    if float32:
+        x = x.astype(np.float32, copy=False)
+    # cached designs are read-only; sosfilt wants a writable (tiny) copy
+    sos = np.array(sos, dtype=np.float32 if float32 else np.float64)
+    return sosfiltfilt(sos, x, axis=axis)
+
+
+def bandpass(x, fs, lowcut, highcut, order=2, axis=0, float32=False):
+    return filtfilt_sos(x, design_sos("bandpass", fs, (lowcut, highcut), order), axis=axis, float32=float32)
+
+
+def lowpass(x, fs, cutoff, order=2, axis=0, float32=False):
+    return filtfilt_sos(x, design_sos("lowpass", fs, cutoff, order), axis=axis, float32=float32)
+
+
+def highpass(x, fs, cutoff, order=2, axis=0, float32=False):
+    return filtfilt_sos(x, design_sos("highpass", fs, cutoff, order), axis=axis, float32=float32)
+
+
+def notch(x, fs, freq=50.0, quality=30.0, axis=0, float32=False):
+    return filtfilt_sos(x, design_sos("notch", fs, freq, quality=quality), axis=axis, float32=float32)
+
+
+@lru_cache(maxsize=64)
+def _bandpass_notch_sos(fs, lowcut, highcut, notch_freq, order, quality):
+    sos = cascade(
+        design_sos("bandpass", fs, (lowcut, highcut), order),
+        design_sos("notch", fs, notch_freq, quality=quality),
+    )
+    sos.flags.writeable = False
+    return sos
+
+
+def bandpass_notch(x, fs, lowcut=0.5, highcut=30.0, notch_freq=50.0,
+                   order=2, quality=30.0, axis=0, float32=False):
+    """Fused band-pass + notch: one forward/backward pass over the data."""
+    sos = _bandpass_notch_sos(float(fs), lowcut, highcut, notch_freq, order, quality)
+    return filtfilt_sos(x, sos, axis=axis, float32=float32)
+
+
+# -----------------------
+# FFT / spectral power
+# -----------------------
+
+def rfft_power(x, fs, axis=-1):
+    """One-sided power spectrum along ``axis``; returns (freqs, power)."""
+    x = np.asarray(x)
+    n = x.shape[axis]
+    spec = np.fft.rfft(x, axis=axis)
+    power = (spec.real ** 2 + spec.imag ** 2) / n
+    return np.fft.rfftfreq(n, d=1.0 / fs), power
+
+
+def band_powers(x, fs, bands, axis=-1, nperseg=None, relative=True):
+    """
+    Welch power in each frequency band along ``axis``.
+
+    bands: mapping of name -> (low, high) in Hz
+    Returns a dict name -> array shaped like ``x`` without ``axis``.
+    With ``relative=True`` powers are divided by the power in all bands.
+    """
+    x = np.asarray(x)
+    n = x.shape[axis]
+    freqs, psd = welch(x, fs=fs, nperseg=min(n, nperseg or n), axis=axis)
+    psd = np.moveaxis(psd, axis, -1)
+
+    out = {}
+    for name, (low, high) in bands.items():
+        mask = (freqs >= low) & (freqs < high)
+        out[name] = psd[..., mask].sum(axis=-1)
+
+    if relative:
+        total = sum(out.values()) + 1e-20
+        out = {name: p / total for name, p in out.items()}
+    return out
+
+
+# -----------------------
+# Normalization / segmentation
+# -----------------------
+
+def zscore(x, axis=0, eps=1e-8):
+    """Zero-mean, unit-variance normalization along ``axis``."""
+    x = np.asarray(x)
+    return (x - x.mean(axis=axis, keepdims=True)) / (x.std(axis=axis, keepdims=True) + eps)
+
+
+def block_reduce(x, factor, func, axis=0):
+    """
+    ``func`` (np.min, np.max, ...) over consecutive blocks of ``factor``
+    samples along ``axis``; the last, shorter block is included.
+    """
+    x = np.moveaxis(np.asarray(x), axis, 0)
+    n_full = (x.shape[0] // factor) * factor
+    out = func(x[:n_full].reshape(-1, factor, *x.shape[1:]), axis=1)
+    if n_full < x.shape[0]:
+        out = np.concatenate([out, func(x[n_full:], axis=0, keepdims=True)])
+    return np.moveaxis(out, 0, axis)
+
+
+def minmax_reduce(x, factor, axis=0):
+    """
+    Min and max over consecutive blocks of ``factor`` samples along ``axis``
+    (the last, shorter block is included). Returns (mins, maxs).
+    """
+    return block_reduce(x, factor, np.min, axis), block_reduce(x, factor, np.max, axis)
+
+
+def sliding_windows(x, size, step, axis=-1):
+    """
+    Read-only strided view of windows of ``size`` samples taken every ``step``
+    samples along ``axis``. The window index is placed at ``axis`` and the
+    samples inside a window on the last axis; no data is copied.
+    """
+    x = np.asarray(x)
+    axis = axis % x.ndim
+    view = sliding_window_view(x, size, axis=axis)
+    index = [slice(None)] * view.ndim
+    index[axis] = slice(None, None, step)
+    return view[tuple(index)]
+
+
+def resample_segments(x, bounds, n_points):
+    """
+    Resample every [start, end) segment of 1-D ``x`` to ``n_points`` samples
+    (linear interpolation, same as np.interp per segment) in one vectorized
+    gather. ``bounds`` is (n_segments, 2) with end > start; returns float32
+    (n_segments, n_points).
+    """
+    bounds = np.asarray(bounds, dtype=np.int64).reshape(-1, 2)
+    if len(bounds) == 0:
+        return np.empty((0, n_points), dtype=np.float32)
+    starts, ends = bounds[:, 0], bounds[:, 1]
+
+    frac = np.linspace(0.0, 1.0, n_points)
+    pos = starts[:, None] + frac[None, :] * (ends - starts - 1)[:, None]
+    i0 = np.floor(pos).astype(np.int64)
+    i1 = np.minimum(i0 + 1, (ends - 1)[:, None])
+    w = pos - i0
+    x = np.asarray(x)
+    return (x[i0] * (1.0 - w) + x[i1] * w).astype(np.float32)
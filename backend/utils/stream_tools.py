@@ -0,0 +1,238 @@
+"""
+stream_tools.py
+----------------
+Binary sample streaming over WebSockets shared by the signal players:
+- Frame encoding (int16 / float32 samples, per-channel scales, peak markers)
+- Real-time pacing with seek / speed / pause / channel control messages
+- Frame coalescing and dropping when the client or socket falls behind
+
+Frame layout (little-endian):
+    header   4s magic "SIGF", u8 version, u8 dtype (1=float32, 2=int16),
+             u16 n_channels, u64 start_index, u32 n_samples
+    scales   f32[n_channels]   value = sample * scale (1.0 for float32)
+    counts   u32[n_channels]   number of peak markers per channel
+    peaks    i64[sum(counts)]  absolute sample indices, channel by channel
+    samples  dtype[n_samples * n_channels], row-major (sample, channel)
+"""
+import abc
+import asyncio
+import struct
+
+import numpy as np
+from fastapi import WebSocket, WebSocketDisconnect
+
+FRAME_MAGIC = b"SIGF"
+FRAME_VERSION = 1
+DTYPE_CODES = {"float32": 1, "int16": 2}
+_HEADER = struct.Struct("<4sBBHQI")
+
+MIN_SPEED, MAX_SPEED = 0.1, 16.0
+
+
+def encode_frame(start_index, samples, dtype="float32", peaks=None):
+    """Pack a (n_samples, n_channels) block and its peak markers into one binary frame."""
+    samples = np.asarray(samples)
+    n_samples, n_channels = samples.shape
+
+    if dtype == "int16":
+        peak_abs = np.abs(samples).max(axis=0) if n_samples else np.zeros(n_channels)
+        scales = np.maximum(peak_abs / 32767.0, 1e-12).astype(np.float32)
+        body = np.round(samples / scales).astype("<i2")
+    elif dtype == "float32":
+        scales = np.ones(n_channels, dtype=np.float32)
+        body = samples.astype("<f4")
+    else:
+        raise ValueError(f"Unsupported dtype: {dtype}")
+
+    peaks = peaks if peaks is not None else [np.empty(0, np.int64)] * n_channels
+    counts = np.array([len(p) for p in peaks], dtype="<u4")
+    flat_peaks = np.concatenate([np.asarray(p, dtype="<i8") for p in peaks]) if n_channels else np.empty(0, "<i8")
+
+    header = _HEADER.pack(FRAME_MAGIC, FRAME_VERSION, DTYPE_CODES[dtype], n_channels, int(start_index), n_samples)
+    return b"".join([
+        header,
+        scales.astype("<f4").tobytes(),
+        counts.tobytes(),
+        flat_peaks.astype("<i8").tobytes(),
+        np.ascontiguousarray(body).tobytes(),
+    ])
+
+
+def decode_frame(frame: bytes):
+    """Inverse of encode_frame (used by tests and Python clients)."""
+    magic, version, dtype_code, n_channels, start_index, n_samples = _HEADER.unpack_from(frame, 0)
+    if magic != FRAME_MAGIC:
+        raise ValueError("Not a signal frame")
+    offset = _HEADER.size
+    scales = np.frombuffer(frame, "<f4", n_channels, offset)
+    offset += 4 * n_channels
+    counts = np.frombuffer(frame, "<u4", n_channels, offset)
+    offset += 4 * n_channels
+    flat_peaks = np.frombuffer(frame, "<i8", int(counts.sum()), offset)
+    offset += 8 * int(counts.sum())
+    dtype = "<f4" if dtype_code == DTYPE_CODES["float32"] else "<i2"
+    samples = np.frombuffer(frame, dtype, n_samples * n_channels, offset).reshape(n_samples, n_channels)
+    peaks = np.split(flat_peaks, np.cumsum(counts)[:-1]) if n_channels else []
+    return {
+        "start_index": start_index,
+        "samples": samples.astype(np.float32) * scales,
+        "peaks": peaks,
+    }
+
+
+class StreamSource(abc.ABC):
+    """
+    What a player streams from; run_player calls select / read / peaks in a
+    worker thread, one call at a time. Subclasses provide:
+        fs, n_samples, channel_names
+        select(channels)   validate a channel selection, return the normalized list
+        read(start, stop)  (stop - start, n_selected) array for the current selection
+        peaks(start, stop) optional: list of absolute peak indices per selected channel
+    """
+
+    fs = 0.0
+    n_samples = 0
+    channel_names = []
+
+    def __init__(self):
+        self.selected = []
+
+    @abc.abstractmethod
+    def select(self, channels):
+        """Validate and apply a channel selection; returns the normalized list."""
+
+    @abc.abstractmethod
+    def read(self, start, stop):
+        """(stop - start, n_selected) samples of the current selection."""
+
+    def peaks(self, start, stop):
+        return None
+
+    def close(self):
+        """Release anything held for the session (called when the socket closes)."""
+
+    def meta(self, dtype, speed, chunk):
+        return {
+            "type": "meta",
+            "fs": float(self.fs),
+            "n_samples": int(self.n_samples),
+            "channel_names": [str(c) for c in self.channel_names],
+            "channels": list(self.selected),
+            "dtype": dtype,
+            "speed": speed,
+            "chunk": chunk,
+        }
+
+
+def _read_frame(source, start, stop, dtype):
+    return encode_frame(start, source.read(start, stop), dtype, source.peaks(start, stop))
+
+
+async def run_player(websocket: WebSocket, source: StreamSource, dtype="float32", speed=1.0,
+                     chunk=50, max_coalesce=8, max_lag_s=2.0, min_speed=MIN_SPEED, max_speed=MAX_SPEED):
+    """
+    Stream ``source`` in real time (times ``speed``) as binary frames.
+
+    Client → server JSON control messages:
+        {"type": "seek", "time": seconds} or {"type": "seek", "index": sample}
+        {"type": "speed", "value": x}
+        {"type": "channels", "channels": [...]}   (alias "leads")
+        {"type": "pause"} / {"type": "resume"}
+
+    Backpressure: sending awaits the socket, so a slow client shows up as lag.
+    Up to ``max_coalesce`` chunks that are due are merged into one frame, and
+    once playback is more than ``max_lag_s`` behind, the backlog is dropped
+    and playback jumps to the live position. Speeds are clamped to
+    [min_speed, max_speed].
+    """
+    loop = asyncio.get_running_loop()
+    controls = asyncio.Queue()
+    arrived = asyncio.Event()   # set by the receiver, lets the pacing sleep wake without dequeuing
+    speed = min(max(float(speed), min_speed), max_speed)
+    chunk = max(1, int(chunk))
+
+    async def _receive():
+        try:
+            while True:
+                try:
+                    msg = await websocket.receive_json()
+                except ValueError:
+                    msg = None
+                controls.put_nowait(msg if isinstance(msg, dict) else {"type": "invalid"})
+                arrived.set()
+        except (WebSocketDisconnect, RuntimeError):
+            controls.put_nowait({"type": "disconnect"})
+            arrived.set()
+
+    receiver = asyncio.create_task(_receive())
+    position = 0
+    anchor_time, anchor_pos = loop.time(), 0
+    paused = False
+    dropped = 0
+
+    try:
+        await websocket.send_json(source.meta(dtype, speed, chunk))
+        while True:
+            # control messages: applied between frames, waited for while idle
+            if paused or position >= source.n_samples or not controls.empty():
+                msg = await controls.get()
+                kind = msg.get("type")
+                if kind == "disconnect":
+                    return
+                try:
+                    if kind == "seek":
+                        index = msg.get("index")
+                        if index is None:
+                            index = float(msg.get("time", 0.0)) * source.fs
+                        position = int(min(max(float(index), 0), source.n_samples))
+                    elif kind == "speed":
+                        speed = min(max(float(msg.get("value", speed)), min_speed), max_speed)
+                    elif kind in ("channels", "leads"):
+                        # may compute per-channel data (e.g. ECG R-peaks): off the event loop too
+                        await asyncio.to_thread(source.select, msg.get("channels", msg.get("leads")))
+                        await websocket.send_json(source.meta(dtype, speed, chunk))
+                    elif kind == "pause":
+                        paused = True
+                    elif kind == "resume":
+                        paused = False
+                    else:
+                        raise ValueError(f"Unknown control message: {msg}")
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+                anchor_time, anchor_pos = loop.time(), position
+                continue
+
+            rate = source.fs * speed
+            due = anchor_pos + (loop.time() - anchor_time) * rate
+            lag = due - position
+            if lag > max_lag_s * rate:
+                skip = min(max(int(lag) - chunk, 0), source.n_samples - 1 - position)
+                dropped += skip
+                position += skip
+                anchor_time, anchor_pos = loop.time(), position
+
+            n_send = int(min(max(chunk, due - position), chunk * max_coalesce))
+            stop = min(position + n_send, source.n_samples)
+            # reads may wait on disk or a preprocessing job: keep them off the event loop
+            frame = await asyncio.to_thread(_read_frame, source, position, stop, dtype)
+            await websocket.send_bytes(frame)
+            position = stop
+
+            if position >= source.n_samples:
+                # keep the socket open for seeks until the client leaves
+                await websocket.send_json({"type": "end", "dropped_samples": dropped})
+                continue
+
+            next_due = anchor_time + (position - anchor_pos) / rate
+            delay = next_due - loop.time()
+            arrived.clear()
+            if delay > 0 and controls.empty():
+                try:
+                    # wake early if a control message arrives; it stays queued, in order
+                    await asyncio.wait_for(arrived.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+    except WebSocketDisconnect:
+        return
+    finally:
+        receiver.cancel()
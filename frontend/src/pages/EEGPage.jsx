@@ -4,6 +4,7 @@ import Plot from "react-plotly.js";
 import {
   uploadEegFile,
   fetchEegSegments,
+  fetchEegBandPower,
   predictEegFile,
 } from "../services/eegService";
 
@@ -53,12 +54,26 @@ function EEGPage() {
   // bandpowers
   const [bandPowers, setBandPowers] = useState(null);
   const [bandPowerChannel, setBandPowerChannel] = useState(null);
+  const [bandSeries, setBandSeries] = useState(null); // precomputed by GET /bandpower
 
   // --- Compute EEG bands (use selected channel) ---
   const bandData = useMemo(() => {
     if (!channels.length || !time.length) return null;
 
     const selectedChannel = bandPowerChannel || channels[0];
+
+    // server-side series: pick the frame ending at the playback position
+    const series = bandSeries?.power?.[selectedChannel];
+    if (series) {
+      const t = time[time.length - 1] - bandSeries.window_s;
+      const last = bandSeries.frames - 1;
+      const frame = Math.min(last, Math.max(0, Math.floor((t - bandSeries.start_time) / bandSeries.step_s)));
+      const labels = { delta: "Delta", theta: "Theta", alpha: "Alpha", beta: "Beta", gamma: "Gamma" };
+      const relative = {};
+      for (const band of bandSeries.bands) relative[labels[band] || band] = series[band][frame] * 100;
+      return relative;
+    }
+
     const samples = buffer[selectedChannel] || [];
     if (samples.length < fs) return null;
 
@@ -105,7 +120,16 @@ function EEGPage() {
     }
     return relative;
 
-  }, [buffer, channels, fs, time, bandPowerChannel]);
+  }, [buffer, channels, fs, time, bandPowerChannel, bandSeries]);
+
+  // ----- Band powers for every channel, computed once per file on the server -----
+  useEffect(() => {
+    setBandSeries(null);
+    if (!filename) return;
+    fetchEegBandPower(filename)
+      .then((data) => (data.frames > 0 ? setBandSeries(data) : null))
+      .catch((err) => console.error("Band power fetch failed:", err));
+  }, [filename]);
 
   const colorPalette = {
     Alzheimer: "#FF6B6B",
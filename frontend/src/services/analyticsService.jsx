@@ -0,0 +1,39 @@
+// frontend/src/services/analyticsService.jsx
+import axios from "axios";
+
+const API_BASE_URL = "http://127.0.0.1:8000/api/analytics";
+
+// All segmented calls page with cursor/limit: pass the previous next_cursor to
+// receive only the cycles / windows that arrived since, and add them to what you hold.
+
+// Cross-recurrence counts of two channels summed over a page of segments
+export async function fetchRecurrence(source, filename, channels, options = {}, cursor = 0) {
+  const res = await axios.get(`${API_BASE_URL}/recurrence`, {
+    params: { source, filename, channels, cursor, ...options },
+  });
+  return res.data;
+}
+
+// XOR overlay state (shown chunk ids + samples of new shown chunks)
+export async function fetchXorOverlay(source, filename, channel, tolerance, options = {}, cursor = 0) {
+  const res = await axios.get(`${API_BASE_URL}/xor`, {
+    params: { source, filename, channel, tolerance, cursor, ...options },
+  });
+  return res.data;
+}
+
+// Mean |difference| to the previous chunk for chunk starts in [start, end)
+export async function fetchRollingXor(source, filename, channel, start, end, options = {}) {
+  const res = await axios.get(`${API_BASE_URL}/xor/rolling`, {
+    params: { source, filename, channel, start, end, ...options },
+  });
+  return res.data;
+}
+
+// Segments resampled to n_points as polar revolutions (theta in degrees)
+export async function fetchPolarCycles(source, filename, channels, options = {}, cursor = 0) {
+  const res = await axios.get(`${API_BASE_URL}/polar`, {
+    params: { source, filename, channels, cursor, ...options },
+  });
+  return res.data;
+}
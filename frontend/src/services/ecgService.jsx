@@ -10,6 +10,25 @@ export async function fetchEcgData(filename, leads) {
   return await res.json();
 }
 
+// Beat-aligned cycles resampled to nPoints plus a median/mean template per lead
+export async function fetchEcgBeats(filename, leads, nPoints = 200, template = "median") {
+  const leadParams = leads.map((l) => `leads=${l}`).join("&");
+  const url = `${API_BASE_URL}/ecg/ecg/beats?filename=${filename}&${leadParams}&n_points=${nPoints}&template=${template}`;
+  const res = await fetch(url);
+  if (!res.ok) throw new Error(`Failed to fetch ECG beats: ${res.status}`);
+  return await res.json();
+}
+
+// Min/max envelope of [start, end) seconds with at most maxPoints buckets per lead
+export async function fetchEcgRange(filename, leads, start, end, maxPoints = 2000) {
+  const leadParams = leads.map((l) => `leads=${l}`).join("&");
+  let url = `${API_BASE_URL}/ecg/range?filename=${filename}&${leadParams}&start=${start}&max_points=${maxPoints}`;
+  if (end != null) url += `&end=${end}`;
+  const res = await fetch(url);
+  if (!res.ok) throw new Error(`Failed to fetch ECG range: ${res.status}`);
+  return await res.json();
+}
+
 export const classifyEcgRecord = async (recordNumber, dataFolder = "data") => {
   // This one is correct! The endpoint is /api/ecg/classify
   const response = await axios.post(`${API_BASE_URL}/ecg/classify`, {
@@ -18,6 +37,18 @@ export const classifyEcgRecord = async (recordNumber, dataFolder = "data") => {
   });
   return response.data;
 };
+// Bulk classification: resolves to one result object per record (NDJSON stream)
+export async function classifyEcgRecords(recordNumbers, batchSize = 64) {
+  const res = await fetch(`${API_BASE_URL}/ecg/classify/bulk`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ record_numbers: recordNumbers, batch_size: batchSize }),
+  });
+  if (!res.ok) throw new Error(`Failed to classify ECG records: ${res.status}`);
+  const text = await res.text();
+  return text.split("\n").filter(Boolean).map((line) => JSON.parse(line));
+}
+
 // Upload ECG file pair (.dat + .hea)
 export async function uploadEcgFile(files) {
   const formData = new FormData();
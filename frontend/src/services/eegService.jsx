@@ -20,6 +20,68 @@ export async function fetchEegSegments(filename, channels) {
   return res.data;
 }
 
+// Segments of [start, end) seconds only; reads just that window from disk
+export async function fetchEegWindow(filename, channels, start, end, reference = "average") {
+  const res = await axios.get(`${API_BASE_URL}/segments`, {
+    params: { filename, channels, start, end, reference },
+  });
+  return res.data;
+}
+
+// One page of segments: { segments, start_time, fs, segment_samples, channels, next_cursor, total_segments }
+export async function fetchEegPage(filename, channels, cursor = 0, limit = 30) {
+  const res = await axios.get(`${API_BASE_URL}/segments`, {
+    params: { filename, channels, cursor, limit, format: "compact" },
+  });
+  return res.data;
+}
+
+// Same page as one float32 frame: samples is a Float32Array laid out (segment, sample, channel)
+export async function fetchEegPageF32(filename, channels, cursor = 0, limit = 30) {
+  const res = await axios.get(`${API_BASE_URL}/segments`, {
+    params: { filename, channels, cursor, limit, format: "f32" },
+    responseType: "arraybuffer",
+  });
+  const view = new DataView(res.data);
+  const nChannels = view.getUint16(6, true);
+  const nSamples = view.getUint32(16, true);
+  const offset = 20 + 8 * nChannels; // header + scales + peak counts (no peaks)
+  const header = (name) => res.headers[`x-eeg-${name}`];
+  return {
+    samples: new Float32Array(res.data, offset, nSamples * nChannels),
+    fs: Number(header("fs")),
+    channels: JSON.parse(header("channels")),
+    segmentSamples: Number(header("segment-samples")),
+    startTime: Number(header("start-time")),
+    nextCursor: JSON.parse(header("next-cursor")),
+    totalSegments: Number(header("total-segments")),
+  };
+}
+
+// Min/max envelope (µV) of [start, end) seconds with at most maxPoints buckets per channel
+export async function fetchEegRange(filename, channels, start, end, maxPoints = 2000) {
+  const res = await axios.get(`${API_BASE_URL}/range`, {
+    params: { filename, channels, start, end, max_points: maxPoints },
+  });
+  return res.data;
+}
+
+// Relative band power per channel, one frame every step seconds (cached server-side)
+export async function fetchEegBandPower(filename, channels = null, start = 0, end = null) {
+  const res = await axios.get(`${API_BASE_URL}/bandpower`, {
+    params: { filename, channels, start, end },
+  });
+  return res.data;
+}
+
+// STFT power (dB) per channel as (freqs x frames) heatmap rows
+export async function fetchEegSpectrogram(filename, channels, start = 0, end = null) {
+  const res = await axios.get(`${API_BASE_URL}/spectrogram`, {
+    params: { filename, channels, start, end },
+  });
+  return res.data;
+}
+
 export async function predictEegFile(file) {
   const formData = new FormData();
   formData.append("file", file);
@@ -29,3 +91,38 @@ export async function predictEegFile(file) {
   });
   return res.data;
 }
+
+// Classify a file already uploaded with uploadEegFile (reuses the server-side preprocessing)
+export async function predictEegByName(filename, modelFs = 256) {
+  const res = await axios.post(`${API_BASE_URL}/predict/${encodeURIComponent(filename)}`, null, {
+    params: { model_fs: modelFs },
+  });
+  return res.data;
+}
+
+// Per-window prediction timeline of an uploaded file; onLine gets each NDJSON
+// line ("start", "windows", then "result") as soon as the server sends it
+export async function streamEegPrediction(filename, onLine, group = 1, modelFs = 256) {
+  const url = `${API_BASE_URL}/predict/${encodeURIComponent(filename)}/stream?group=${group}&model_fs=${modelFs}`;
+  const res = await fetch(url, { method: "POST" });
+  if (!res.ok) throw new Error(`Failed to stream EEG prediction: ${res.status}`);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let pending = "";
+  let result = null;
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    pending += decoder.decode(value, { stream: true });
+    const lines = pending.split("\n");
+    pending = lines.pop();
+    for (const line of lines.filter(Boolean)) {
+      const msg = JSON.parse(line);
+      if (msg.type === "result") result = msg;
+      onLine(msg);
+    }
+  }
+  return result;
+}
+